@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import namedtuple
+
+from singleflight import SingleFlight
+from tracing import traced
+
+# Largest single asset accepted (bytes)
+MAX_ASSET_BYTES = int(os.getenv("ASSET_MAX_BYTES", 100 * 1024 * 1024))
+
+# Largest total size of the store (bytes)
+MAX_STORE_BYTES = int(os.getenv("ASSET_STORE_MAX_BYTES", 500 * 1024 * 1024))
+
+# Number of leading bytes used to sniff the file type
+SNIFF_BYTES = 8192
+
+CHUNK_SIZE = 64 * 1024
+
+TIMEOUT = 30
+
+Asset = namedtuple("Asset", ["url", "path", "sha256", "size", "mime", "extension"])
+Asset.__doc__ = """
+A downloaded file in the asset store.
+
+- url (str): the URL the asset was downloaded from.
+- path (str): location of the content on disk.
+- sha256 (str): hex digest of the content, which is also its key in the store.
+- size (int): size in bytes.
+- mime (str): MIME type sniffed from the content (falls back to the Content-Type header).
+- extension (str): file extension matching the sniffed type, or None if unknown.
+"""
+
+
+class AssetError(Exception):
+    """
+    Raised when an asset cannot be added to the store (too large, or the store is full).
+    """
+
+
+_filetype = None
+
+def load_filetype():
+    """
+    Imports filetype on first use, registering the SVG type it does not know about.
+    """
+    global _filetype
+    if _filetype is None:
+        import filetype
+        from filetypes import Svg
+
+        filetype.add_type(Svg())
+        _filetype = filetype
+    return _filetype
+
+
+def sniff_type(head, content_type=None):
+    """
+    Determines the MIME type and extension of a file from its first bytes.
+
+    Parameters:
+    - head (bytes): the leading bytes of the file.
+    - content_type (str, optional): the Content-Type header, used only if the bytes are not recognised.
+
+    Returns:
+    - tuple: (mime, extension). extension is None if the type is not recognised.
+    """
+    filetype = load_filetype()
+    kind = filetype.guess(head)
+    if kind is not None:
+        return kind.mime, kind.extension
+
+    if content_type:
+        mime = content_type.split(";")[0].strip()
+        kind = filetype.get_type(mime=mime)
+        return mime, kind.extension if kind is not None else None
+
+    return "application/octet-stream", None
+
+
+class AssetStore:
+    """
+    Content-addressed store for downloaded files.
+
+    Each URL is streamed to disk once and stored under the sha256 of its content, so the same
+    file is kept once even if it is linked from several URLs. The file type is sniffed from the
+    first bytes of the content. Downloads larger than max_asset_bytes are aborted as soon as this
+    is known (from Content-Length, or while streaming).
+
+    Parameters:
+    - root (str): directory holding the store.
+    - max_asset_bytes (int): largest single asset accepted.
+    - max_store_bytes (int): largest total size of the store.
+    - session (optional): a requests.Session used to download assets. Defaults to the shared transport's.
+    """
+
+    def __init__(self, root, max_asset_bytes=MAX_ASSET_BYTES, max_store_bytes=MAX_STORE_BYTES, session=None):
+        self.root = root
+        self.max_asset_bytes = max_asset_bytes
+        self.max_store_bytes = max_store_bytes
+        if session is None:
+            from transport import get_session
+            session = get_session()
+        self.session = session
+        self._lock = threading.Lock()
+        self._downloads = SingleFlight()
+
+        os.makedirs(root, exist_ok=True)
+        self._index_path = os.path.join(root, "index.json")
+        self._index = {}
+        if os.path.exists(self._index_path):
+            with open(self._index_path) as f:
+                self._index = {url: Asset(**asset) for url, asset in json.load(f).items()}
+
+    def get(self, url):
+        """
+        Returns the Asset already stored for a URL, or None.
+        """
+        with self._lock:
+            asset = self._index.get(url)
+        if asset is not None and os.path.exists(asset.path):
+            return asset
+        return None
+
+    def fetch(self, url):
+        """
+        Returns the Asset for a URL, downloading it if it is not already in the store.
+        Concurrent fetches of the same URL share one download.
+        """
+        asset = self.get(url)
+        if asset is not None:
+            return asset
+        return self._downloads.do(url, self._download, url)
+
+    def read(self, url):
+        """
+        Returns the content of the asset for a URL, downloading it if needed.
+        """
+        with open(self.fetch(url).path, "rb") as f:
+            return f.read()
+
+    def size(self):
+        with self._lock:
+            paths = {asset.path for asset in self._index.values()}
+        return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+    @traced("download asset", "http")
+    def _download(self, url):
+        digest = hashlib.sha256()
+        head = b""
+        size = 0
+
+        with self.session.get(url, stream=True, timeout=TIMEOUT) as response:
+            response.raise_for_status()
+
+            declared = response.headers.get("Content-Length", "")
+            if declared.isdigit() and int(declared) > self.max_asset_bytes:
+                raise AssetError(f"File at {url} is {int(declared)} bytes, larger than the limit of {self.max_asset_bytes} bytes")
+
+            with tempfile.NamedTemporaryFile(dir=self.root, delete=False) as tmp:
+                try:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > self.max_asset_bytes:
+                            raise AssetError(f"File at {url} is larger than the limit of {self.max_asset_bytes} bytes")
+                        if len(head) < SNIFF_BYTES:
+                            head += chunk[:SNIFF_BYTES - len(head)]
+                        digest.update(chunk)
+                        tmp.write(chunk)
+                except BaseException:
+                    tmp.close()
+                    os.remove(tmp.name)
+                    raise
+
+            content_type = response.headers.get("Content-Type")
+
+        sha256 = digest.hexdigest()
+        path = os.path.join(self.root, sha256[:2], sha256)
+
+        if os.path.exists(path):
+            os.remove(tmp.name)
+        else:
+            if self.size() + size > self.max_store_bytes:
+                os.remove(tmp.name)
+                raise AssetError(f"Asset store is full ({self.max_store_bytes} bytes); cannot add {url}")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.move(tmp.name, path)
+
+        mime, extension = sniff_type(head, content_type)
+        asset = Asset(url, path, sha256, size, mime, extension)
+
+        with self._lock:
+            self._index[url] = asset
+            with open(self._index_path, "w") as f:
+                json.dump({u: a._asdict() for u, a in self._index.items()}, f)
+
+        return asset
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def default_store():
+    """
+    The asset store shared by a pipeline run, in ASSET_STORE_DIR (defaults to a directory under the system temp dir).
+    Downloads use the shared transport.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            root = os.getenv("ASSET_STORE_DIR", os.path.join(tempfile.gettempdir(), "mate_assets"))
+            _store = AssetStore(root)
+        return _store
+
+
+def set_default_store(store):
+    """
+    Replaces the shared asset store, e.g. with one in a temporary directory.
+    """
+    global _store
+    with _store_lock:
+        _store = store
@@ -0,0 +1,194 @@
+"""
+Benchmark of the metadata pipeline stages on synthetic workloads, offline.
+
+Times parse_issue, dict_to_report, recursively_filter_key, dict_to_ro_crate_mapping, flatten_crate and
+dict_to_metadata on synthetic issues and crates (see synthetic.py), with every network call answered by
+an in-process stub (see stub_network.py). Each stage is timed over several runs (best is kept) and its
+peak memory is measured with tracemalloc in a separate run. The results are compared with the stored
+baseline, and the script fails if a stage is slower or uses more memory than the baseline allows.
+
+Usage:
+    python .github/scripts/benchmarks/pipeline.py [--authors N] [--funders N] [--files N] [--depth N]
+                                                  [--runs N] [--latency S] [--update-baseline]
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+
+import improved_request_utils
+from asset_store import AssetStore, set_default_store
+from crosswalk_mappings import default_issue_entity_mapping_list
+from crosswalks import dict_to_metadata, dict_to_report
+from generate_identifier import SlugAllocator
+from parse_issue import parse_issue
+from record_cache import RecordCache
+from ro_crate_utils import dict_to_ro_crate_mapping, flatten_crate, recursively_filter_key
+from templates import TemplateLoader, set_default_loader
+
+import synthetic
+from stub_network import StubSession
+
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, "pipeline_baseline.json")
+
+# A stage regresses if it is this many times slower, or uses this many times more memory, than the baseline
+TIME_TOLERANCE = 1.5
+MEMORY_TOLERANCE = 1.2
+
+# Differences smaller than this are timer noise, whatever the ratio
+MIN_TIME_MS = 1.0
+
+
+class Issue:
+    """
+    The attributes of a GitHub issue read by parse_issue.
+    """
+
+    def __init__(self, body, number=1):
+        self.body = body
+        self.number = number
+
+
+def install_stubs(session, workdir):
+    """
+    Points the lookups, the asset store and the template loader at the stub session.
+    """
+    improved_request_utils.set_session(session)
+    improved_request_utils.set_cache(RecordCache())
+    set_default_loader(TemplateLoader(ref="0" * 40, cache_dir=os.path.join(workdir, "templates"), offline=False,
+                                      lock_path=os.path.join(workdir, "templates.lock.json"), session=session))
+
+
+def stages(args, session, workdir):
+    """
+    Returns the stages as (name, setup, run): setup builds a fresh input, and only run is measured.
+    """
+    issue = Issue(synthetic.issue_body(args.authors, args.funders, n_software_authors=args.authors // 10))
+
+    def parse(issue):
+        # start each run cold: no coalesced lookups, downloaded assets or repo listing from the previous run
+        improved_request_utils.inflight.clear()
+        set_default_store(AssetStore(tempfile.mkdtemp(dir=workdir), session=session))
+        return parse_issue(issue, slug_allocator=SlugAllocator(session=session))
+
+    issue_dict, _ = parse(issue)
+    large_issue_dict = synthetic.issue_dict(n_authors=args.authors, n_funders=args.funders, depth=args.depth)
+
+    return [
+        ("parse_issue", lambda: issue, parse),
+        ("dict_to_report", lambda: copy.deepcopy(issue_dict), dict_to_report),
+        ("recursively_filter_key", lambda: copy.deepcopy(large_issue_dict),
+         lambda data: recursively_filter_key(data, synthetic.ENTITY_TEMPLATE)),
+        ("dict_to_ro_crate_mapping", lambda: (synthetic.crate_template(), copy.deepcopy(issue_dict)),
+         lambda inputs: dict_to_ro_crate_mapping(*inputs, default_issue_entity_mapping_list)),
+        ("flatten_crate", lambda: synthetic.crate(n_files=args.files, n_authors=args.authors, depth=args.depth), flatten_crate),
+        ("dict_to_metadata", lambda: copy.deepcopy(issue_dict), dict_to_metadata),
+    ]
+
+
+def measure(setup, run, runs):
+    """
+    Returns the best time (ms) of a stage over several runs, and its peak traced memory (KiB).
+    """
+    best = None
+    for _ in range(runs):
+        data = setup()
+        start = time.perf_counter()
+        run(data)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+
+    data = setup()
+    tracemalloc.start()
+    try:
+        run(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return best, peak / 1024
+
+
+def compare(results, baseline):
+    """
+    Returns the regressions of results against the baseline, as a list of messages.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if result["time_ms"] > max(expected["time_ms"] * TIME_TOLERANCE, expected["time_ms"] + MIN_TIME_MS):
+            regressions.append(f"{name}: {result['time_ms']:.1f} ms vs baseline {expected['time_ms']:.1f} ms")
+        if result["peak_kib"] > expected["peak_kib"] * MEMORY_TOLERANCE:
+            regressions.append(f"{name}: {result['peak_kib']:.0f} KiB vs baseline {expected['peak_kib']:.0f} KiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--authors", type=int, default=200, help="number of authors in the issue")
+    parser.add_argument("--funders", type=int, default=50, help="number of funders in the issue")
+    parser.add_argument("--files", type=int, default=5000, help="number of file entities in the crate")
+    parser.add_argument("--depth", type=int, default=200, help="nesting depth of the deepest entity")
+    parser.add_argument("--runs", type=int, default=3, help="number of timed runs per stage (best is kept)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of simulated latency per request")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    workload = {"authors": args.authors, "funders": args.funders, "files": args.files, "depth": args.depth, "latency": args.latency}
+
+    session = StubSession(latency=args.latency, n_authors=args.authors)
+    with tempfile.TemporaryDirectory() as workdir:
+        install_stubs(session, workdir)
+
+        results = {}
+        for name, setup, run in stages(args, session, workdir):
+            ms, kib = measure(setup, run, args.runs)
+            results[name] = {"time_ms": round(ms, 2), "peak_kib": round(kib, 1)}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        if stored["workload"] == workload:
+            baseline = stored["stages"]
+        else:
+            print(f"Baseline in {args.baseline} was recorded for another workload ({stored['workload']}); not comparing.")
+
+    print(f"workload: {workload}")
+    print(f"{'stage':<26} {'time':>10} {'baseline':>10} {'peak mem':>12} {'baseline':>12}")
+    for name, result in results.items():
+        expected = baseline.get(name, {})
+        print(f"{name:<26} {result['time_ms']:7.1f} ms {expected.get('time_ms', float('nan')):7.1f} ms "
+              f"{result['peak_kib']:8.0f} KiB {expected.get('peak_kib', float('nan')):8.0f} KiB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"workload": workload, "stages": results}, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"workload": workload, "stages": results}, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
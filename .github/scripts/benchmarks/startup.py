@@ -0,0 +1,157 @@
+"""
+Startup-time budget for the pipeline entry points.
+
+Two measurements, each the best of several runs in fresh interpreters, checked against the budgets
+in startup_budget.json:
+- imports: the cumulative time of `import <module>`, from `python -X importtime`.
+- entry_points: a full run of each workflow script (write_report.py, write_metadata.py) against the
+  stand-in servers (see standin_servers.py), with the time spent importing, wherever the imports
+  happen. This includes modules imported inside main(), such as PyGithub, which `import <module>`
+  leaves out. Wall and CPU time of the run are reported too; the wall time is dominated by PyGithub
+  pacing its write requests, so only the import time is budgeted.
+
+Usage:
+    python .github/scripts/benchmarks/startup.py [--runs N] [--entry-runs N] [--output results.json]
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_DIR = os.path.dirname(BENCHMARK_DIR)
+BUDGET_FILE = os.path.join(BENCHMARK_DIR, "startup_budget.json")
+
+# import time: self [us] | cumulative | imported package
+IMPORTTIME_LINE = re.compile(r"import time:\s+(?P<self>\d+) \|\s+(?P<cumulative>\d+) \|(?P<indent>\s+)(?P<name>\S+)")
+
+
+def import_times(module):
+    """
+    Imports a module in a fresh interpreter and returns the -X importtime entries as
+    a list of (name, self_us, cumulative_us, depth).
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=SCRIPT_DIR, capture_output=True, text=True, check=True)
+    return parse_import_times(result.stderr)
+
+
+def parse_import_times(stderr):
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            depth = (len(match["indent"]) - 1) // 2
+            entries.append((match["name"], int(match["self"]), int(match["cumulative"]), depth))
+    return entries
+
+
+def measure(module, runs):
+    """
+    Returns the best cumulative import time (ms) of a module over several runs, and the
+    top-level imports that contributed most to it.
+    """
+    best = None
+    for _ in range(runs):
+        entries = import_times(module)
+        total = next(cumulative for name, _, cumulative, depth in entries if name == module and depth == 0)
+        if best is None or total < best[0]:
+            best = (total, entries)
+
+    total, entries = best
+    top = sorted(((name, cumulative) for name, _, cumulative, depth in entries if depth == 1),
+                 key=lambda item: item[1], reverse=True)[:5]
+    return total / 1000, [(name, cumulative / 1000) for name, cumulative in top]
+
+
+def run_entry_point(script, env):
+    """
+    Runs an entry point script in a fresh interpreter with -X importtime.
+
+    Returns:
+    - tuple: total import time, wall time and CPU time of the run (ms), and the slowest top-level imports.
+    """
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", os.path.join(SCRIPT_DIR, script)],
+                            cwd=SCRIPT_DIR, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    if result.returncode != 0:
+        raise RuntimeError(f"{script} failed:\n{result.stderr[-2000:]}")
+
+    entries = parse_import_times(result.stderr)
+    top_level = [(name, cumulative) for name, _, cumulative, depth in entries if depth == 0]
+    imports = sum(cumulative for _, cumulative in top_level) / 1000
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    top = sorted(top_level, key=lambda item: item[1], reverse=True)[:5]
+    return imports, wall * 1000, cpu * 1000, [(name, cumulative / 1000) for name, cumulative in top]
+
+
+def measure_entry_points(budgets, runs):
+    """
+    Runs each entry point against the stand-in servers, keeping its best run by import time.
+    """
+    sys.path.insert(0, SCRIPT_DIR)
+    from standin_servers import Standins
+
+    standins = Standins()
+    env = dict(os.environ, **standins.env())
+    for name in ("RECORD_CACHE_PATH", "TRACE_FILE", "METRICS_FILE", "METRICS_PROMETHEUS", "GITHUB_STEP_SUMMARY"):
+        env.pop(name, None)
+    env.update({"GITHUB_TOKEN": "standin", "ISSUE_NUMBER": "1", "OWNER": "hvidy", "REPO": "standin_model"})
+
+    results = {}
+    try:
+        for script in budgets:
+            results[script] = min((run_entry_point(script, env) for _ in range(runs)), key=lambda run: run[0])
+    finally:
+        standins.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="number of runs per imported module (best is kept)")
+    parser.add_argument("--entry-runs", type=int, default=2, help="number of runs per entry point (best is kept)")
+    parser.add_argument("--output", help="write the measured times to this JSON file")
+    args = parser.parse_args()
+
+    with open(BUDGET_FILE) as f:
+        budgets = json.load(f)
+
+    results = {"imports": {}, "entry_points": {}}
+    failed = False
+    for module, budget in budgets["imports"].items():
+        total, top = measure(module, args.runs)
+        results["imports"][module] = {"import_ms": round(total, 1), "budget_ms": budget, "top": top}
+        status = "ok" if total <= budget else "OVER BUDGET"
+        failed |= total > budget
+        print(f"import {module:<22} {total:8.1f} ms  (budget {budget} ms)  {status}")
+        for name, ms in top:
+            print(f"    {name:<30} {ms:8.1f} ms")
+
+    for script, (imports, wall, cpu, top) in measure_entry_points(budgets["entry_points"], args.entry_runs).items():
+        budget = budgets["entry_points"][script]
+        results["entry_points"][script] = {"import_ms": round(imports, 1), "wall_ms": round(wall, 1),
+                                           "cpu_ms": round(cpu, 1), "budget_ms": budget, "top": top}
+        status = "ok" if imports <= budget else "OVER BUDGET"
+        failed |= imports > budget
+        print(f"run {script:<25} {imports:8.1f} ms importing  (budget {budget} ms)  {status}"
+              f"   wall {wall:.0f} ms, cpu {cpu:.0f} ms")
+        for name, ms in top:
+            print(f"    {name:<30} {ms:8.1f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+An in-process stand-in for the network, so the pipeline can be benchmarked offline.
+
+StubSession answers requests to Crossref, Zenodo, ROR, ORCID, the GitHub API and raw.githubusercontent.com
+with synthetic records (see synthetic.py), and any other URL with a small PNG. It implements the parts of
+requests.Session used by the pipeline.
+"""
+import base64
+import json
+import re
+import threading
+import time
+
+import requests
+
+from synthetic import ENTITY_TEMPLATE, crate_template, crossref_record, orcid_record, ror_record, zenodo_record
+
+PNG = base64.b64decode("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg==")
+
+ORCID_ID = re.compile(r"\d{4}-\d{4}-\d{4}-\d{3}[0-9X]")
+
+
+class StubResponse:
+    """
+    A response with the attributes of requests.Response used by the pipeline.
+    """
+
+    def __init__(self, url, status_code=200, body=b"", content_type="application/json"):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        self.url = url
+        self.status_code = status_code
+        self.reason = "OK" if status_code < 400 else "Error"
+        self.content = body
+        self.headers = requests.structures.CaseInsensitiveDict({"Content-Type": content_type, "Content-Length": str(len(body))})
+        self.links = {}
+
+    @property
+    def text(self):
+        return self.content.decode()
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class StubSession:
+    """
+    Stand-in for requests.Session that serves synthetic records without touching the network.
+
+    Parameters:
+    - latency (float): seconds to wait before each response, to simulate a slow API.
+    - base_urls (dict, optional): base URL per record type, as in improved_request_utils.BASE_URLS.
+    - n_authors (int): number of authors in the publication and software records.
+    """
+
+    def __init__(self, latency=0.0, base_urls=None, n_authors=10):
+        if base_urls is None:
+            from improved_request_utils import BASE_URLS as base_urls
+        self.latency = latency
+        self.base_urls = base_urls
+        self.n_authors = n_authors
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def route(self, url):
+        for record_type, base_url in self.base_urls.items():
+            if not url.startswith(base_url):
+                continue
+            record_id = url[len(base_url):]
+            if record_type == "publication":
+                return StubResponse(url, body=crossref_record(record_id, self.n_authors))
+            if record_type == "software":
+                return StubResponse(url, body=zenodo_record(record_id, self.n_authors))
+            if record_type == "doi_ra":
+                # every synthetic DOI is a Crossref DOI
+                return StubResponse(url, body=[{"DOI": record_id, "RA": "Crossref"}])
+            if record_type == "author":
+                match = ORCID_ID.search(record_id)
+                if not match:
+                    return StubResponse(url, 404, {})
+                record = orcid_record(match.group(0))
+                if record_id.endswith("/person"):
+                    record = record["person"]
+                elif record_id.endswith("/employments"):
+                    record = record["activities-summary"]["employments"]
+                return StubResponse(url, body=record)
+            if record_type == "organization":
+                if record_id.startswith("?"):
+                    return StubResponse(url, body={"number_of_results": 0, "items": []})
+                return StubResponse(url, body=ror_record(record_id))
+
+        if "/users/" in url and "/repos" in url:
+            return StubResponse(url, body=[{"name": f"model_{i}"} for i in range(100)])
+        if url.endswith("ro-crate-metadata.json"):
+            return StubResponse(url, body=crate_template())
+        if url.endswith("type_templates.json"):
+            return StubResponse(url, body=ENTITY_TEMPLATE)
+        return StubResponse(url, body=PNG, content_type="image/png")
+
+    def request(self, method, url, **kwargs):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.route(url)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request("HEAD", url, **kwargs)
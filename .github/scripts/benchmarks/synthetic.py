@@ -0,0 +1,257 @@
+"""
+Synthetic workloads for the benchmarks, at any scale: issue bodies, the API records they resolve to,
+issue dicts shaped like the output of parse_issue, and RO-Crates.
+
+Everything is generated from a seed, so repeated runs see the same data.
+"""
+import random
+
+# Keys retained per @type, in the shape of the M@TE type_templates.json
+ENTITY_TEMPLATE = {
+    "Person": ["@id", "@type", "givenName", "familyName", "name", "affiliation"],
+    "Organization": ["@id", "@type", "name", "url"],
+    "ScholarlyArticle": ["@id", "@type", "name", "author", "isPartOf", "datePublished", "funder"],
+    "SoftwareApplication": ["@id", "@type", "name", "author", "codeRepository", "version"],
+    "DefinedTerm": ["@id", "@type", "name"],
+}
+
+
+def person(rnd, i, n_affiliations=2):
+    entity = {
+        "@type": "Person",
+        "givenName": f"Given{i}",
+        "familyName": f"Family{i}",
+        "email": f"person{i}@example.org",
+        "biography": "x" * rnd.randint(50, 500),
+        "affiliation": [organization(rnd, rnd.randrange(50)) for _ in range(n_affiliations)],
+    }
+    if i % 2 == 0:
+        entity["@id"] = f"https://orcid.org/0000-0000-{i // 10000:04d}-{i % 10000:04d}"
+    return entity
+
+
+def organization(rnd, i):
+    return {
+        "@type": "Organization",
+        "@id": f"https://ror.org/{i:09d}",
+        "name": f"Organization {i}",
+        "url": f"https://org{i}.example.org",
+        "country": rnd.choice(["AU", "NZ", "US", "DE"]),
+        "acronyms": [f"O{i}"],
+        "relationships": [{"type": "Related", "label": f"Organization {i + 1}", "id": f"https://ror.org/{i + 1:09d}"}],
+    }
+
+
+def nested(depth):
+    """
+    A chain of typed entities nested depth levels deep.
+    """
+    root = {"@type": "Dataset", "name": "level 0", "note": "dropped"}
+    node = root
+    for level in range(1, depth):
+        node["hasPart"] = {"@type": "Dataset", "name": f"level {level}", "note": "dropped"}
+        node = node["hasPart"]
+    return root
+
+
+def issue_dict(n_authors=10, n_funders=5, depth=0, seed=0):
+    """
+    Builds an issue dict with the structure produced by parse_issue.
+
+    Parameters:
+    - n_authors (int): number of authors (of the model, the publication and the software).
+    - n_funders (int): number of funders.
+    - depth (int): if non-zero, adds an entity nested this many levels deep.
+    - seed (int): random seed.
+
+    Returns:
+    - dict: the issue dict. The creator is also the first author, as in parse_issue.
+    """
+    rnd = random.Random(seed)
+    authors = [person(rnd, i) for i in range(n_authors)]
+    funders = [organization(rnd, 1000 + i) for i in range(n_funders)]
+
+    data = {
+        "creator": authors[0],
+        "slug": "synthetic-model",
+        "for_codes": [{"@id": "#FoR_3705", "@type": "DefinedTerm", "name": "Geology", "inDefinedTermSet": "ANZSRC"}],
+        "license": {"@type": "CreativeWork", "name": "CC-BY-4.0", "url": "https://creativecommons.org/licenses/by/4.0/"},
+        "model_category": ["model published in study"],
+        "publication": {
+            "@type": "ScholarlyArticle",
+            "@id": "https://doi.org/10.1000/synthetic",
+            "name": "A synthetic publication",
+            "abstract": "y" * 2000,
+            "author": [person(rnd, i) for i in range(n_authors)],
+            "funder": funders,
+            "isPartOf": {"@type": "PublicationIssue", "issueNumber": "1",
+                         "isPartOf": {"@type": "Periodical", "name": "Journal"}},
+        },
+        "title": "Synthetic model",
+        "description": "A synthetic model for benchmarking.",
+        "authors": authors,
+        "keywords": [f"keyword{i}" for i in range(10)],
+        "funder": funders,
+        "model_code_uri": "https://example.org/code",
+        "software": {
+            "@type": "SoftwareApplication",
+            "@id": "https://doi.org/10.5281/zenodo.0000000",
+            "name": "Synthetic software",
+            "description": "z" * 1000,
+            "author": [person(rnd, i) for i in range(n_authors)],
+            "codeRepository": "https://github.com/example/software",
+        },
+        "computer_uri": "https://example.org/computer",
+    }
+    if depth:
+        data["nested"] = nested(depth)
+    return data
+
+
+def orcid(i):
+    return f"0000-0002-{i // 10000:04d}-{i % 10000:04d}"
+
+
+def issue_body(n_authors=10, n_funders=5, n_software_authors=0):
+    """
+    Builds the body of a model submission issue, as written by the issue form.
+
+    Parameters:
+    - n_authors (int): number of model authors (ORCIDs, with every fifth given as a name).
+    - n_funders (int): number of funders (RORs, with every third given as a URL).
+    - n_software_authors (int): number of software framework authors.
+
+    Returns:
+    - str: the issue body.
+    """
+    authors = [f"Family{i}, Given{i}" if i % 5 == 4 else orcid(i) for i in range(n_authors)]
+    funders = [f"https://www.funder{i}.example.org" if i % 3 == 2 else f"https://ror.org/{1000 + i:09d}" for i in range(n_funders)]
+    software_authors = [orcid(10000 + i) for i in range(n_software_authors)]
+
+    fields = [
+        ("-> creator/contributor ORCID (or name)", orcid(0)),
+        ("-> slug", "synthetic_model"),
+        ("-> field of Research (FoR) Codes", "3705, 370501, 370502"),
+        ("-> license", "CC-BY-4.0"),
+        ("-> model category", "model published in study"),
+        ("-> associated publication DOI", "10.1000/synthetic"),
+        ("-> title", "Synthetic model"),
+        ("-> description", "A synthetic model for benchmarking."),
+        ("-> model authors", "\r\n".join(authors) or "_No response_"),
+        ("-> scientific keywords", ", ".join(f"keyword{i}" for i in range(10))),
+        ("-> funder", ", ".join(funders) or "_No response_"),
+        ("-> include model code ?", "- [X] yes\n- [ ] no"),
+        ("-> model code URI/DOI", "https://example.org/code"),
+        ("-> include model output data?", "- [X] yes\n- [ ] no"),
+        ("-> model output URI/DOI", "https://example.org/output"),
+        ("-> software framework DOI/URI", "https://doi.org/10.5281/zenodo.1000000"),
+        ("-> software framework source repository", "https://example.org/software"),
+        ("-> name of primary software framework (e.g. Underworld, ASPECT, Badlands, OpenFOAM)", "_No response_"),
+        ("-> software framework authors", "\r\n".join(software_authors) or "_No response_"),
+        ("-> software & algorithm keywords", "finite element"),
+        ("-> computer URI/DOI", "https://example.org/computer"),
+        ("-> add landing page image and caption", "![landing](https://example.org/landing.png)\r\nA caption"),
+        ("-> add an animation (if relevant)", "_No response_"),
+        ("-> add a graphic abstract figure (if relevant)", "![abstract](https://example.org/abstract.png)\r\nA caption"),
+        ("-> add a model setup figure (if relevant)", "_No response_"),
+        ("-> add a description of your model setup", "A model setup"),
+    ]
+    return "".join(f"### {key}\n\n{value}\n\n" for key, value in fields)
+
+
+def orcid_record(orcid_id):
+    """
+    A public ORCID record, in the shape returned by pub.orcid.org/v3.0/<orcid>.
+    """
+    return {
+        "orcid-identifier": {"uri": f"https://orcid.org/{orcid_id}", "path": orcid_id},
+        "person": {"name": {"given-names": {"value": f"Given {orcid_id[-4:]}"}, "family-name": {"value": f"Family {orcid_id[-4:]}"}}},
+        "activities-summary": {
+            "employments": {"affiliation-group": [
+                {"summaries": [{"employment-summary": {"end-date": None, "organization": {"name": f"Organization {i}"}}}]}
+                for i in range(3)
+            ]},
+            "works": {"group": [{"work-summary": [{"title": {"title": {"value": "w" * 100}}}]} for _ in range(50)]},
+        },
+    }
+
+
+def crossref_record(doi, n_authors=10, n_references=300):
+    """
+    A Crossref work, in the shape returned by api.crossref.org/works/<doi>.
+    """
+    return {"status": "ok", "message": {
+        "URL": f"http://dx.doi.org/{doi}",
+        "title": ["A synthetic publication"],
+        "published": {"date-parts": [[2020, 1, 1]]},
+        "publisher": "Synthetic Publisher",
+        "author": [{"given": f"Given{i}", "family": f"Family{i}", "ORCID": f"http://orcid.org/{orcid(i)}",
+                    "affiliation": [{"name": f"Organization {i % 7}"}]} for i in range(n_authors)],
+        "abstract": "<jats:p>" + "y" * 2000 + "</jats:p>",
+        "funder": [{"name": "Synthetic Funder"}],
+        "reference": [{"key": f"ref{i}", "unstructured": "r" * 200} for i in range(n_references)],
+    }}
+
+
+def zenodo_record(record_id, n_authors=10):
+    """
+    A Zenodo record, in the shape returned by zenodo.org/api/records/<id>.
+    """
+    return {
+        "doi_url": f"https://doi.org/10.5281/zenodo.{record_id}",
+        "title": "Synthetic software",
+        "metadata": {"version": "1.0", "creators": [
+            {"name": f"Family{i}, Given{i}", "orcid": orcid(i), "affiliation": f"Organization {i % 7}"} for i in range(n_authors)
+        ]},
+    }
+
+
+def ror_record(ror_id):
+    """
+    A ROR organization, in the shape returned by api.ror.org/organizations/<id>.
+    """
+    return {"id": f"https://ror.org/{ror_id}", "name": f"Organization {ror_id}", "links": [f"https://{ror_id}.example.org"]}
+
+
+def crate_template():
+    """
+    A minimal M@TE RO-Crate template with the entities targeted by the default crosswalk mappings.
+    """
+    return {"@context": "https://w3id.org/ro/crate/1.1/context", "@graph": [
+        {"@id": "ro-crate-metadata.json", "@type": "CreativeWork", "about": {"@id": "./"}, "conformsTo": {"@id": "https://w3id.org/ro/crate/1.1"}},
+        {"@id": "./", "@type": "Dataset", "name": None,
+         "hasPart": [{"@id": "model_inputs"}, {"@id": "model_outputs"}, {"@id": "website_material"}],
+         "publisher": {"@type": "Organization", "name": "AuScope", "url": "https://auscope.org.au"}},
+        {"@id": "model_inputs", "@type": "Dataset", "description": "Model inputs"},
+        {"@id": "model_outputs", "@type": "Dataset", "description": "Model outputs"},
+        {"@id": "website_material", "@type": "Dataset", "description": "Website material"},
+        {"@id": "#datasetCreation", "@type": "CreateAction", "description": "Creation of the model outputs"},
+    ]}
+
+
+def crate(n_files=1000, n_authors=10, depth=0, seed=0):
+    """
+    Builds an unflattened RO-Crate: the crate template with n_files File entities nested in
+    model_outputs, each with nested authors and affiliations (some without '@id').
+
+    Parameters:
+    - n_files (int): number of File entities.
+    - n_authors (int): number of distinct authors shared between the files.
+    - depth (int): if non-zero, adds a chain of Datasets nested this many levels deep.
+    - seed (int): random seed.
+
+    Returns:
+    - dict: the crate.
+    """
+    rnd = random.Random(seed)
+    authors = [person(rnd, i, n_affiliations=1) for i in range(n_authors)]
+    data = crate_template()
+    outputs = data["@graph"][3]
+    outputs["hasPart"] = [
+        {"@id": f"model_outputs/file_{i:06d}.h5", "@type": "File", "name": f"file_{i:06d}.h5",
+         "contentSize": rnd.randrange(10 ** 9), "author": [dict(rnd.choice(authors)) for _ in range(2)]}
+        for i in range(n_files)
+    ]
+    if depth:
+        data["@graph"][2]["hasPart"] = nested(depth)
+    return data
@@ -0,0 +1,152 @@
+import base64
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import span
+
+# Number of blobs uploaded at once
+MAX_WORKERS = int(os.getenv("BULK_COMMIT_MAX_WORKERS", 8))
+
+# Regular (non-executable) file mode in git trees
+FILE_MODE = "100644"
+
+
+class GitHubBackend:
+    """
+    Writes git objects to a GitHub repository through the Git Data API (blobs, trees, commits, refs).
+
+    Parameters:
+    - repo (github.Repository.Repository): the repository to write to.
+    - branch (str, optional): branch to commit to. Defaults to the repository's default branch.
+    """
+
+    def __init__(self, repo, branch=None):
+        self.repo = repo
+        self.branch = branch or repo.default_branch
+        self._ref = None
+
+    def head(self):
+        self._ref = self.repo.get_git_ref(f"heads/{self.branch}")
+        return self.repo.get_git_commit(self._ref.object.sha)
+
+    def base_tree(self, parent):
+        return parent.tree
+
+    def create_blob(self, content):
+        return self.repo.create_git_blob(base64.b64encode(content).decode("ascii"), "base64").sha
+
+    def create_tree(self, entries, base_tree):
+        from github import InputGitTreeElement
+
+        elements = [InputGitTreeElement(path, FILE_MODE, "blob", sha=sha) for path, sha in entries]
+        return self.repo.create_git_tree(elements, base_tree)
+
+    def create_commit(self, message, tree, parent):
+        return self.repo.create_git_commit(message, tree, [parent])
+
+    def update_ref(self, commit):
+        self._ref.edit(commit.sha)
+        return commit.sha
+
+
+class LocalGitBackend:
+    """
+    Writes git objects to a local (bare) git repository with git plumbing commands.
+    A stand-in for GitHubBackend, e.g. for testing without touching GitHub.
+
+    Parameters:
+    - git_dir (str): path to the git directory (a bare repository, or a repository's .git).
+    - branch (str, optional): branch to commit to. Defaults to the branch HEAD points at.
+    """
+
+    def __init__(self, git_dir, branch=None):
+        self.git_dir = git_dir
+        self.branch = branch or self.git("symbolic-ref", "--short", "HEAD")
+        self._head = None
+
+    def git(self, *args, input=None, env=None):
+        result = subprocess.run(["git", "--git-dir", self.git_dir, *args], input=input, env=env,
+                                capture_output=True, check=True)
+        return result.stdout.decode().strip()
+
+    def head(self):
+        try:
+            self._head = self.git("rev-parse", "--verify", "-q", f"refs/heads/{self.branch}")
+        except subprocess.CalledProcessError:
+            self._head = None
+        return self._head
+
+    def base_tree(self, parent):
+        if parent is None:
+            return None
+        return self.git("rev-parse", f"{parent}^{{tree}}")
+
+    def create_blob(self, content):
+        return self.git("hash-object", "-w", "--stdin", input=content)
+
+    def create_tree(self, entries, base_tree):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, GIT_INDEX_FILE=os.path.join(tmp, "index"))
+            if base_tree is not None:
+                self.git("read-tree", base_tree, env=env)
+            for path, sha in entries:
+                self.git("update-index", "--add", "--cacheinfo", f"{FILE_MODE},{sha},{path}", env=env)
+            return self.git("write-tree", env=env)
+
+    def create_commit(self, message, tree, parent):
+        env = dict(os.environ)
+        env.setdefault("GIT_AUTHOR_NAME", "mate-bot")
+        env.setdefault("GIT_AUTHOR_EMAIL", "mate-bot@users.noreply.github.com")
+        env.setdefault("GIT_COMMITTER_NAME", env["GIT_AUTHOR_NAME"])
+        env.setdefault("GIT_COMMITTER_EMAIL", env["GIT_AUTHOR_EMAIL"])
+        parents = ["-p", parent] if parent is not None else []
+        return self.git("commit-tree", tree, *parents, "-m", message, env=env)
+
+    def update_ref(self, commit):
+        old = [self._head] if self._head is not None else []
+        self.git("update-ref", f"refs/heads/{self.branch}", commit, *old)
+        return commit
+
+
+def commit_files(backend, files, message, max_workers=MAX_WORKERS):
+    """
+    Writes several files to a repository as a single commit.
+
+    Blobs are uploaded in parallel, then one tree (on top of the current tree) and one commit are
+    created and the branch ref is moved once. Compared with one create_file call per file, this
+    makes one commit instead of N and avoids the Contents API's per-file commits.
+
+    Parameters:
+    - backend: a GitHubBackend or LocalGitBackend.
+    - files (dict): file contents (str or bytes) keyed by path in the repository.
+    - message (str): the commit message.
+    - max_workers (int): number of blobs uploaded at once.
+
+    Returns:
+    - str: the sha of the new commit, or None if there were no files to write.
+    """
+
+    if not files:
+        return None
+
+    paths = list(files)
+    contents = [files[path].encode() if isinstance(files[path], str) else files[path] for path in paths]
+
+    def create_blob(path, content):
+        with span("github create blob", "github", path=path, bytes=len(content)):
+            return backend.create_blob(content)
+
+    with span("github create blobs", "github", files=len(paths)):
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            blob_shas = list(executor.map(create_blob, paths, contents))
+
+    with span("github read head", "github"):
+        parent = backend.head()
+    with span("github create tree", "github"):
+        tree = backend.create_tree(list(zip(paths, blob_shas)), backend.base_tree(parent))
+    with span("github create commit", "github"):
+        commit = backend.create_commit(message, tree, parent)
+    with span("github update ref", "github"):
+        return backend.update_ref(commit)
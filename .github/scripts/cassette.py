@@ -0,0 +1,230 @@
+import atexit
+import base64
+import datetime
+import json
+import os
+import threading
+from collections import defaultdict
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from stream_tap import tap
+
+# Bump when the layout of the cassette file changes
+CASSETTE_VERSION = 1
+
+# Response headers not worth keeping in a cassette
+DROPPED_HEADERS = {"set-cookie", "date", "connection", "keep-alive", "transfer-encoding", "content-encoding"}
+
+MODES = ("record", "replay")
+
+
+class CassetteMiss(requests.exceptions.ConnectionError):
+    """
+    Raised in replay mode for a request that is not in the cassette. It is a ConnectionError, so
+    callers handle it as they would an unreachable server; replay never falls through to the network.
+    """
+
+
+class Cassette:
+    """
+    The HTTP responses seen while processing a submission, so they can be replayed without the network.
+
+    Responses are keyed by method and URL. If the same request was answered several times, the answers
+    are replayed in the order they were recorded, and the last one is repeated after that.
+
+    Parameters:
+    - path (str): the cassette file.
+    - meta (dict, optional): extra data stored with the responses (e.g. the issue body).
+    """
+
+    def __init__(self, path, meta=None):
+        self.path = path
+        self.meta = meta or {}
+        self.interactions = []
+        self._by_request = defaultdict(list)
+        self._replayed = defaultdict(int)
+        self.misses = []
+        self._recording = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Cassette {path} has version {data.get('version')}, expected {CASSETTE_VERSION}")
+        cassette = cls(path, data.get("meta"))
+        for interaction in data["interactions"]:
+            cassette.interactions.append(interaction)
+            cassette._by_request[(interaction["method"], interaction["url"])].append(interaction)
+        return cassette
+
+    def save(self):
+        # streamed responses still open are kept with the part of the body read so far
+        with self._lock:
+            recording = list(self._recording)
+        for stream_tap in recording:
+            stream_tap.end(False)
+
+        with self._lock:
+            data = {"version": CASSETTE_VERSION, "recorded_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    "meta": self.meta, "interactions": self.interactions}
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(data, f, indent=1)
+
+    def add(self, method, url, status, reason, headers, content, partial=False):
+        """
+        Adds a response to the cassette. partial marks a streamed response whose caller stopped
+        reading before the end of the body: only the part read is kept.
+        """
+        interaction = {"method": method, "url": url, "status": status, "reason": reason,
+                       "headers": {k: v for k, v in headers.items() if k.lower() not in DROPPED_HEADERS}}
+        interaction.update(encode_body(content, partial))
+        with self._lock:
+            self.interactions.append(interaction)
+            self._by_request[(method, url)].append(interaction)
+        return interaction
+
+    def find(self, method, url):
+        """
+        Returns the next recorded interaction for a request, or None (the request is added to misses).
+        """
+        with self._lock:
+            matches = self._by_request.get((method, url))
+            if not matches:
+                self.misses.append((method, url))
+                return None
+            n = self._replayed[(method, url)]
+            self._replayed[(method, url)] = n + 1
+            return matches[min(n, len(matches) - 1)]
+
+    def record_stream(self, request, response):
+        """
+        Records a streamed response as its caller reads it (see stream_tap.py). The interaction is added
+        when the headers arrive, so it keeps its place among the others (a hedged request's winner comes
+        before the loser it replaces); its body is the part read when the caller closes the response, or
+        when the cassette is saved, whichever comes first.
+        """
+        chunks = []
+        interaction = self.add(request.method, request.url, response.status_code, response.reason, response.headers, b"", partial=True)
+
+        def finish(complete):
+            with self._lock:
+                self._recording.discard(stream_tap)
+                interaction.pop("partial", None)
+                interaction.update(encode_body(b"".join(chunks), not complete))
+
+        stream_tap = tap(response, chunks.append, finish)
+        with self._lock:
+            self._recording.add(stream_tap)
+        return response
+
+
+def encode_body(content, partial=False):
+    """
+    Returns the fields of an interaction that hold a response body.
+    """
+    try:
+        fields = {"body": content.decode("utf-8"), "encoding": "utf-8"}
+    except UnicodeDecodeError:
+        fields = {"body": base64.b64encode(content).decode("ascii"), "encoding": "base64"}
+    if partial:
+        fields["partial"] = True
+    return fields
+
+
+def build_response(request, interaction):
+    """
+    Builds a requests.Response from a recorded interaction. The body is already in memory, so
+    streamed reads (iter_content) work as they would on a live response.
+    """
+    content = interaction["body"].encode("utf-8") if interaction["encoding"] == "utf-8" else base64.b64decode(interaction["body"])
+
+    response = requests.models.Response()
+    response.status_code = interaction["status"]
+    response.reason = interaction["reason"]
+    response.headers = CaseInsensitiveDict(interaction["headers"])
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response._content = content
+    response._content_consumed = True
+    response.elapsed = datetime.timedelta(0)
+    return response
+
+
+class CassetteAdapter(HTTPAdapter):
+    """
+    Transport adapter that records responses into a cassette, or replays them from it.
+
+    Streamed requests (stream=True) are recorded as they are read, so a probe that reads a few bytes, or a
+    download given up at its size cap, transfers no more than it would without the cassette; their replay
+    holds the bytes that were read, which is what the same caller reads again.
+
+    Parameters:
+    - cassette (Cassette): the cassette to record into or replay from.
+    - mode (str): 'record' (send each request and keep its response) or 'replay' (never touch the network).
+    """
+
+    def __init__(self, cassette, mode, **kwargs):
+        if mode not in MODES:
+            raise ValueError(f"Cassette mode must be one of {MODES}, not `{mode}`")
+        super().__init__(**kwargs)
+        self.cassette = cassette
+        self.mode = mode
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if self.mode == "replay":
+            interaction = self.cassette.find(request.method, request.url)
+            if interaction is None:
+                raise CassetteMiss(f"No recorded response for {request.method} {request.url}", request=request)
+            return build_response(request, interaction)
+
+        response = super().send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        if stream:
+            return self.cassette.record_stream(request, response)
+
+        # read the whole body so it can be kept; the caller gets a copy built from the recording
+        content = response.content
+        interaction = self.cassette.add(request.method, request.url, response.status_code, response.reason, response.headers, content)
+        response.close()
+        return build_response(request, interaction)
+
+
+def mount(session, cassette, mode, **adapter_kwargs):
+    """
+    Routes every http(s) request of a session through a CassetteAdapter.
+    adapter_kwargs are passed on to HTTPAdapter (e.g. pool sizes).
+    """
+    adapter = CassetteAdapter(cassette, mode, **adapter_kwargs)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def mount_from_env(session, **adapter_kwargs):
+    """
+    Mounts the cassette configured by HTTP_CASSETTE (path) and HTTP_CASSETTE_MODE (record or replay)
+    on a session. In record mode the cassette is saved when the process exits.
+
+    Returns:
+    The Cassette, or None if HTTP_CASSETTE is not set.
+    """
+    path = os.getenv("HTTP_CASSETTE")
+    if not path:
+        return None
+
+    mode = os.getenv("HTTP_CASSETTE_MODE", "replay")
+    if mode == "record":
+        cassette = Cassette(path)
+        atexit.register(cassette.save)
+    else:
+        cassette = Cassette.load(path)
+    mount(session, cassette, mode, **adapter_kwargs)
+    return cassette
@@ -1,9 +1,18 @@
-import requests
+from asset_store import default_store
+from bulk_commit import GitHubBackend, commit_files
 
-def copy_files(repo, directory, issue_dict):
+def collect_files(directory, issue_dict, store=None):
+	# Files were already downloaded into the asset store while parsing the issue
+	store = default_store() if store is None else store
 	file_keys = ["landing_image", "animation", "graphic_abstract", "model_setup_figure"]
 
+	files = {}
 	for file_key in file_keys:
 		if file_key in issue_dict:
-			response = requests.get(issue_dict[file_key]["url"])
-			repo.create_file(directory+issue_dict[file_key]["filename"], "add "+issue_dict[file_key]["filename"], response.content)
+			files[directory+issue_dict[file_key]["filename"]] = store.read(issue_dict[file_key]["url"])
+	return files
+
+def copy_files(repo, directory, issue_dict, store=None):
+	# Write all files in a single commit
+	files = collect_files(directory, issue_dict, store)
+	commit_files(GitHubBackend(repo), files, "add website files")
@@ -1,7 +1,7 @@
 #provides a mapping between keys in metadata (left)
 #and keys in issue dictionary (which are the values in the mapping)
 #None value indicate default values or properties which we not attempt to automatically fill
-#this needs to refactored so that it looks for the approapriate @id
+#the "@id" of each mapping selects the crate entity it is applied to (see dict_to_ro_crate_mapping)
 
 root_node_mapping = {"@id":"./",
             "@type":None,
@@ -33,6 +33,8 @@ model_inputs_node_mapping = {"@id":"model_inputs",
             "version":None,
             "programmingLanguage":None,
             "owl:sameAs":"model_code_uri",
+            "contentSize":"model_code_size",
+            "encodingFormat":"model_code_format",
             "keywords":None,
             "runtimePlatform":None,
             "memoryRequirements":None,
@@ -48,6 +50,8 @@ model_outputs_node_mapping = {"@id":"model_outputs",
             "version":None,
             "programmingLanguage":None,
             "fileFormat":None,
+            "contentSize":"model_output_size",
+            "encodingFormat":"model_output_format",
             }
 
 website_material_node_mapping = {"@id":"website_material",
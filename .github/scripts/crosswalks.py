@@ -1,7 +1,10 @@
 import json
 from ro_crate_utils import *
+from ro_crate_utils import filter_entities as filter_entity_keys
 from crosswalk_mappings import *
+from tracing import span, traced
 
+@traced(cat="report")
 def dict_to_report(issue_dict):
 
     #############
@@ -198,6 +201,7 @@ def dict_to_report(issue_dict):
     return report
     
 
+@traced(cat="crate")
 def dict_to_metadata(issue_dict, mapping_list=default_issue_entity_mapping_list, filter_entities=True, flat_compact_crate=True):
     
     """
@@ -226,23 +230,28 @@ def dict_to_metadata(issue_dict, mapping_list=default_issue_entity_mapping_list,
     
     #this takes the issue_dict and simplifies entities (e.g. @Type=Person) using templates defined at:
     #https://github.com/ModelAtlasofTheEarth/metadata_schema/blob/main/mate_ro_crate/type_templates.json
+    #the filtered copy leaves the caller's issue_dict unchanged (e.g. for copy_files)
     if filter_entities is True:
-        entity_template = load_entity_template()
-        recursively_filter_key(issue_dict, entity_template)
+        with span("filter entities", "crate"):
+            entity_template = compile_entity_template(load_entity_template())
+            issue_dict = filter_entity_keys(issue_dict, entity_template, copy=True)
     
     #load the RO-Crate template
-    ro_crate = load_crate_template()
+    with span("load crate template", "crate"):
+        ro_crate = load_crate_template()
     
     #Apply direct mappings between the issue_dict and the RO-Crate
-    dict_to_ro_crate_mapping(ro_crate, issue_dict,  mapping_list)
+    with span("map to crate", "crate"):
+        dict_to_ro_crate_mapping(ro_crate, issue_dict,  mapping_list)
     
-    #Add any further direct chnages to the RO-Crate based on issue_dict
-    customise_ro_crate(issue_dict, ro_crate)
+        #Add any further direct chnages to the RO-Crate based on issue_dict
+        customise_ro_crate(issue_dict, ro_crate)
     
     
     #flatten the crate (brings nested entities to the top level)
     if flat_compact_crate is True:
-        flatten_crate(ro_crate)
+        with span("flatten crate", "crate"):
+            flatten_crate(ro_crate)
 
     metadata_out = json.dumps(ro_crate)
 
@@ -0,0 +1,155 @@
+"""
+Resolves DOIs of any registration agency, sending each one straight to the API that holds its metadata.
+
+The registration agency (RA) of a DOI is a property of its prefix (10.1029 is Crossref's, 10.5281
+DataCite's), so it is looked up once per prefix at doi.org/ra/ and remembered: in memory, and in the
+response cache (see record_cache.py), which the workflows keep between runs. Each DOI is then fetched
+in one request:
+- Zenodo DOIs (10.5281/zenodo.N) and Zenodo record URLs: the Zenodo API, as before.
+- Crossref DOIs: the Crossref API.
+- DataCite DOIs (Figshare, Pangaea, NCI, ...): the DataCite REST API.
+- DOIs of any other agency (mEDRA, JaLC, ...): CSL JSON by content negotiation at doi.org.
+
+Usage:
+    python .github/scripts/doi_resolver.py DOI [--software]
+"""
+import argparse
+import json
+import re
+import threading
+
+from improved_request_utils import get_record
+from parse_metadata_utils import parse_csl, parse_datacite, parse_publication, parse_software
+from tracing import span
+
+# Agencies of the prefixes most submissions use, so they need no lookup
+KNOWN_AGENCIES = {"10.5281": "DataCite", "10.1029": "Crossref"}
+
+DOI_PATTERN = re.compile(r"\b(10\.\d{4,9}/\S+)")
+ZENODO_RECORD = re.compile(r"zenodo\.org/(?:records?|doi/10\.5281/zenodo\.)/?(\d+)|\bzenodo\.(\d+)", re.IGNORECASE)
+
+# Parser of the records of each route
+PARSERS = {"publication": parse_publication, "software": parse_software, "datacite": parse_datacite, "doi": parse_csl}
+
+_agencies = dict(KNOWN_AGENCIES)
+_agencies_lock = threading.Lock()
+
+
+def normalize_doi(value):
+    """
+    Returns the DOI in a DOI, DOI URL or Zenodo record URL, lower-cased, or None if there is none.
+    """
+    value = value.strip()
+    match = ZENODO_RECORD.search(value)
+    if match:
+        return f"10.5281/zenodo.{match.group(1) or match.group(2)}"
+    match = DOI_PATTERN.search(value)
+    if match:
+        return match.group(1).rstrip(".,;").lower()
+    return None
+
+
+def registration_agency(doi):
+    """
+    Returns the registration agency of a DOI's prefix (e.g. 'Crossref', 'DataCite') and a log.
+    The agency is None if it cannot be found.
+    """
+    prefix = doi.split("/", 1)[0]
+    with _agencies_lock:
+        agency = _agencies.get(prefix)
+    if agency is not None:
+        return agency, ""
+
+    answer, log = get_record("doi_ra", prefix)
+    if answer is None:
+        return None, log
+    try:
+        agency = answer[0]["RA"]
+    except (IndexError, KeyError, TypeError):
+        return None, f"Error: no registration agency found for DOI prefix `{prefix}` \n"
+
+    with _agencies_lock:
+        _agencies[prefix] = agency
+    return agency, ""
+
+
+def route(doi):
+    """
+    Returns the record type of improved_request_utils.get_record that holds a DOI's metadata,
+    the identifier to fetch, and a log. The record type is None if the DOI's agency is unknown.
+    """
+    zenodo = re.fullmatch(r"10\.5281/zenodo\.(\d+)", doi)
+    if zenodo:
+        return "software", zenodo.group(1), ""
+
+    agency, log = registration_agency(doi)
+    if agency == "Crossref":
+        return "publication", doi, log
+    if agency == "DataCite":
+        return "datacite", doi, log
+    if agency is None:
+        return None, doi, log
+    return "doi", doi, log
+
+
+def resolve_doi(value, schema_type="ScholarlyArticle"):
+    """
+    Fetches the metadata of a DOI from the API of its registration agency and parses it.
+
+    Parameters:
+    - value (str): a DOI, DOI URL or Zenodo record URL.
+    - schema_type (str): 'ScholarlyArticle' or 'SoftwareApplication', the schema.org type to build.
+
+    Returns:
+    A tuple of the schema.org record (empty if it could not be resolved) and an error message.
+    """
+    doi = normalize_doi(value)
+    if doi is None:
+        return {}, f"Error: `{value}` is not a DOI \n"
+
+    record_type, record_id, log = route(doi)
+    if record_type is None:
+        return {}, log
+    with span("resolve_doi", "http", doi=doi, route=record_type):
+        metadata, get_log = get_record(record_type, record_id)
+    log += get_log
+    if metadata is None:
+        return {}, log
+
+    # the DataCite and CSL parsers build the requested type; Crossref works and Zenodo records have their own
+    if record_type in ("datacite", "doi"):
+        record, parse_log = PARSERS[record_type](metadata, schema_type)
+    elif record_type == "publication" and schema_type != "ScholarlyArticle":
+        # software registered with Crossref: its work record has the fields of CSL JSON
+        record, parse_log = parse_csl(metadata.get("message", {}), schema_type)
+    else:
+        record, parse_log = PARSERS[record_type](metadata)
+    return record, log + parse_log
+
+
+def resolve_publication(value):
+    return resolve_doi(value, "ScholarlyArticle")
+
+
+def resolve_software(value):
+    return resolve_doi(value, "SoftwareApplication")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("doi", help="DOI, DOI URL or Zenodo record URL")
+    parser.add_argument("--software", action="store_true", help="build a SoftwareApplication rather than a ScholarlyArticle")
+    args = parser.parse_args()
+
+    doi = normalize_doi(args.doi)
+    if doi is not None:
+        record_type, record_id, _ = route(doi)
+        print(f"{doi} -> {record_type} {record_id}")
+    record, log = resolve_software(args.doi) if args.software else resolve_publication(args.doi)
+    print(json.dumps(record, indent=2))
+    if log:
+        print(log)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import filetype
 
-# Hack to suport SVG files
+# Hack to suport SVG files (sniffed from the start of the file)
 # Are there any other files that filetype doesn't natively recognise?
 class Svg(filetype.Type):
     MIME = 'image/svg+xml'
@@ -13,4 +13,6 @@ class Svg(filetype.Type):
             )
 
     def match(self, buf):
-        return False
+        # SVG is XML text: look for an <svg> root element at the start of the file
+        head = bytes(buf[:1024]).lstrip().lower()
+        return head.startswith(b"<svg") or (head.startswith(b"<?xml") and b"<svg" in head)
@@ -1,11 +1,19 @@
 import json
-import subprocess
 import os
 import re
-from github import Github, Auth
+from tracing import traced
 
-def run_command_check_output(cmd):
-	return subprocess.check_output(cmd, shell=True, stderr=open(os.devnull))
+# Owner of the model repositories
+OWNER = "hvidy"
+
+# GitHub API endpoint (GitHub Actions sets GITHUB_API_URL; point it at a stand-in server to run offline)
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+
+# Timeout for requests to the GitHub API
+TIMEOUT = 10
+
+# Repo names ending in _<n> (no leading zeros), as produced by encode
+SUFFIX_PATTERN = re.compile(r"(?P<name>.+)_(?P<i>[1-9]\d*)")
 
 def encode(name, i):
 	result_str = name
@@ -14,34 +22,154 @@ def encode(name, i):
 	return result_str
 
 
-def exists(model_id):
-	cmd = "curl https://api.github.com/repos/hvidy/{0}".format(model_id)
-	output = json.loads(run_command_check_output(cmd))
+class SlugAllocator:
+	"""
+	Allocates model repo names by listing the owner's repositories once rather than probing each candidate.
+
+	Repository names are indexed by base name, so that the next free suffix `_1`, `_2`, ... for a
+	proposed slug is computed locally. The listing is paginated and authenticated, and each page is
+	cached on disk with its ETag (if cache_path is given) so that unchanged pages cost a 304.
+
+	Parameters:
+	- owner (str): user or organisation owning the model repos.
+	- token (str, optional): GitHub token used to authenticate the listing.
+	- cache_path (str, optional): JSON file in which listed pages and their ETags are kept between runs.
+	- session (optional): a requests.Session used to call the API. Defaults to the shared transport's.
+	"""
+
+	def __init__(self, owner=OWNER, token=None, cache_path=None, session=None):
+		self.owner = owner
+		self.token = token
+		self.cache_path = cache_path
+		if session is None:
+			from transport import get_session
+			session = get_session()
+		self.session = session
+		self.index = None
+
+	@traced("list_repos", "github")
+	def list_repos(self):
+		"""
+		Returns the names of all of the owner's repositories, one API call per page of 100.
+		"""
+		cache = {}
+		if self.cache_path and os.path.exists(self.cache_path):
+			with open(self.cache_path) as f:
+				cache = json.load(f)
+
+		headers = {"Accept": "application/vnd.github+json"}
+		if self.token:
+			headers["Authorization"] = f"Bearer {self.token}"
+
+		names = []
+		url = f"{GITHUB_API_URL}/users/{self.owner}/repos?type=owner&per_page=100"
+		pages = {}
+		while url:
+			page_headers = dict(headers)
+			if url in cache and cache[url]["etag"]:
+				page_headers["If-None-Match"] = cache[url]["etag"]
+
+			response = self.session.get(url, headers=page_headers, timeout=TIMEOUT)
+			if response.status_code == 304:
+				page = cache[url]
+			else:
+				response.raise_for_status()
+				page = {"etag": response.headers.get("ETag"),
+						"names": [repo["name"] for repo in response.json()],
+						"next": response.links.get("next", {}).get("url")}
+
+			pages[url] = page
+			names += page["names"]
+			url = page["next"]
+
+		if self.cache_path:
+			if os.path.dirname(self.cache_path):
+				os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+			with open(self.cache_path, "w") as f:
+				json.dump(pages, f)
 
-	if "message" in output:
-		if output["message"] == "Not Found":
-			return False
-		else:
-			return True
-	else:
-		return True
+		return names
+
+	def load(self):
+		names = self.list_repos()
+		self.index = {}
+		for name in names:
+			self.add(name)
+
+	def add(self, model_id):
+		"""
+		Records a repo name as taken. GitHub repo names are case-insensitive.
+		"""
+		model_id = model_id.lower()
+		self.index.setdefault(model_id, set()).add(0)
+		match = SUFFIX_PATTERN.fullmatch(model_id)
+		if match:
+			self.index.setdefault(match["name"], set()).add(int(match["i"]))
+
+	def exists(self, model_id):
+		if self.index is None:
+			self.load()
+		match = SUFFIX_PATTERN.fullmatch(model_id.lower())
+		if match:
+			return int(match["i"]) in self.index.get(match["name"], set())
+		return 0 in self.index.get(model_id.lower(), set())
+
+	def choice(self, name):
+		"""
+		Returns the first of name, name_1, name_2, ... that is not already a repo name.
+		"""
+		if self.index is None:
+			self.load()
+		taken = self.index.get(name.lower(), set())
+		i = 0
+		while i in taken:
+			i += 1
+		return encode(name, i)
+
+
+_default_allocator = None
+
+def default_allocator():
+	"""
+	The allocator shared within a process, authenticated with GITHUB_TOKEN and cached at SLUG_INDEX_CACHE.
+	It lists repositories through the shared transport.
+	"""
+	global _default_allocator
+	if _default_allocator is None:
+		_default_allocator = SlugAllocator(token=os.environ.get("GITHUB_TOKEN"), cache_path=os.environ.get("SLUG_INDEX_CACHE"))
+	return _default_allocator
+
+def allocate_slug(proposed_slug, allocator=None):
+	"""
+	Returns the model repo name to use for a proposed slug: the slug itself if it is free,
+	otherwise the slug with the first free `_<n>` suffix.
+
+	Parameters:
+	- proposed_slug (str): the slug proposed in the issue.
+	- allocator (SlugAllocator, optional): allocator to use. Defaults to the shared default_allocator().
+
+	Returns:
+	- str: the repo name.
+	"""
+	allocator = default_allocator() if allocator is None else allocator
+	return allocator.choice(proposed_slug.strip())
+
+def exists(model_id):
+	return default_allocator().exists(model_id)
 
 def choice(name):
-	i = 0
-	while True:
-		model_id = encode(name, i)
-		if not exists(model_id):
-			return model_id
-		i += 1
+	return allocate_slug(name)
 
 
 if __name__ == "__main__":
+	from github import Github, Auth
+
 	token = os.environ.get("GITHUB_TOKEN")
 	issue_number = int(os.environ.get("ISSUE_NUMBER"))
 
 	# Get issue
 	auth = Auth.Token(token)
-	g = Github(auth=auth)
+	g = Github(auth=auth, base_url=GITHUB_API_URL)
 	repo = g.get_repo("hvidy/PIPE-4002-EarthByte-ModelAtlas")
 	issue = repo.get_issue(number = issue_number)
 
@@ -50,5 +178,4 @@ if __name__ == "__main__":
 	regex = r"### *(?P<key>.*?)\s*[\r\n]+(?P<value>[\s\S]*?)(?=###|$)"
 	data = dict(re.findall(regex, issue.body))
 
-	slug = data["-> slug"].strip()
-	print(choice(slug))
\ No newline at end of file
+	print(allocate_slug(data["-> slug"]))
@@ -2,10 +2,20 @@
 import requests
 import logging
 import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
+from json_stream import read_json
+from metrics import host_of, registry as metrics
+from parse_metadata_utils import RECORD_FIELDS
+from record_cache import cache_from_env
+from singleflight import SingleFlight
+from tracing import span
+from transport import get_session, set_session
+from uri_probe import file_properties, probe_uri
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Logging is configured by the entry points (write_report.py, write_metadata.py)
 logger = logging.getLogger(__name__)
 
 # Base URLs configuration
@@ -13,14 +23,97 @@ BASE_URLS = {
     "publication": os.getenv("BASE_URL_PUBLICATION", "https://api.crossref.org/works/"),
     "software": os.getenv("BASE_URL_SOFTWARE", "https://zenodo.org/api/records/"),
     "organization": os.getenv("BASE_URL_ORGANIZATION", "https://api.ror.org/organizations/"),
-    "author": os.getenv("BASE_URL_AUTHOR", "https://pub.orcid.org/v3.0/")
+    "author": os.getenv("BASE_URL_AUTHOR", "https://pub.orcid.org/v3.0/"),
+    # DOIs registered with DataCite, any DOI by content negotiation, and the registration agency of a DOI prefix
+    # (see doi_resolver.py). doi_ra comes before doi, whose base URL is a prefix of it
+    "datacite": os.getenv("BASE_URL_DATACITE", "https://api.datacite.org/dois/"),
+    "doi_ra": os.getenv("BASE_URL_DOI_RA", "https://doi.org/ra/"),
+    "doi": os.getenv("BASE_URL_DOI", "https://doi.org/"),
 }
 
+# Accept header per record type, where it is not plain JSON
+RECORD_ACCEPT = {"doi": "application/vnd.citationstyles.csl+json"}
+
 # Default timeout
 TIMEOUT = int(os.getenv("DEFAULT_TIMEOUT", 10))
 
-# Initialize a requests session
-session = requests.Session()
+# Largest record accepted (bytes); larger responses are abandoned while streaming
+RECORD_MAX_BYTES = int(os.getenv("RECORD_MAX_BYTES", 16 * 1024 * 1024))
+
+# Sections of an ORCID record read by parse_author, and where they sit in the full record. They are
+# fetched instead of the full record, which lists every work and funding of the author.
+ORCID_SECTIONS = {"person": ("person",), "employments": ("activities-summary", "employments")}
+
+# Number of ORCID sections fetched at once, across all authors
+ORCID_MAX_WORKERS = int(os.getenv("ORCID_MAX_WORKERS", 8))
+
+# Lookups use the session of the shared transport (see transport.py), re-exported here as
+# get_session/set_session. The response cache is created on first use, not at import
+_cache = None
+_init_lock = threading.Lock()
+
+def get_cache():
+    """
+    Returns the response cache used by get_record (see record_cache.py), creating it on first use.
+    It is a no-op unless RECORD_CACHE_PATH is set.
+    """
+    global _cache
+    with _init_lock:
+        if _cache is None:
+            _cache = cache_from_env()
+        return _cache
+
+def set_cache(new_cache):
+    """
+    Replaces the response cache used by get_record, e.g. with a SQLiteRecordCache at another path.
+    """
+    global _cache
+    _cache = new_cache
+
+def __getattr__(name):
+    # Keep `improved_request_utils.session` and `.cache` working for callers
+    if name == "session":
+        return get_session()
+    if name == "cache":
+        return get_cache()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Identifier forms accepted by canonical_id
+DOI_PREFIX = re.compile(r"^(?:https?://)?(?:dx\.)?(?:doi\.org/)|^doi:", re.IGNORECASE)
+ORCID_PATTERN = re.compile(r"(\d{4}-\d{4}-\d{4}-\d{3}[0-9Xx])")
+ROR_PREFIX = re.compile(r"^(?:https?://)?(?:www\.)?ror\.org/", re.IGNORECASE)
+
+def canonical_id(record_type, record_id):
+    """
+    Maps the different ways an identifier can be written onto one canonical form, used both
+    to build the request URL and as the key for caching and request coalescing.
+
+    - publication, datacite, doi: DOI without `https://doi.org/`, `dx.doi.org/` or `doi:` prefix, lower-cased
+    - doi_ra: DOI prefix, stripped
+    - author: bare ORCID iD (from an `orcid.org/` URL or bare iD), with an upper-case check digit
+    - organization: bare ROR id (from any `ror.org/` URL form), lower-cased
+    - software: the Zenodo record id, stripped
+
+    Parameters:
+    - record_type (str): The type of the record (e.g., 'publication').
+    - record_id (str): The identifier as given by the user or another API.
+
+    Returns:
+    The canonical identifier (str).
+    """
+
+    record_id = record_id.strip()
+
+    if record_type in ("publication", "datacite", "doi"):
+        record_id = DOI_PREFIX.sub("", record_id).lower()
+    elif record_type == "author":
+        match = ORCID_PATTERN.search(record_id)
+        if match:
+            record_id = match.group(1).upper()
+    elif record_type == "organization":
+        record_id = ROR_PREFIX.sub("", record_id).rstrip("/").lower()
+
+    return record_id
 
 def handle_request_errors(func):
     @wraps(func)
@@ -38,31 +131,145 @@ def handle_request_errors(func):
         return None, "An error occurred during the request."
     return wrapper
 
-@handle_request_errors
+# Coalesces get_record calls for the same canonical identifier; failed lookups are not kept
+inflight = SingleFlight(keep=lambda result: result[0] is not None)
+
 def get_record(record_type, record_id):
     """
     Fetches and returns a record from an API based on the provided record type and ID.
 
+    The identifier is canonicalized first, and concurrent or repeated requests for the same
+    canonical identifier share a single HTTP call and its result.
+
     Parameters:
     - record_type (str): The type of the record to fetch (e.g., 'publication').
-    - record_id (str): The unique identifier for the record.
+    - record_id (str): The unique identifier for the record, in any form accepted by canonical_id.
 
     Returns:
-    The API response as a JSON object.
+    A tuple of the API response as a JSON object (or None) and an error message.
     """
 
     if record_type not in BASE_URLS:
         raise ValueError(f"Record type `{record_type}` not supported")
 
+    record_id = canonical_id(record_type, record_id)
+    with span(f"get_record {record_type}", "http", id=record_id):
+        return inflight.do((record_type, record_id), fetch_record, record_type, record_id)
+
+def get_record_section(record_type, record_id, section):
+    """
+    Fetches one section of a record (e.g. the /person section of an ORCID record), which is cached
+    and coalesced on its own, like a record.
+
+    Returns:
+    A tuple of the section as a JSON object (or None) and an error message.
+    """
+
+    record_id = f"{canonical_id(record_type, record_id)}/{section}"
+    with span(f"get_record {record_type}/{section}", "http", id=record_id):
+        return inflight.do((record_type, record_id), fetch_record, record_type, record_id)
+
+# Fetches the later ORCID sections of an author while the calling thread fetches the first
+_section_pool = None
+
+def section_pool():
+    global _section_pool
+    with _init_lock:
+        if _section_pool is None:
+            _section_pool = ThreadPoolExecutor(max_workers=ORCID_MAX_WORKERS, thread_name_prefix="orcid")
+        return _section_pool
+
+def get_author(orcid):
+    """
+    Fetches the parts of an ORCID record read by parse_author: the /person and /employments sections,
+    concurrently, rather than the full record.
+
+    Parameters:
+    - orcid (str): the ORCID iD, in any form accepted by canonical_id.
+
+    Returns:
+    A tuple of the sections assembled in the layout of the full record (or None if a section could
+    not be fetched) and an error message.
+    """
+
+    orcid = canonical_id("author", orcid)
+    sections = list(ORCID_SECTIONS)
+    with span("get_author", "http", id=orcid):
+        futures = [section_pool().submit(get_record_section, "author", orcid, section) for section in sections[1:]]
+        results = [get_record_section("author", orcid, sections[0])] + [future.result() for future in futures]
+
+    record = {"orcid-identifier": {"uri": f"https://orcid.org/{orcid}", "path": orcid}}
+    for section, (content, log) in zip(sections, results):
+        if content is None:
+            return None, log
+        *parents, key = ORCID_SECTIONS[section]
+        parent = record
+        for name in parents:
+            parent = parent.setdefault(name, {})
+        parent[key] = content
+    return record, ""
+
+@handle_request_errors
+def fetch_record(record_type, record_id):
+    """
+    Fetches and returns a record from an API based on the provided record type and canonical ID.
+
+    Parameters:
+    - record_type (str): The type of the record to fetch (e.g., 'publication').
+    - record_id (str): The canonical identifier for the record.
+
+    Returns:
+    The API response as a JSON object.
+
+    Note:
+    Responses are served from the response cache while fresh, and revalidated with
+    If-None-Match/If-Modified-Since once their TTL has expired.
+    """
+
+    cache = get_cache()
+    host = host_of(BASE_URLS[record_type])
+    entry = cache.get(record_type, record_id)
+    if entry is not None and entry.fresh:
+        cache.count("hits")
+        metrics.cache(host, "hit")
+        return entry.record
+
     url = BASE_URLS[record_type] + record_id
-    headers = {"Content-Type": "application/json"}
+    headers = {"Content-Type": "application/json", "Accept": RECORD_ACCEPT.get(record_type, "application/json")}
+    if entry is not None:
+        headers.update(entry.conditional_headers())
 
-    response = session.get(url, headers=headers, timeout=TIMEOUT)
+    response = get_session().get(url, headers=headers, timeout=TIMEOUT, stream=True)
+    if entry is not None and response.status_code == 304:
+        response.close()
+        cache.count("revalidated")
+        metrics.cache(host, "revalidated")
+        cache.refresh(record_type, record_id)
+        return entry.record
+
+    if response.status_code >= 400:
+        # the body of a streamed error response is not read, so release its connection
+        response.close()
     response.raise_for_status()
-    return response.json()
+    cache.count("misses")
+    metrics.cache(host, "miss")
+    # only the fields read by the record's parser are built (and cached)
+    record = read_json(response, RECORD_FIELDS.get(record_type, True), RECORD_MAX_BYTES)
+    cache.put(record_type, record_id, record, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    return record
 
-@handle_request_errors
 def search_organization(org_url):
+    """
+    Searches for an organization's information based on a provided URL or identifier.
+    Repeated searches for the same URL share one request.
+    """
+
+    key = ("organization_search", org_url.split("://")[-1].rstrip('/').lower())
+    with span("search_organization", "http", url=org_url):
+        return inflight.do(key, fetch_organization_search, org_url)
+
+@handle_request_errors
+def fetch_organization_search(org_url):
 
     """
     Searches for an organization's information based on a provided URL or identifier.
@@ -80,7 +287,7 @@ def search_organization(org_url):
     url = f"{base_url}?query.advanced=links:{org_url}"
     headers = {"Content-Type": "application/json"}
 
-    response = session.get(url, headers=headers, timeout=TIMEOUT)
+    response = get_session().get(url, headers=headers, timeout=TIMEOUT)
     response.raise_for_status()
     return process_search_results(response.json())
 
@@ -94,10 +301,20 @@ def process_search_results(results):
         logger.info("Found more than one ROR record. Please review the results.")
     return results
 
+def probe(uri):
+    """
+    Probes a URI without downloading its body (see uri_probe.probe_uri).
+
+    Returns:
+    A ProbeResult with the status, final URL, content length and content type.
+    """
+    return probe_uri(uri, session=get_session(), timeout=TIMEOUT)
+
 def check_uri(uri):
 
     """
-    Checks the availability or validity of a URI by making an HTTP GET request.
+    Checks the availability or validity of a URI with a HEAD request, falling back to a
+    ranged GET, so that large resources are not downloaded.
 
     Parameters:
     - uri (str): The URI to check.
@@ -106,14 +323,25 @@ def check_uri(uri):
     'OK' if the request is successful, or an error message if not.
     """
 
+    return describe_uri(uri)[0]
+
+def describe_uri(uri):
 
+    """
+    Checks a URI like check_uri, and also describes the file it points to.
+
+    Parameters:
+    - uri (str): The URI to check.
+
+    Returns:
+    A tuple of 'OK' or an error message, and the file's schema.org contentSize and encodingFormat
+    (see uri_probe.file_properties).
+    """
 
-    try:
-        response = session.get(uri, timeout=TIMEOUT)
-        response.raise_for_status()
-        return "OK"
-    except Exception as err:
-        return str(err.args[0])
+    with span("check_uri", "http", uri=uri) as check:
+        result = probe(uri)
+        check.args["status"] = result.status
+    return ("OK" if result.ok else result.error), file_properties(result)
 
 if __name__ == "__main__":
     # Example usage
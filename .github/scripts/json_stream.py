@@ -0,0 +1,145 @@
+"""
+Bounded, projected JSON parsing of API responses.
+
+A projection declares the fields of a record that are read (see parse_metadata_utils.RECORD_FIELDS):
+a dict mapping each kept key to True (keep its whole value) or to the projection of its value. Lists
+are projected element by element, so {"author": {"given": True}} keeps the given name of every author.
+Everything else, e.g. the hundreds of references of a Crossref work, is dropped.
+
+With ijson installed the response is parsed incrementally as it streams in, and dropped fields are
+skipped without being built. Without it, the body is parsed with json.loads and then projected,
+which still keeps dropped fields out of the cache and everything downstream. Either way the body is
+read with a size ceiling, and a response larger than the ceiling is abandoned.
+"""
+import json
+
+import requests
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Errors raised on malformed JSON by json.loads or ijson
+JSON_ERRORS = (ValueError, StopIteration) + ((ijson.JSONError,) if ijson is not None else ())
+
+# Size of the chunks read from the response stream
+CHUNK_SIZE = 64 * 1024
+
+
+class PayloadTooLarge(requests.exceptions.RequestException):
+    """
+    Raised when a response body is larger than the ceiling it is read with.
+    """
+
+
+def project(value, fields):
+    """
+    Returns the part of a parsed JSON value selected by a projection (see the module docstring).
+    """
+    if fields is True:
+        return value
+    if isinstance(value, list):
+        return [project(item, fields) for item in value]
+    if isinstance(value, dict):
+        return {key: project(value[key], sub) for key, sub in fields.items() if key in value}
+    return value
+
+
+class BoundedReader:
+    """
+    File-like view of a streamed response body that raises PayloadTooLarge past max_bytes.
+    """
+
+    def __init__(self, response, max_bytes):
+        self.url = response.url
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+        self._buffer = bytearray()
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self.size += len(chunk)
+            if self.size > self.max_bytes:
+                raise PayloadTooLarge(f"Response from {self.url} is larger than the limit of {self.max_bytes} bytes")
+            self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+def skip(events, event):
+    """
+    Consumes the events of a value that is not kept, without building it.
+    """
+    if event not in ("start_map", "start_array"):
+        return
+    depth = 1
+    for event, _ in events:
+        if event in ("start_map", "start_array"):
+            depth += 1
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+            if depth == 0:
+                return
+
+
+def build(events, event, value, fields):
+    """
+    Builds the projection of the value starting with (event, value) from ijson basic_parse events.
+    """
+    if event == "start_map":
+        obj = {}
+        for event, value in events:
+            if event == "end_map":
+                return obj
+            key = value
+            sub = True if fields is True else fields.get(key)
+            event, value = next(events)
+            if sub is None:
+                skip(events, event)
+            else:
+                obj[key] = build(events, event, value, sub)
+    if event == "start_array":
+        items = []
+        for event, value in events:
+            if event == "end_array":
+                return items
+            items.append(build(events, event, value, fields))
+    return value
+
+
+def read_json(response, fields=True, max_bytes=None):
+    """
+    Parses a (streamed) response body as JSON, keeping only the fields selected by a projection.
+
+    Parameters:
+    - response (requests.Response): the response, preferably requested with stream=True.
+    - fields: a projection, or True to keep the whole document.
+    - max_bytes (int, optional): largest body accepted.
+
+    Returns:
+    The projected JSON value.
+    """
+    declared = response.headers.get("Content-Length", "")
+    if max_bytes is not None and declared.isdigit() and int(declared) > max_bytes:
+        response.close()
+        raise PayloadTooLarge(f"Response from {response.url} is {int(declared)} bytes, larger than the limit of {max_bytes} bytes")
+
+    reader = BoundedReader(response, max_bytes if max_bytes is not None else float("inf"))
+    try:
+        if ijson is not None and fields is not True:
+            events = iter(ijson.basic_parse(reader, use_float=True))
+            event, value = next(events)
+            return build(events, event, value, fields)
+        return project(json.loads(reader.read()), fields)
+    except JSON_ERRORS as e:
+        raise requests.exceptions.InvalidJSONError(f"Invalid JSON from {response.url}: {e}") from e
+    finally:
+        response.close()
@@ -0,0 +1,371 @@
+"""
+Metrics of the HTTP client: per-host request counts, latency histograms, response bytes, status codes,
+retries, hedged requests, timeouts, errors and record cache outcomes.
+
+Requests are measured by a MetricsAdapter wrapped around the adapters of the shared session (see
+transport.py). At the end of a run publish() merges the run into METRICS_FILE,
+so the file aggregates every run that shares it (e.g. through the workflow's .cache), and writes the
+aggregate as Prometheus text to METRICS_PROMETHEUS.
+
+Usage (merge the metrics of several runs, e.g. downloaded from batch jobs):
+    python .github/scripts/metrics.py FILE [FILE ...] [--output FILE] [--prometheus FILE]
+"""
+import argparse
+import bisect
+import json
+import os
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from requests.adapters import BaseAdapter
+from requests.exceptions import ConnectionError, Timeout
+
+from stream_tap import tap
+
+METRICS_FILE = os.getenv("METRICS_FILE")
+METRICS_PROMETHEUS = os.getenv("METRICS_PROMETHEUS")
+
+# Bump when the layout of the metrics file changes
+METRICS_VERSION = 1
+
+# Upper bounds (seconds) of the latency histogram buckets; slower requests fall in a final +Inf bucket
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3, 0.5, 0.75, 1.0,
+                   1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 20.0, 30.0, 60.0)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Counters kept per host, besides requests, status codes and cache outcomes
+COUNTERS = ("bytes", "retries", "hedges", "timeouts", "errors")
+
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets, so histograms of different runs can be added together.
+    Quantiles are estimated by interpolating within the bucket they fall in.
+    """
+
+    def __init__(self, counts=None, total=0.0):
+        self.counts = list(counts) if counts else [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = total
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+
+    def quantile(self, q):
+        """
+        Returns the estimated q-quantile in seconds, or None if nothing was observed.
+        """
+        n = self.count
+        if n == 0:
+            return None
+        rank = q * n
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = LATENCY_BUCKETS[i - 1] if i > 0 else 0.0
+                upper = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else LATENCY_BUCKETS[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return LATENCY_BUCKETS[-1]
+
+
+class HostMetrics:
+    """
+    Everything measured for one host.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.statuses = Counter()
+        self.cache = Counter()
+        self.counters = Counter()
+        self.latency = Histogram()
+
+    def to_dict(self):
+        data = {"requests": self.requests, "statuses": dict(self.statuses), "cache": dict(self.cache)}
+        data.update({name: self.counters[name] for name in COUNTERS})
+        data["latency"] = {"buckets": self.latency.counts, "sum": round(self.latency.total, 6)}
+        data["latency"].update({f"p{round(q * 100)}": self.latency.quantile(q) for q in QUANTILES})
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        host = cls()
+        host.requests = data["requests"]
+        host.statuses.update({str(status): n for status, n in data["statuses"].items()})
+        host.cache.update(data["cache"])
+        host.counters.update({name: data.get(name, 0) for name in COUNTERS})
+        host.latency = Histogram(data["latency"]["buckets"], data["latency"]["sum"])
+        return host
+
+    def merge(self, other):
+        self.requests += other.requests
+        self.statuses.update(other.statuses)
+        self.cache.update(other.cache)
+        self.counters.update(other.counters)
+        self.latency.merge(other.latency)
+
+
+class Registry:
+    """
+    Metrics of every host the process talked to. All methods are thread-safe.
+    """
+
+    def __init__(self):
+        self.hosts = {}
+        self.runs = 1
+        self._lock = threading.Lock()
+
+    def _host(self, host):
+        if host not in self.hosts:
+            self.hosts[host] = HostMetrics()
+        return self.hosts[host]
+
+    def observe(self, host, status, seconds, nbytes):
+        """
+        Records a request that got a response.
+        """
+        with self._lock:
+            metrics = self._host(host)
+            metrics.requests += 1
+            metrics.statuses[str(status)] += 1
+            metrics.counters["bytes"] += nbytes
+            metrics.latency.observe(seconds)
+
+    def count(self, host, name, n=1):
+        """
+        Adds to one of the COUNTERS of a host (e.g. a retry, or a request that timed out).
+        """
+        with self._lock:
+            self._host(host).counters[name] += n
+
+    def cache(self, host, outcome):
+        """
+        Records a record cache outcome (hit, revalidated or miss) for a lookup on a host.
+        """
+        with self._lock:
+            self._host(host).cache[outcome] += 1
+
+    def reset(self):
+        with self._lock:
+            self.hosts = {}
+            self.runs = 1
+
+    def to_dict(self):
+        with self._lock:
+            return {"version": METRICS_VERSION, "runs": self.runs,
+                    "hosts": {host: metrics.to_dict() for host, metrics in sorted(self.hosts.items())}}
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("version") != METRICS_VERSION:
+            raise ValueError(f"Metrics have version {data.get('version')}, expected {METRICS_VERSION}")
+        registry = cls()
+        registry.runs = data["runs"]
+        registry.hosts = {host: HostMetrics.from_dict(metrics) for host, metrics in data["hosts"].items()}
+        return registry
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def merge(self, other):
+        with self._lock:
+            self.runs += other.runs
+            for host, metrics in other.hosts.items():
+                self._host(host).merge(metrics)
+
+    def save(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    def prometheus(self):
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            hosts = sorted(self.hosts.items())
+
+            family("http_client_requests_total", "counter", "Requests that got a response, by host and status code.")
+            for host, metrics in hosts:
+                for status, n in sorted(metrics.statuses.items()):
+                    lines.append(f'http_client_requests_total{{host="{host}",status="{status}"}} {n}')
+
+            for name, help_text in [("bytes", "Bytes of response bodies."), ("retries", "Requests retried."),
+                                    ("hedges", "Slow requests sent a second time."),
+                                    ("timeouts", "Requests that timed out."), ("errors", "Requests that failed without a response.")]:
+                metric = "http_client_response_bytes_total" if name == "bytes" else f"http_client_{name}_total"
+                family(metric, "counter", help_text)
+                for host, metrics in hosts:
+                    lines.append(f'{metric}{{host="{host}"}} {metrics.counters[name]}')
+
+            family("http_client_cache_lookups_total", "counter", "Record lookups by record cache outcome.")
+            for host, metrics in hosts:
+                for outcome, n in sorted(metrics.cache.items()):
+                    lines.append(f'http_client_cache_lookups_total{{host="{host}",result="{outcome}"}} {n}')
+
+            family("http_client_request_duration_seconds", "histogram", "Time until the response was read.")
+            for host, metrics in hosts:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), metrics.latency.counts):
+                    cumulative += count
+                    lines.append(f'http_client_request_duration_seconds_bucket{{host="{host}",le="{bound}"}} {cumulative}')
+                lines.append(f'http_client_request_duration_seconds_sum{{host="{host}"}} {metrics.latency.total:.6f}')
+                lines.append(f'http_client_request_duration_seconds_count{{host="{host}"}} {metrics.latency.count}')
+
+            family("http_client_runs_total", "counter", "Runs aggregated in these metrics.")
+            lines.append(f"http_client_runs_total {self.runs}")
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """
+        Returns a plain-text table with one row per host, slowest total time first.
+        """
+        def ms(seconds):
+            return f"{seconds * 1000:8.0f}" if seconds is not None else f"{'-':>8}"
+
+        with self._lock:
+            hosts = sorted(self.hosts.items(), key=lambda item: item[1].latency.total, reverse=True)
+            rows = [f"{'host':<32} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'KiB':>8} "
+                    f"{'retries':>7} {'timeouts':>8} {'errors':>6} {'cache hit':>9}"]
+            for host, metrics in hosts:
+                p50, p95, p99 = (metrics.latency.quantile(q) for q in QUANTILES)
+                lookups = sum(metrics.cache.values())
+                hit_rate = f"{100 * (metrics.cache['hit'] + metrics.cache['revalidated']) / lookups:8.0f}%" if lookups else f"{'-':>9}"
+                rows.append(f"{host:<32} {metrics.requests:>8} {ms(p50)} {ms(p95)} {ms(p99)} "
+                            f"{metrics.counters['bytes'] / 1024:8.0f} {metrics.counters['retries']:>7} "
+                            f"{metrics.counters['timeouts']:>8} {metrics.counters['errors']:>6} {hit_rate}")
+        return "\n".join(rows)
+
+
+registry = Registry()
+
+
+def host_of(url):
+    return urlsplit(url).netloc
+
+
+class MetricsAdapter(BaseAdapter):
+    """
+    Transport adapter that measures each request sent through the adapter it wraps.
+
+    The latency runs until the body has been read, except for streamed responses, where it stops at
+    the headers; their bytes are counted as the caller reads them (see stream_tap.py), so a body given
+    up at its size cap counts what was read, and a chunked body (no Content-Length) counts in full.
+
+    Parameters:
+    - adapter (BaseAdapter): the adapter that sends the requests (e.g. an HTTPAdapter or CassetteAdapter).
+    - registry (Registry): where the measurements are recorded.
+    """
+
+    def __init__(self, adapter, registry):
+        super().__init__()
+        self.adapter = adapter
+        self.registry = registry
+
+    def send(self, request, stream=False, **kwargs):
+        host = host_of(request.url)
+        start = time.perf_counter()
+        try:
+            response = self.adapter.send(request, stream=stream, **kwargs)
+            if stream and response.raw is not None:
+                tap(response, lambda chunk: self.registry.count(host, "bytes", len(chunk)))
+                nbytes = 0
+            else:
+                nbytes = len(response.content)
+        except Timeout:
+            self.registry.count(host, "timeouts")
+            raise
+        except ConnectionError:
+            self.registry.count(host, "errors")
+            raise
+        self.registry.observe(host, response.status_code, time.perf_counter() - start, nbytes)
+        return response
+
+    def close(self):
+        self.adapter.close()
+
+
+def instrument(session, metrics=None):
+    """
+    Wraps every adapter mounted on a session in a MetricsAdapter recording into metrics (defaults to
+    the process-wide registry). Call it after mounting other adapters.
+    """
+    if metrics is None:
+        metrics = registry
+    for prefix, adapter in list(session.adapters.items()):
+        if not isinstance(adapter, MetricsAdapter):
+            session.mount(prefix, MetricsAdapter(adapter, metrics))
+    return session
+
+
+def publish():
+    """
+    Prints the metrics of this run, merges them into METRICS_FILE and writes the aggregate to
+    METRICS_PROMETHEUS. Called by the entry points once their work is done.
+    """
+    if registry.hosts:
+        print(registry.summary())
+
+    aggregate = registry
+    if METRICS_FILE:
+        if os.path.exists(METRICS_FILE):
+            try:
+                aggregate = Registry.load(METRICS_FILE)
+                aggregate.merge(registry)
+            except (ValueError, KeyError) as e:
+                print(f"Ignoring unreadable metrics in {METRICS_FILE}: {e}")
+                aggregate = registry
+        aggregate.save(METRICS_FILE)
+        print(f"HTTP metrics of {aggregate.runs} runs written to {METRICS_FILE}")
+
+    if METRICS_PROMETHEUS:
+        if os.path.dirname(METRICS_PROMETHEUS):
+            os.makedirs(os.path.dirname(METRICS_PROMETHEUS), exist_ok=True)
+        with open(METRICS_PROMETHEUS, "w") as f:
+            f.write(aggregate.prometheus())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="metrics files to merge")
+    parser.add_argument("--output", help="write the merged metrics to this JSON file")
+    parser.add_argument("--prometheus", help="write the merged metrics to this file in Prometheus text format")
+    args = parser.parse_args()
+
+    merged = Registry.load(args.files[0])
+    for path in args.files[1:]:
+        merged.merge(Registry.load(path))
+
+    print(f"{merged.runs} runs")
+    print(merged.summary())
+    if args.output:
+        merged.save(args.output)
+    if args.prometheus:
+        with open(args.prometheus, "w") as f:
+            f.write(merged.prometheus())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,127 @@
 import os
 import re
-import subprocess
-import pandas as pd
+from concurrent.futures import Future, ThreadPoolExecutor
 
-from improved_request_utils import get_record, check_uri
-from parse_metadata_utils import parse_publication, parse_software
-from parse_utils import parse_name_or_orcid, parse_yes_no_choice, get_authors, get_funders, parse_image_and_caption
+from doi_resolver import normalize_doi, resolve_publication, resolve_software
+from generate_identifier import allocate_slug
+from improved_request_utils import check_uri, describe_uri
+from vocabularies import for_codes as load_for_codes, licenses as load_licenses
+from parse_utils import parse_name_or_orcid, parse_yes_no_choice, gather_authors, get_funder, gather_funders, parse_image_and_caption
+from tracing import span
 
+# Number of lookups that may be in flight at once when resolving concurrently
+MAX_WORKERS = int(os.getenv("PARSE_MAX_WORKERS", 16))
 
-def parse_issue(issue):
+# Set PARSE_CONCURRENT=0 to resolve lookups one after another
+CONCURRENT = os.getenv("PARSE_CONCURRENT", "1") != "0"
+
+
+class SerialExecutor:
+    """
+    Stand-in for ThreadPoolExecutor that runs each task as soon as it is submitted.
+    Used when concurrent resolution is switched off, so parse_issue has a single code path.
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as err:
+            future.set_exception(err)
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+def submit_lookups(executor, data, slug_allocator=None):
+    """
+    Submits every external lookup needed by the issue (ORCIDs, DOIs, RORs, URI checks, image downloads) to the executor.
+
+    Parameters:
+    - executor: a ThreadPoolExecutor or SerialExecutor.
+    - data (dict): the issue body parsed into headings and values.
+    - slug_allocator (SlugAllocator, optional): allocator used to pick the model repo name.
+
+    Returns:
+    - dict: futures keyed by the field they resolve. Fields with no response (or nothing to look up) are absent.
+    """
+
+    def value(key):
+        return data[key].strip()
+
+    lookups = {}
+
+    lookups["creator"] = executor.submit(parse_name_or_orcid, value("-> creator/contributor ORCID (or name)"))
+    lookups["slug"] = executor.submit(allocate_slug, value("-> slug"), slug_allocator)
+
+    if value("-> associated publication DOI") != "_No response_":
+        lookups["publication"] = executor.submit(resolve_publication, value("-> associated publication DOI"))
+
+    authors = value("-> model authors").split("\r\n")
+    if authors[0] != "_No response_":
+        lookups["authors"] = [executor.submit(parse_name_or_orcid, author) for author in authors]
+
+    funders = [x.strip() for x in data["-> funder"].split(",")]
+    if funders[0] != "_No response_":
+        lookups["funder"] = [executor.submit(get_funder, funder) for funder in funders]
+
+    # the model code and output are files (or archives), described in the crate by their size and format
+    for key, field in [("model_code_uri", "-> model code URI/DOI"),
+                       ("model_output_uri", "-> model output URI/DOI")]:
+        if value(field) != "_No response_":
+            lookups[key] = executor.submit(describe_uri, value(field))
+
+    for key, field in [("software_repo", "-> software framework source repository"),
+                       ("computer_uri", "-> computer URI/DOI")]:
+        if value(field) != "_No response_":
+            lookups[key] = executor.submit(check_uri, value(field))
+
+    # software DOIs of any registration agency (see doi_resolver.py); other URIs are not looked up
+    software_doi = value("-> software framework DOI/URI")
+    if software_doi != "_No response_" and normalize_doi(software_doi):
+        lookups["software"] = executor.submit(resolve_software, software_doi)
+
+    software_authors = value("-> software framework authors").split("\r\n")
+    if software_authors[0] != "_No response_":
+        lookups["software_authors"] = [executor.submit(parse_name_or_orcid, author) for author in software_authors]
+
+    for key, field, default_filename in [("landing_image", "-> add landing page image and caption", "landing_image"),
+                                         ("animation", "-> add an animation (if relevant)", "animation"),
+                                         ("graphic_abstract", "-> add a graphic abstract figure (if relevant)", "graphic_abstract"),
+                                         ("model_setup_figure", "-> add a model setup figure (if relevant)", "model_setup")]:
+        if value(field) != "_No response_":
+            lookups[key] = executor.submit(parse_image_and_caption, value(field), default_filename)
+
+    return lookups
+
+
+def parse_issue(issue, concurrent=None, slug_allocator=None):
+    """
+    Parses a model submission issue into a dictionary of metadata and a log of errors and warnings.
+
+    Parameters:
+    - issue: the GitHub issue to parse.
+    - concurrent (bool, optional): resolve all external lookups at once on a thread pool. Defaults to CONCURRENT.
+    - slug_allocator (SlugAllocator, optional): allocator used to pick the model repo name. Defaults to the shared allocator.
+
+    Returns:
+    - tuple: (data_dict, error_log). The output does not depend on whether lookups were resolved concurrently.
+    """
+
+    if concurrent is None:
+        concurrent = CONCURRENT
+
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS) if concurrent else SerialExecutor()
+
+    with span("parse_issue", "parse", issue=issue.number, concurrent=concurrent), executor:
+        return assemble_issue(issue, executor, slug_allocator)
+
+
+def assemble_issue(issue, executor, slug_allocator=None):
     error_log = ""
 
     # Parse issue body
@@ -16,360 +129,378 @@ def parse_issue(issue):
     regex = r"### *(?P<key>.*?)\s*[\r\n]+(?P<value>[\s\S]*?)(?=###|$)"
     data = dict(re.findall(regex, issue.body))
 
+    # Start all lookups; the sections below wait only on the futures they need
+    with span("submit_lookups", "parse"):
+        lookups = submit_lookups(executor, data, slug_allocator)
+
     data_dict = {}
 
+    # Each section's span mostly measures the wait for the lookups it reads
     #############
     # Section 1
     #############
-    # creator/contributor
-    creator = data["-> creator/contributor ORCID (or name)"].strip()
-    creator_record, log = parse_name_or_orcid(creator)
-    data_dict["creator"] = creator_record
-    if log:
-        error_log += "**Creator/Contributor**\n" + log +"\n"
-
-    # slug
-    proposed_slug = data["-> slug"].strip()
-    cmd = "python3 .github/scripts/generate_identifier.py"
-    try:
-        slug = subprocess.check_output(cmd, shell=True, text=True, stderr=open(os.devnull)).strip()
-        data_dict["slug"] = slug
-        if proposed_slug != slug:
-            error_log += "**Model Repository Slug**\n"
-            error_log += f"Warning: Model repo cannot be created with proposed slug `{proposed_slug}`. \n"
-            error_log += f"Either propose a new slug or repo will be created with name `{slug}`. \n"
-    except Exception as err:
-        data_dict["slug"] = ""
-        error_log += "**Model Repository Slug**\n"
-        error_log += "Error: Unable to create valid repo name... \n"
-        error_log += f"`{err}`\n"
-
-    # FoR codes
-    for_codes = [x.strip() for x in data["-> field of Research (FoR) Codes"].split(",")]
-    for_code_lut = pd.read_csv(".github/scripts/for_codes.csv", dtype=str)
-
-    about_record = []
-    for for_code in for_codes:
-        record = for_code_lut.loc[for_code_lut["code"] == for_code]
-        if record.empty:
-            error_log += "**Field of Research (FoR) Codes**\n"
-            error_log += f"Error: FoR code `{for_code}` not found in look-up table\n"
-        else:
-            for_id = "#FoR_"+record.code.values[0]
-            about_record.append({"@id": for_id, "@type": "DefinedTerm", "name": record.name.values[0]})
-    data_dict["for_codes"] = about_record
+    with span("parse_issue section 1", "parse"):
+        # creator/contributor
+        creator_record, log = lookups["creator"].result()
+        data_dict["creator"] = creator_record
+        if log:
+            error_log += "**Creator/Contributor**\n" + log +"\n"
 
-    # license
-    license = data["-> license"].strip()
-    license_lut = pd.read_csv(".github/scripts/licenses.csv", dtype=str)
+        # slug
+        proposed_slug = data["-> slug"].strip()
+        try:
+            slug = lookups["slug"].result()
+            data_dict["slug"] = slug
+            if proposed_slug != slug:
+                error_log += "**Model Repository Slug**\n"
+                error_log += f"Warning: Model repo cannot be created with proposed slug `{proposed_slug}`. \n"
+                error_log += f"Either propose a new slug or repo will be created with name `{slug}`. \n"
+        except Exception as err:
+            data_dict["slug"] = ""
+            error_log += "**Model Repository Slug**\n"
+            error_log += "Error: Unable to create valid repo name... \n"
+            error_log += f"`{err}`\n"
 
-    license_record = {}
-    if license != "No license":
-        license_record["name"] = license_lut[license_lut.license == license].name.values[0]
-        license_record["url"] = license_lut[license_lut.license == license].url.values[0]
-    else:
-        license_record["name"] = "No license"
-    data_dict["license"] = license_record
+        # FoR codes
+        for_codes = [x.strip() for x in data["-> field of Research (FoR) Codes"].split(",")]
+        for_code_index = load_for_codes()
+
+        about_record = []
+        for for_code in for_codes:
+            name = for_code_index.lookup(for_code)
+            if name is None:
+                error_log += "**Field of Research (FoR) Codes**\n"
+                error_log += f"Error: FoR code `{for_code}` not found in look-up table\n"
+                suggestions = for_code_index.suggest(for_code)
+                if suggestions:
+                    error_log += "Did you mean: " + ", ".join(f"`{code}` ({for_code_index.lookup(code)})" for code in suggestions) + "\n"
+            else:
+                for_id = "#FoR_"+for_code
+                about_record.append({"@id": for_id, "@type": "DefinedTerm", "name": name})
+        data_dict["for_codes"] = about_record
+
+        # license
+        license = data["-> license"].strip()
+        license_lut = load_licenses()
+
+        license_record = {}
+        if license != "No license":
+            if license in license_lut:
+                license_record["name"] = license_lut[license]["name"]
+                license_record["url"] = license_lut[license]["url"]
+            else:
+                error_log += "**License**\n"
+                error_log += f"Error: license `{license}` not found in look-up table\n"
+        else:
+            license_record["name"] = "No license"
+        data_dict["license"] = license_record
 
-    # model category
-    model_category = [x.strip() for x in data["-> model category"].split(",")]
+        # model category
+        model_category = [x.strip() for x in data["-> model category"].split(",")]
 
-    if model_category[0] == "_No response_":
-        model_category = []
-        error_log += "**Model category**\n"
-        error_log += "Warning: No category selected \n"
+        if model_category[0] == "_No response_":
+            model_category = []
+            error_log += "**Model category**\n"
+            error_log += "Warning: No category selected \n"
 
-    data_dict["model_category"] = model_category
+        data_dict["model_category"] = model_category
 
 
-    # associated publication DOI
-    publication_doi = data["-> associated publication DOI"].strip()
-    publication_record = {}
+        # associated publication DOI
+        publication_doi = data["-> associated publication DOI"].strip()
+        publication_record = {}
 
-    if publication_doi == "_No response_":
-        error_log += "**Associated Publication**\n"
-        error_log += "Warning: No DOI provided. \n"
-    else:
-        try:
-            publication_metadata, log1 = get_record("publication", publication_doi)
-            publication_record, log2 = parse_publication(publication_metadata)
-            if log1 or log2:
-                error_log += "**Associated Publication**\n" + log1 + log2
-        except Exception as err:
+        if publication_doi == "_No response_":
             error_log += "**Associated Publication**\n"
-            error_log += f"Error: unable to obtain metadata for DOI `{publication_doi}` \n"
-            error_log += f"`{err}`\n"
+            error_log += "Warning: No DOI provided. \n"
+        else:
+            try:
+                publication_record, log = lookups["publication"].result()
+                if log:
+                    error_log += "**Associated Publication**\n" + log
+            except Exception as err:
+                error_log += "**Associated Publication**\n"
+                error_log += f"Error: unable to obtain metadata for DOI `{publication_doi}` \n"
+                error_log += f"`{err}`\n"
 
-    data_dict["publication"] = publication_record
+        data_dict["publication"] = publication_record
 
-    # title
-    title = data["-> title"].strip()
+        # title
+        title = data["-> title"].strip()
 
-    if title == "_No response_":
-        try:
-            title = publication_record['name']
-        except:
-            title = ""
-            error_log += "**Title**\n"
-            error_log += "Error: no title found \n"
+        if title == "_No response_":
+            try:
+                title = publication_record['name']
+            except:
+                title = ""
+                error_log += "**Title**\n"
+                error_log += "Error: no title found \n"
 
-    data_dict["title"] = title
+        data_dict["title"] = title
 
-    # description
-    description = data["-> description"].strip()
+        # description
+        description = data["-> description"].strip()
 
-    if description == "_No response_":
-        try:
-            description = publication_record['abstract']
-        except:
-            description = ""
-            error_log += "**Description**\n"
-            error_log += "Error: no descrition found, nor abstract for associated publication \n"
+        if description == "_No response_":
+            try:
+                description = publication_record['abstract']
+            except:
+                description = ""
+                error_log += "**Description**\n"
+                error_log += "Error: no descrition found, nor abstract for associated publication \n"
 
-    data_dict["description"] = description
+        data_dict["description"] = description
 
-    # model authors
-    authors = data['-> model authors'].strip().split('\r\n')
+        # model authors
+        authors = data['-> model authors'].strip().split('\r\n')
 
-    if authors[0] == "_No response_":
-        try:
-            author_list = publication_record["author"]
-        except:
-            author_list = []
-            error_log += "**Model authors**\n"
-            error_log += "Error: no authors found \n"
-    else:
-        author_list, log = get_authors(authors)
-        if log:
-            error_log += "**Model authors**\n" + log
+        if authors[0] == "_No response_":
+            try:
+                author_list = publication_record["author"]
+            except:
+                author_list = []
+                error_log += "**Model authors**\n"
+                error_log += "Error: no authors found \n"
+        else:
+            author_list, log = gather_authors(future.result() for future in lookups["authors"])
+            if log:
+                error_log += "**Model authors**\n" + log
 
-    data_dict["authors"] = author_list
+        data_dict["authors"] = author_list
 
-    # scientific keywords
-    keywords = [x.strip() for x in data["-> scientific keywords"].split(",")]
+        # scientific keywords
+        keywords = [x.strip() for x in data["-> scientific keywords"].split(",")]
 
-    if keywords[0] == "_No response_":
-        keywords = []
-        error_log += "**Scientific keywords**\n"
-        error_log += "Warning: No keywords given \n"
+        if keywords[0] == "_No response_":
+            keywords = []
+            error_log += "**Scientific keywords**\n"
+            error_log += "Warning: No keywords given \n"
 
-    data_dict["keywords"] = keywords
+        data_dict["keywords"] = keywords
 
-    # funder
-    funders = [x.strip() for x in data["-> funder"].split(",")]
+        # funder
+        funders = [x.strip() for x in data["-> funder"].split(",")]
 
-    if funders[0] == "_No response_":
-        try:
-            funder_list = publication_record['funder']
-        except:
-            funder_list = []
-            error_log += "**Funder**\n"
-            error_log += "Warning: No funders provided or found in publication. \n"
-    else:
-        funder_list, log = get_funders(funders)
-        if log:
-            error_log += "**Funder**\n" + log
+        if funders[0] == "_No response_":
+            try:
+                funder_list = publication_record['funder']
+            except:
+                funder_list = []
+                error_log += "**Funder**\n"
+                error_log += "Warning: No funders provided or found in publication. \n"
+        else:
+            funder_list, log = gather_funders(future.result() for future in lookups["funder"])
+            if log:
+                error_log += "**Funder**\n" + log
 
-    data_dict["funder"] = funder_list
+        data_dict["funder"] = funder_list
 
     #############
     # Section 2
     #############
-    # include model code
-    model_code = data["-> include model code ?"].strip().split("\n")
-
-    selection = parse_yes_no_choice(model_code)
-    if type(selection) is bool:
-        data_dict["include_model_code"] = selection
-    if type(selection) is str:
-        error_log += "**Include model code?**\n" + selection + "\n"
-
-    # model code URI/DOI
-    model_code_uri = data["-> model code URI/DOI"].strip()
-
-    if model_code_uri == "_No response_":
-        error_log += "**Model code URI/DOI**\n"
-        error_log += "Warning: No URI/DOI provided. \n"
-    else:
-        response = check_uri(model_code_uri)
-        if response == "OK":
-            data_dict["model_code_uri"] = model_code_uri
+    with span("parse_issue section 2", "parse"):
+        # include model code
+        model_code = data["-> include model code ?"].strip().split("\n")
+
+        selection = parse_yes_no_choice(model_code)
+        if type(selection) is bool:
+            data_dict["include_model_code"] = selection
+        if type(selection) is str:
+            error_log += "**Include model code?**\n" + selection + "\n"
+
+        # model code URI/DOI
+        model_code_uri = data["-> model code URI/DOI"].strip()
+
+        if model_code_uri == "_No response_":
+            error_log += "**Model code URI/DOI**\n"
+            error_log += "Warning: No URI/DOI provided. \n"
         else:
-            error_log += "**Model code URI/DOI**\n" + response + "\n"
-
-    # include model output data
-    model_output = data["-> include model output data?"].strip().split("\n")
-
-    selection = parse_yes_no_choice(model_output)
-    if type(selection) is bool:
-        data_dict["include_model_output"] = selection
-    if type(selection) is str:
-        error_log += "**Include model output data?**\n" + selection + "\n"
-
-    # model output URI/DOI
-    model_output_uri = data["-> model output URI/DOI"].strip()
-
-    if model_output_uri == "_No response_":
-        error_log += "**Model output URI/DOI**\n"
-        error_log += "Warning: No URI/DOI provided. \n"
-    else:
-        response = check_uri(model_output_uri)
-        if response == "OK":
-            data_dict["model_output_uri"] = model_output_uri
+            response, file_record = lookups["model_code_uri"].result()
+            if response == "OK":
+                data_dict["model_code_uri"] = model_code_uri
+                if "contentSize" in file_record:
+                    data_dict["model_code_size"] = file_record["contentSize"]
+                if "encodingFormat" in file_record:
+                    data_dict["model_code_format"] = file_record["encodingFormat"]
+            else:
+                error_log += "**Model code URI/DOI**\n" + response + "\n"
+
+        # include model output data
+        model_output = data["-> include model output data?"].strip().split("\n")
+
+        selection = parse_yes_no_choice(model_output)
+        if type(selection) is bool:
+            data_dict["include_model_output"] = selection
+        if type(selection) is str:
+            error_log += "**Include model output data?**\n" + selection + "\n"
+
+        # model output URI/DOI
+        model_output_uri = data["-> model output URI/DOI"].strip()
+
+        if model_output_uri == "_No response_":
+            error_log += "**Model output URI/DOI**\n"
+            error_log += "Warning: No URI/DOI provided. \n"
         else:
-            error_log += "**Model output URI/DOI**\n" + response + "\n"
-
+            response, file_record = lookups["model_output_uri"].result()
+            if response == "OK":
+                data_dict["model_output_uri"] = model_output_uri
+                if "contentSize" in file_record:
+                    data_dict["model_output_size"] = file_record["contentSize"]
+                if "encodingFormat" in file_record:
+                    data_dict["model_output_format"] = file_record["encodingFormat"]
+            else:
+                error_log += "**Model output URI/DOI**\n" + response + "\n"
 
     #############
     # Section 3
     #############
-    # software framework DOI/URI
-    software_doi = data["-> software framework DOI/URI"].strip()
+    with span("parse_issue section 3", "parse"):
+        # software framework DOI/URI
+        software_doi = data["-> software framework DOI/URI"].strip()
 
-    software_record={"@type": "SoftwareApplication"}
+        software_record={"@type": "SoftwareApplication"}
 
-    if software_doi == "_No response_":
-        error_log += "**Software Framework DOI/URI**\n"
-        error_log += "Warning: no DOI/URI provided.\n"
-    else:
-        if "zenodo" in software_doi:
-            software_doi = software_doi.split("zenodo.")[1]
-            try:
-                software_metadata, log1 = get_record("software", software_doi)
-                software_record, log2 = parse_software(software_metadata)
-                if log1 or log2:
-                    error_log += "**Software Framework DOI/URI**\n" + log1 + log2
-            except Exception as err:
-                error_log += "**Software Framework DOI/URI**\n"
-                error_log += f"Error: unable to obtain metadata for DOI `{software_doi}` \n"
-                error_log += f"`{err}`\n"
+        if software_doi == "_No response_":
+            error_log += "**Software Framework DOI/URI**\n"
+            error_log += "Warning: no DOI/URI provided.\n"
         else:
-            error_log += "**Software Framework DOI/URI**\n Non-Zenodo software dois not yet supported\n"
-
-    # software framework source repository
-    software_repo = data["-> software framework source repository"].strip()
-
-    if software_repo == "_No response_":
-        error_log += "**Software Repository**\n"
-        error_log += "Warning: no repository URL provided. \n"
-    else:
-        response = check_uri(software_repo)
-        if response == "OK":
-            software_record["codeRepository"] = software_repo
+            if "software" in lookups:
+                software_doi = normalize_doi(software_doi)
+                try:
+                    software_record, log = lookups["software"].result()
+                    if log:
+                        error_log += "**Software Framework DOI/URI**\n" + log
+                except Exception as err:
+                    error_log += "**Software Framework DOI/URI**\n"
+                    error_log += f"Error: unable to obtain metadata for DOI `{software_doi}` \n"
+                    error_log += f"`{err}`\n"
+            else:
+                error_log += "**Software Framework DOI/URI**\n Software URIs other than DOIs are not yet supported\n"
+
+        # software framework source repository
+        software_repo = data["-> software framework source repository"].strip()
+
+        if software_repo == "_No response_":
+            error_log += "**Software Repository**\n"
+            error_log += "Warning: no repository URL provided. \n"
         else:
-            error_log += "**Software Repository**\n" + response + "\n"
+            response = lookups["software_repo"].result()
+            if response == "OK":
+                software_record["codeRepository"] = software_repo
+            else:
+                error_log += "**Software Repository**\n" + response + "\n"
 
-    # name of primary software framework
-    software_name = data["-> name of primary software framework (e.g. Underworld, ASPECT, Badlands, OpenFOAM)"].strip()
+        # name of primary software framework
+        software_name = data["-> name of primary software framework (e.g. Underworld, ASPECT, Badlands, OpenFOAM)"].strip()
 
-    if software_name == "_No response_":
-        try:
-            software_name = software_record['name']
-        except:
-            error_log += "**Name of primary software framework**\n"
-            error_log += "Error: no name found \n"
-    else:
-        software_record["name"] = software_name     # N.B. this will overwrite any name obtained from the DOI
+        if software_name == "_No response_":
+            try:
+                software_name = software_record['name']
+            except:
+                error_log += "**Name of primary software framework**\n"
+                error_log += "Error: no name found \n"
+        else:
+            software_record["name"] = software_name     # N.B. this will overwrite any name obtained from the DOI
 
-    # software framework authors
-    authors = data['-> software framework authors'].strip().split('\r\n')
+        # software framework authors
+        authors = data['-> software framework authors'].strip().split('\r\n')
 
-    if authors[0] == "_No response_":
-        try:
-            software_author_list = software_record["author"]
-        except:
-            software_author_list = []
-            error_log += "**Software framework authors**\n"
-            error_log += "Error: no authors found \n"
-    else:
-        software_author_list, log = get_authors(authors)
-        software_record["author"] = software_author_list     # N.B. this will overwrite any name obtained from the DOI
-        if log:
-            error_log += "**Software framework authors**\n" + log
+        if authors[0] == "_No response_":
+            try:
+                software_author_list = software_record["author"]
+            except:
+                software_author_list = []
+                error_log += "**Software framework authors**\n"
+                error_log += "Error: no authors found \n"
+        else:
+            software_author_list, log = gather_authors(future.result() for future in lookups["software_authors"])
+            software_record["author"] = software_author_list     # N.B. this will overwrite any name obtained from the DOI
+            if log:
+                error_log += "**Software framework authors**\n" + log
 
-    # software & algorithm keywords
-    software_keywords = [x.strip() for x in data["-> software & algorithm keywords"].split(",")]
+        # software & algorithm keywords
+        software_keywords = [x.strip() for x in data["-> software & algorithm keywords"].split(",")]
 
-    if software_keywords[0] == "_No response_":
-        error_log += "**Software & algorithm keywords**\n"
-        error_log += "Warning: no keywords given. \n"
-    else:
-        software_record["keywords"] = software_keywords
+        if software_keywords[0] == "_No response_":
+            error_log += "**Software & algorithm keywords**\n"
+            error_log += "Warning: no keywords given. \n"
+        else:
+            software_record["keywords"] = software_keywords
 
-    data_dict["software"] = software_record
+        data_dict["software"] = software_record
 
-    # computer URI/DOI
-    computer_uri = data["-> computer URI/DOI"].strip()
+        # computer URI/DOI
+        computer_uri = data["-> computer URI/DOI"].strip()
 
-    if computer_uri == "_No response_":
-        error_log += "**Computer URI/DOI**\n"
-        error_log += "Warning: No URI/DOI provided. \n"
-    else:
-        response = check_uri(computer_uri)
-        if response == "OK":
-            data_dict["computer_uri"] = computer_uri
+        if computer_uri == "_No response_":
+            error_log += "**Computer URI/DOI**\n"
+            error_log += "Warning: No URI/DOI provided. \n"
         else:
-            error_log += "**Computer URI/DOI**\n" + response + "\n"
+            response = lookups["computer_uri"].result()
+            if response == "OK":
+                data_dict["computer_uri"] = computer_uri
+            else:
+                error_log += "**Computer URI/DOI**\n" + response + "\n"
 
     #############
     # Section 4
     #############
-    # landing page image and caption
-    img_string = data["-> add landing page image and caption"].strip()
-
-    if img_string == "_No response_":
-        error_log += "**Landing page image**\n"
-        error_log += "Error: No image uploaded.\n\n"
-    else:
-        landing_image_record, log = parse_image_and_caption(img_string, "landing_image")
-        if log:
-            error_log += "**Landing page image**\n" + log + "\n"
-        data_dict["landing_image"] = landing_image_record
+    with span("parse_issue section 4", "parse"):
+        # landing page image and caption
+        img_string = data["-> add landing page image and caption"].strip()
 
-    # animation
-    img_string = data["-> add an animation (if relevant)"].strip()
+        if img_string == "_No response_":
+            error_log += "**Landing page image**\n"
+            error_log += "Error: No image uploaded.\n\n"
+        else:
+            landing_image_record, log = lookups["landing_image"].result()
+            if log:
+                error_log += "**Landing page image**\n" + log + "\n"
+            data_dict["landing_image"] = landing_image_record
 
-    if img_string == "_No response_":
-        error_log += "**Animation**\n"
-        error_log += "Warning: No animation uploaded.\n\n"
-    else:
-        animation_record, log = parse_image_and_caption(img_string, "animation")
-        if log:
-            error_log += "**Animation**\n" + log + "\n"
-        data_dict["animation"] = animation_record
+        # animation
+        img_string = data["-> add an animation (if relevant)"].strip()
 
-    # graphic abstract
-    img_string = data["-> add a graphic abstract figure (if relevant)"].strip()
+        if img_string == "_No response_":
+            error_log += "**Animation**\n"
+            error_log += "Warning: No animation uploaded.\n\n"
+        else:
+            animation_record, log = lookups["animation"].result()
+            if log:
+                error_log += "**Animation**\n" + log + "\n"
+            data_dict["animation"] = animation_record
 
-    if img_string == "_No response_":
-        error_log += "**Graphic abstract**\n"
-        error_log += "Warning: No image uploaded.\n\n"
-    else:
-        graphic_abstract_record, log = parse_image_and_caption(img_string, "graphic_abstract")
-        if log:
-            error_log += "**Graphic abstract**\n" + log + "\n"
-        data_dict["graphic_abstract"] = graphic_abstract_record
+        # graphic abstract
+        img_string = data["-> add a graphic abstract figure (if relevant)"].strip()
 
-    # model setup figure
-    img_string = data["-> add a model setup figure (if relevant)"].strip()
+        if img_string == "_No response_":
+            error_log += "**Graphic abstract**\n"
+            error_log += "Warning: No image uploaded.\n\n"
+        else:
+            graphic_abstract_record, log = lookups["graphic_abstract"].result()
+            if log:
+                error_log += "**Graphic abstract**\n" + log + "\n"
+            data_dict["graphic_abstract"] = graphic_abstract_record
 
-    if img_string == "_No response_":
-        error_log += "**Model setup figure**\n"
-        error_log += "Warning: No image uploaded.\n\n"
-    else:
-        model_setup_fig_record, log = parse_image_and_caption(img_string, "model_setup")
-        if log:
-            error_log += "**Model setup figure**\n" + log + "\n"
-        data_dict["model_setup_figure"] = model_setup_fig_record
+        # model setup figure
+        img_string = data["-> add a model setup figure (if relevant)"].strip()
 
-    # description
-    model_description = data["-> add a description of your model setup"].strip()
+        if img_string == "_No response_":
+            error_log += "**Model setup figure**\n"
+            error_log += "Warning: No image uploaded.\n\n"
+        else:
+            model_setup_fig_record, log = lookups["model_setup_figure"].result()
+            if log:
+                error_log += "**Model setup figure**\n" + log + "\n"
+            data_dict["model_setup_figure"] = model_setup_fig_record
 
-    if model_description == "_No response_":
-        error_log += "**Model setup description**\n"
-        error_log += "Warning: No description given \n"
-    else:
-        data_dict["model_setup_description"] = model_description
+        # description
+        model_description = data["-> add a description of your model setup"].strip()
 
+        if model_description == "_No response_":
+            error_log += "**Model setup description**\n"
+            error_log += "Warning: No description given \n"
+        else:
+            data_dict["model_setup_description"] = model_description
 
     return data_dict, error_log
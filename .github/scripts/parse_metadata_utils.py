@@ -1,4 +1,32 @@
+# Fields of each record type read by its parser below. get_record keeps only these (see json_stream.py),
+# so e.g. the references of a Crossref work are never built or cached.
+PUBLICATION_FIELDS = {"message": {
+    "URL": True, "title": True, "issue": True, "published": True, "container-title": True, "ISSN": True,
+    "volume": True, "publisher": True, "abstract": True, "page": True, "alternative-id": True,
+    "author": {"ORCID": True, "given": True, "family": True, "affiliation": {"name": True}},
+    "funder": {"name": True},
+}}
+
+SOFTWARE_FIELDS = {"doi_url": True, "title": True, "metadata": {"version": True, "creators": True}}
+
+DATACITE_FIELDS = {"data": {"attributes": {
+    "doi": True, "url": True, "titles": {"title": True}, "publisher": True, "publicationYear": True,
+    "version": True, "types": {"resourceTypeGeneral": True}, "descriptions": True,
+    "creators": {"name": True, "givenName": True, "familyName": True, "affiliation": True,
+                 "nameIdentifiers": {"nameIdentifier": True, "nameIdentifierScheme": True}},
+}}}
+
+# CSL JSON, as returned by content negotiation at doi.org for DOIs of any registration agency
+CSL_FIELDS = {
+    "DOI": True, "URL": True, "title": True, "issued": True, "container-title": True, "ISSN": True,
+    "volume": True, "issue": True, "page": True, "publisher": True, "abstract": True, "version": True,
+    "author": {"ORCID": True, "given": True, "family": True, "literal": True, "affiliation": {"name": True}},
+}
+
+RECORD_FIELDS = {"publication": PUBLICATION_FIELDS, "software": SOFTWARE_FIELDS, "datacite": DATACITE_FIELDS, "doi": CSL_FIELDS}
+
 def parse_author(metadata):
+    # metadata is a full ORCID record, or the sections fetched by improved_request_utils.get_author
     log = ""
     author_record = {}
     
@@ -162,3 +190,128 @@ def parse_publication(metadata):
     return publication_record, log
 
 
+def parse_datacite(metadata, record_type="ScholarlyArticle"):
+    # metadata is a DataCite REST API record (api.datacite.org/dois/<doi>); record_type is the schema.org type to build
+    log = ""
+    record = {}
+
+    try:
+        attributes = metadata["data"]["attributes"]
+        record = {
+            "@type": record_type,
+            "@id": f"https://doi.org/{attributes['doi']}",
+            "name": attributes["titles"][0]["title"],
+        }
+
+        if record_type == "SoftwareApplication":
+            if attributes.get("version"):
+                record["softwareVersion"] = attributes["version"]
+        else:
+            if attributes.get("publicationYear"):
+                record["datePublished"] = str(attributes["publicationYear"])
+            if attributes.get("publisher"):
+                publisher = attributes["publisher"]
+                record["publisher"] = publisher["name"] if isinstance(publisher, dict) else publisher
+            for description in attributes.get("descriptions", []):
+                if description.get("descriptionType") == "Abstract":
+                    record["abstract"] = description["description"]
+                    break
+
+        author_list = []
+        for creator in attributes["creators"]:
+            author_record = {"@type": "Person"}
+            for identifier in creator.get("nameIdentifiers", []):
+                if identifier.get("nameIdentifierScheme") == "ORCID":
+                    author_record["@id"] = identifier["nameIdentifier"]
+            if "givenName" in creator and "familyName" in creator:
+                author_record["givenName"] = creator["givenName"]
+                author_record["familyName"] = creator["familyName"]
+            else:
+                author_record["name"] = creator["name"]
+
+            # affiliations are names, or objects with a name when requested with affiliation=true
+            affiliation_list = []
+            for affiliation in creator.get("affiliation", []):
+                name = affiliation["name"] if isinstance(affiliation, dict) else affiliation
+                affiliation_list.append({"@type": "Organization", "name": name})
+
+            if affiliation_list:
+                author_record["affiliation"] = affiliation_list
+
+            author_list.append(author_record)
+
+        if author_list:
+            record["author"] = author_list
+
+    except Exception as err:
+        log += "Error: unable to parse DataCite metadata. \n"
+        log += f"`{err}`\n"
+
+    return record, log
+
+def parse_csl(metadata, record_type="ScholarlyArticle"):
+    # metadata is CSL JSON from content negotiation at doi.org; record_type is the schema.org type to build
+    log = ""
+    record = {}
+
+    def first(value):
+        return value[0] if isinstance(value, list) else value
+
+    try:
+        record = {
+            "@type": record_type,
+            "@id": metadata.get("URL") or f"https://doi.org/{metadata['DOI']}",
+            "name": first(metadata["title"]),
+        }
+
+        if record_type == "SoftwareApplication":
+            if metadata.get("version"):
+                record["softwareVersion"] = metadata["version"]
+        else:
+            if metadata.get("issued", {}).get("date-parts"):
+                record["datePublished"] = '-'.join(map(str, metadata["issued"]["date-parts"][0]))
+            if metadata.get("container-title"):
+                periodical = {
+                    "@type": ["PublicationVolume", "Periodical"],
+                    "name": first(metadata["container-title"]),
+                }
+                if "ISSN" in metadata:
+                    periodical["issn"] = metadata["ISSN"]
+                if "volume" in metadata:
+                    periodical["volumeNumber"] = metadata["volume"]
+                record["isPartOf"] = periodical
+            if metadata.get("publisher"):
+                record["publisher"] = metadata["publisher"]
+            if "page" in metadata:
+                record["pagination"] = metadata["page"]
+            if "abstract" in metadata:
+                record["abstract"] = metadata["abstract"]
+
+        author_list = []
+        for author in metadata.get("author", []):
+            author_record = {"@type": "Person"}
+            if "ORCID" in author:
+                author_record["@id"] = author["ORCID"]
+            if "family" in author:
+                author_record["givenName"] = author.get("given", "")
+                author_record["familyName"] = author["family"]
+            else:
+                author_record["name"] = author["literal"]
+
+            affiliation_list = []
+            for affiliation in author.get("affiliation", []):
+                affiliation_list.append({"@type": "Organization", "name": affiliation["name"]})
+
+            if affiliation_list:
+                author_record["affiliation"] = affiliation_list
+
+            author_list.append(author_record)
+
+        if author_list:
+            record["author"] = author_list
+
+    except Exception as err:
+        log += "Error: unable to parse DOI metadata. \n"
+        log += f"`{err}`\n"
+
+    return record, log
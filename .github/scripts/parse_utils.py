@@ -1,16 +1,17 @@
 import re
 import requests
-import filetype
-from filetypes import Svg
+from asset_store import default_store, AssetError
 
-from improved_request_utils import get_record, search_organization
+from improved_request_utils import get_author, get_record, search_organization
 from parse_metadata_utils import parse_author, parse_organization
+from ror_index import default_index
 
 def parse_name_or_orcid(name_or_orcid):
     error_log = ""
 
     if is_orcid_format(name_or_orcid):
-        orcid_record, log1 = get_record("author", name_or_orcid)
+        # only the /person and /employments sections read by parse_author are fetched
+        orcid_record, log1 = get_author(name_or_orcid)
         author_record, log2 = parse_author(orcid_record)
         if log1 or log2:
             error_log += log1 + log2
@@ -61,11 +62,19 @@ def get_authors(author_list):
 
     '''
 
+    return gather_authors(parse_name_or_orcid(author) for author in author_list)
+
+
+def gather_authors(results):
+    '''
+    Combines the (author_record, log) pairs returned by parse_name_or_orcid, in order, into a single list of authors and log.
+    Lets callers resolve each author independently (e.g. concurrently) and still assemble the same output as get_authors.
+    '''
+
     log = ""
     authors = []
 
-    for author in author_list:
-        author_record, error_log = parse_name_or_orcid(author)
+    for author_record, error_log in results:
         if author_record:
             authors.append(author_record)
         if error_log:
@@ -76,26 +85,67 @@ def get_authors(author_list):
 
 def get_funders(funder_list):
 
+    return gather_funders(get_funder(funder) for funder in funder_list)
+
+
+def get_funder(funder):
+    '''
+    Resolves a single funder URL, ROR or name into a list of zero or one schema.org Organization records and a log.
+    Names are only resolved by the local ROR index; the ROR search API is queried by URL.
+    '''
+
     log = ""
     funders = []
+    index = default_index()
 
-    for funder in funder_list:
-        if "ror.org" not in funder:
-            ror_id, get_log = search_organization(funder)
+    if "ror.org" not in funder:
+        # the local ROR index answers most funders, by website or by name; the ROR search API is the fallback for misses
+        match = index.lookup(funder) if index else None
+        if match:
+            ror_id = match["id"]
+        else:
+            ror_id, get_log = search_ror_id(funder)
             log += get_log
 
-            if not ror_id:
-                funders.append({"@type": "Organization", "name": funder, "url": funder})
-            else:
-                funder = ror_id
+        if not ror_id:
+            funders.append({"@type": "Organization", "name": funder, "url": funder})
+        else:
+            funder = ror_id
 
-        if "ror.org" in funder:
+    if "ror.org" in funder:
+        record = index.organization(funder) if index else None
+        get_log = ""
+        if record is None:
             record, get_log = get_record("organization", funder)
-            funder_record, parse_log = parse_organization(record)
-            if get_log or parse_log:
-                log += get_log + parse_log
-            else:
-                funders.append(funder_record)
+        funder_record, parse_log = parse_organization(record)
+        if get_log or parse_log:
+            log += get_log + parse_log
+        else:
+            funders.append(funder_record)
+
+    return funders, log
+
+
+def search_ror_id(org_url):
+    '''
+    Returns the ROR id of the best match of a ROR search for an organization's URL ("" if none) and a log
+    '''
+
+    results, log = search_organization(org_url)
+    if not results or not results.get("number_of_results"):
+        return "", log
+
+    return results["items"][0]["id"], log
+
+
+def gather_funders(results):
+
+    log = ""
+    funders = []
+
+    for funder_records, funder_log in results:
+        funders += funder_records
+        log += funder_log
 
     return funders, log
 
@@ -107,9 +157,6 @@ def parse_image_and_caption(img_string, default_filename):
     md_regex = r"\[(?P<filename>.*?)\]\((?P<url>.*?)\)"
     html_regex = r'alt="(?P<filename>[^"]+)" src="(?P<url>[^"]+)"'
 
-    # Hack to recognise SVG files
-    filetype.add_type(Svg())
-
     caption = []
 
     for string in img_string.split("\r\n"):
@@ -127,11 +174,14 @@ def parse_image_and_caption(img_string, default_filename):
             caption.append(string)
 
     # Get correct file extension for images
+    # The file is downloaded once into the asset store, which copy_files reads from later
     if "url" in image_record:
-        response = requests.get(image_record["url"])
-        content_type = response.headers.get("Content-Type")[:5]
-        if content_type in ["video", "image"]:
-            image_record["filename"] += "." + filetype.get_type(mime=response.headers.get("Content-Type")).extension
+        try:
+            asset = default_store().fetch(image_record["url"])
+            if asset.mime[:5] in ["video", "image"] and asset.extension:
+                image_record["filename"] += "." + asset.extension
+        except (AssetError, requests.exceptions.RequestException) as err:
+            log += f"Error: unable to download file `{image_record['url']}`: {err}\n"
 
     image_record["caption"] = "\n".join(caption)
 
@@ -0,0 +1,214 @@
+import json
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Default time-to-live (seconds) per record type. Published DOIs and RORs rarely change;
+# ORCID, Zenodo and DataCite records are edited more often. The registration agency of a DOI
+# prefix practically never changes.
+DEFAULT_TTLS = {
+    "publication": 30 * 24 * 3600,
+    "software": 24 * 3600,
+    "organization": 30 * 24 * 3600,
+    "author": 24 * 3600,
+    "datacite": 24 * 3600,
+    "doi": 30 * 24 * 3600,
+    "doi_ra": 365 * 24 * 3600,
+}
+
+# Default upper bound on the total size of cached bodies
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def ttl_for(record_type, ttls=None):
+    """
+    Returns the TTL in seconds for a record type. RECORD_CACHE_TTL_<TYPE> overrides the default.
+    """
+    ttls = DEFAULT_TTLS if ttls is None else ttls
+    override = os.getenv(f"RECORD_CACHE_TTL_{record_type.upper()}")
+    if override is not None:
+        return float(override)
+    return ttls.get(record_type, 0)
+
+
+class CacheEntry:
+    """
+    A cached record together with the validators needed to revalidate it.
+    """
+
+    def __init__(self, record, etag=None, last_modified=None, fetched_at=0.0, ttl=0.0):
+        self.record = record
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.ttl = ttl
+
+    @property
+    def fresh(self):
+        return time.time() - self.fetched_at < self.ttl
+
+    def conditional_headers(self):
+        """
+        Headers for a conditional GET that lets the server answer 304 Not Modified.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class RecordCache:
+    """
+    Interface for response caches used by improved_request_utils.get_record.
+
+    Subclasses implement get, put and refresh; this base class keeps the hit/miss counters.
+    The base class itself caches nothing, so it can be installed to switch caching off.
+    """
+
+    def __init__(self):
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "stored": 0, "evicted": 0}
+        self._stats_lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self._stats_lock:
+            self.stats[name] += n
+
+    def get(self, record_type, record_id):
+        return None
+
+    def put(self, record_type, record_id, record, etag=None, last_modified=None):
+        pass
+
+    def refresh(self, record_type, record_id):
+        pass
+
+    def summary(self):
+        lookups = self.stats["hits"] + self.stats["revalidated"] + self.stats["misses"]
+        saved = self.stats["hits"] + self.stats["revalidated"]
+        rate = 100 * saved / lookups if lookups else 0
+        return (f"{self.stats['hits']} hits, {self.stats['revalidated']} revalidated, "
+                f"{self.stats['misses']} misses ({rate:.0f}% served from cache)")
+
+
+class SQLiteRecordCache(RecordCache):
+    """
+    Record cache stored in a single SQLite file, so it can be persisted between runs (e.g. with actions/cache).
+
+    Entries are keyed by record type and normalized id. Entries older than their TTL are still returned
+    by get so that the caller can revalidate them with ETag/Last-Modified. When the stored bodies exceed
+    max_bytes the least recently used entries are evicted.
+
+    Parameters:
+    - path (str): location of the SQLite database; parent directories are created.
+    - max_bytes (int): upper bound on the total size of stored bodies.
+    - ttls (dict, optional): TTL in seconds per record type. Defaults to DEFAULT_TTLS.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, ttls=None):
+        super().__init__()
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self._lock = threading.Lock()
+
+        import sqlite3
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS records (
+                record_type TEXT NOT NULL,
+                record_id TEXT NOT NULL,
+                body TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                PRIMARY KEY (record_type, record_id)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS records_lru ON records (accessed_at)")
+        self._conn.commit()
+
+    def get(self, record_type, record_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM records WHERE record_type = ? AND record_id = ?",
+                (record_type, record_id),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE records SET accessed_at = ? WHERE record_type = ? AND record_id = ?",
+                (time.time(), record_type, record_id),
+            )
+            self._conn.commit()
+
+        body, etag, last_modified, fetched_at = row
+        return CacheEntry(json.loads(body), etag, last_modified, fetched_at, ttl_for(record_type, self.ttls))
+
+    def put(self, record_type, record_id, record, etag=None, last_modified=None):
+        body = json.dumps(record)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (record_type, record_id, body, etag, last_modified, now, now, len(body)),
+            )
+            self._evict()
+            self._conn.commit()
+        self.count("stored")
+
+    def refresh(self, record_type, record_id):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE records SET fetched_at = ?, accessed_at = ? WHERE record_type = ? AND record_id = ?",
+                (now, now, record_type, record_id),
+            )
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM records").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        rows = self._conn.execute("SELECT record_type, record_id, size FROM records ORDER BY accessed_at").fetchall()
+        for record_type, record_id, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM records WHERE record_type = ? AND record_id = ?", (record_type, record_id))
+            total -= size
+            evicted += 1
+        self.count("evicted", evicted)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def cache_from_env():
+    """
+    Builds the cache configured by RECORD_CACHE_PATH (and optionally RECORD_CACHE_MAX_BYTES).
+    Returns a non-caching RecordCache if RECORD_CACHE_PATH is not set.
+    """
+    path = os.getenv("RECORD_CACHE_PATH")
+    if not path:
+        return RecordCache()
+
+    import sqlite3
+
+    max_bytes = int(os.getenv("RECORD_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+    try:
+        return SQLiteRecordCache(path, max_bytes=max_bytes)
+    except sqlite3.Error as e:
+        logger.error(f"Unable to open record cache at {path}: {e}")
+        return RecordCache()
@@ -0,0 +1,173 @@
+"""
+Re-runs a submission through the parser and crosswalks, offline, from a cassette of its HTTP responses.
+
+`record` processes a submission once against the live services (or stand-ins) and saves the issue body
+and every HTTP response in a cassette. `replay` processes it again from the cassette without touching
+the network, so a historical submission can be re-run through newer parser or crosswalk code in
+milliseconds, its output compared between commits, and the CPU-bound part of the pipeline profiled.
+
+Usage:
+    python .github/scripts/reprocess.py record CASSETTE (--issue N | --body-file FILE)
+    python .github/scripts/reprocess.py replay CASSETTE [--output DIR] [--profile]
+"""
+import argparse
+import cProfile
+import hashlib
+import os
+import pstats
+import random
+import tempfile
+import time
+
+import generate_identifier
+import improved_request_utils
+import templates
+from asset_store import AssetStore, set_default_store
+from cassette import Cassette
+from crosswalks import dict_to_metadata
+from generate_identifier import SlugAllocator
+from parse_issue import parse_issue
+from record_cache import RecordCache
+from templates import TemplateLoader, set_default_loader
+from transport import build_session
+from write_report import build_report
+
+# Repository holding the submission issues
+ISSUE_REPO = "hvidy/PIPE-4002-EarthByte-ModelAtlas"
+
+
+class Issue:
+    """
+    The attributes of a GitHub issue read by parse_issue.
+    """
+
+    def __init__(self, body, number):
+        self.body = body
+        self.number = number
+
+
+def endpoints():
+    """
+    The API endpoints in use, which are stored in a cassette so replay requests the recorded URLs.
+    """
+    return {"base_urls": dict(improved_request_utils.BASE_URLS), "github_api_url": generate_identifier.GITHUB_API_URL,
+            "template_base_url": templates.TEMPLATE_BASE_URL}
+
+
+def use_endpoints(recorded):
+    improved_request_utils.BASE_URLS.update(recorded["base_urls"])
+    generate_identifier.GITHUB_API_URL = recorded["github_api_url"]
+    templates.TEMPLATE_BASE_URL = recorded["template_base_url"]
+
+
+def process(body, number, session, template_ref=None):
+    """
+    Parses an issue body and builds the report and the crate, with every request sent through session.
+
+    Nothing is read from or written to the persistent caches (records, assets, templates, repo listing),
+    so a recording holds every response the run needs. Random ids in the crate are seeded, so the output
+    of two runs can be compared.
+
+    Returns:
+    - tuple: (report, metadata, timings), with the time in seconds spent in each stage.
+    """
+    random.seed(0)
+    improved_request_utils.set_session(session)
+    improved_request_utils.set_cache(RecordCache())
+    improved_request_utils.inflight.clear()
+
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        set_default_store(AssetStore(os.path.join(tmp, "assets"), session=session))
+        set_default_loader(TemplateLoader(ref=template_ref, cache_dir=os.path.join(tmp, "templates"), session=session))
+        allocator = SlugAllocator(token=os.environ.get("GITHUB_TOKEN"), session=session)
+
+        start = time.perf_counter()
+        data, error_log = parse_issue(Issue(body, number), slug_allocator=allocator)
+        timings["parse_issue"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        report = build_report(data, error_log)
+        timings["report"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        metadata = dict_to_metadata(data)
+        timings["metadata"] = time.perf_counter() - start
+
+    return report, metadata, timings
+
+
+def fetch_issue_body(number, repo_name):
+    from github import Github, Auth
+
+    g = Github(auth=Auth.Token(os.environ["GITHUB_TOKEN"]), base_url=generate_identifier.GITHUB_API_URL)
+    return g.get_repo(repo_name).get_issue(number=number).body
+
+
+def record(args):
+    if args.body_file:
+        with open(args.body_file, newline="") as f:
+            body, number = f.read(), 0
+    else:
+        body, number = fetch_issue_body(args.issue, args.repo), args.issue
+
+    template_ref = TemplateLoader().ref
+    cassette = Cassette(args.cassette, meta={"issue": {"number": number, "body": body}, "template_ref": template_ref,
+                                                  "endpoints": endpoints()})
+    outputs = process(body, number, build_session(cassette, "record"), template_ref)
+    cassette.save()
+    print(f"Recorded {len(cassette.interactions)} responses to {args.cassette}")
+    return outputs
+
+
+def replay(args):
+    cassette = Cassette.load(args.cassette)
+    issue = cassette.meta["issue"]
+    session = build_session(cassette, "replay")
+    use_endpoints(cassette.meta["endpoints"])
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    outputs = process(issue["body"], issue["number"], session, cassette.meta.get("template_ref"))
+    if profiler:
+        profiler.disable()
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+    for method, url in cassette.misses:
+        print(f"Not in cassette: {method} {url}")
+    return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="process a submission online and save its responses")
+    record_parser.add_argument("cassette", help="cassette file to write")
+    source = record_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--issue", type=int, help="number of the submission issue (needs GITHUB_TOKEN)")
+    source.add_argument("--body-file", help="file holding the issue body")
+    record_parser.add_argument("--repo", default=ISSUE_REPO, help="repository holding the issue")
+
+    replay_parser = commands.add_parser("replay", help="process a recorded submission offline")
+    replay_parser.add_argument("cassette", help="cassette file to read")
+    replay_parser.add_argument("--profile", action="store_true", help="print a cProfile summary of the run")
+
+    for command_parser in (record_parser, replay_parser):
+        command_parser.add_argument("--output", help="directory in which to write report.md and mate.json")
+
+    args = parser.parse_args()
+    report, metadata, timings = record(args) if args.command == "record" else replay(args)
+
+    for name, content in [("report.md", report), ("mate.json", metadata)]:
+        print(f"{name:<10} sha256:{hashlib.sha256(content.encode()).hexdigest()[:16]}")
+        if args.output:
+            os.makedirs(args.output, exist_ok=True)
+            with open(os.path.join(args.output, name), "w") as f:
+                f.write(content)
+    print("  ".join(f"{stage} {seconds * 1000:.1f} ms" for stage, seconds in timings.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,10 @@
 import requests
+from transport import get_session
+from uri_probe import probe_uri
+
+# Timeout (seconds) for each request, so a stalled API cannot hang the runner.
+# Requests go through the shared transport (pooled, retried; see transport.py)
+TIMEOUT = 10
 
 base_urls = {
     "publication": "https://api.crossref.org/works/",
@@ -17,7 +23,7 @@ def get_record(record_type,record_id):
     headers = {"Content-Type": "application/json"}
 
     try:
-        response = requests.get(url, headers=headers)
+        response = get_session().get(url, headers=headers, timeout=TIMEOUT)
         response.raise_for_status()  # Raise an exception for HTTP errors
 
         # Parse JSON response
@@ -44,7 +50,7 @@ def search_organization(org_url):
     headers = {"Content-Type": "application/json"}
 
     try:
-        response = requests.get(url, headers=headers)
+        response = get_session().get(url, headers=headers, timeout=TIMEOUT)
         response.raise_for_status()  # Raise an exception for HTTP errors
 
         result = response.json()
@@ -71,11 +77,10 @@ def search_organization(org_url):
 
 
 def check_uri(uri):
-    try:
-        response = requests.get(uri)
-        response.raise_for_status()  # Raise an exception for HTTP errors
+    # Probe with HEAD / ranged GET rather than downloading the resource
+    result = probe_uri(uri, session=get_session(), timeout=TIMEOUT)
 
+    if result.ok:
         return "OK"
-
-    except Exception as err:
-        return err.args[0]
\ No newline at end of file
+    else:
+        return result.error
\ No newline at end of file
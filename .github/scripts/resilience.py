@@ -0,0 +1,264 @@
+"""
+Resilience layer for the shared session: retries with jittered backoff, a circuit breaker per host,
+optional hedged requests and a default timeout.
+
+ResilientAdapter wraps the adapters of the shared session (see transport.py), outside
+the metrics and cassette adapters, so every attempt is measured and recorded.
+
+Configuration:
+- HTTP_MAX_ATTEMPTS: attempts per request, including the first (default 3). 1 switches retries off.
+- HTTP_BACKOFF_BASE / HTTP_BACKOFF_MAX: seconds of backoff before the first retry, and the cap (default 0.5 / 30).
+- HTTP_BREAKER_THRESHOLD: consecutive failures after which a host is skipped (default 5).
+- HTTP_BREAKER_RESET: seconds a tripped host is skipped before one trial request is let through (default 30).
+- HTTP_HEDGE_AFTER: seconds after which a GET still waiting for its response (its headers, if streamed)
+  is sent a second time (default unset: no hedging).
+"""
+import datetime
+import email.utils
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+
+from cassette import CassetteMiss
+from metrics import registry as metrics
+
+MAX_ATTEMPTS = int(os.getenv("HTTP_MAX_ATTEMPTS", 3))
+BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", 0.5))
+BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", 30))
+BREAKER_THRESHOLD = int(os.getenv("HTTP_BREAKER_THRESHOLD", 5))
+BREAKER_RESET = float(os.getenv("HTTP_BREAKER_RESET", 30))
+HEDGE_AFTER = float(os.getenv("HTTP_HEDGE_AFTER", 0)) or None
+
+# Timeout for requests sent without one
+DEFAULT_TIMEOUT = int(os.getenv("DEFAULT_TIMEOUT", 10))
+
+# Only idempotent requests are retried or hedged
+RETRY_METHODS = {"GET", "HEAD"}
+
+# Responses worth another attempt: rate limited, or a server error that is often transient
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """
+    Raised instead of sending a request to a host whose circuit breaker is open. It is a
+    ConnectionError, so callers handle it as they would an unreachable server.
+    """
+
+
+def retry_after(response):
+    """
+    Returns the wait in seconds asked for by a Retry-After header (seconds or an HTTP date), or None.
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker. After `threshold` consecutive failures the host's circuit opens and
+    requests to it fail at once; after `reset` seconds one trial request is let through (half open),
+    and its outcome closes the circuit again or keeps it open for another `reset` seconds.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset=BREAKER_RESET, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset = reset
+        self.clock = clock
+        self._failures = {}
+        self._opened_at = {}
+        self._trial = set()
+        self._lock = threading.Lock()
+
+    def allow(self, host):
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return True
+            if self.clock() - opened_at < self.reset or host in self._trial:
+                return False
+            self._trial.add(host)
+            return True
+
+    def success(self, host):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+            self._trial.discard(host)
+
+    def failure(self, host):
+        with self._lock:
+            self._failures[host] = self._failures.get(host, 0) + 1
+            if host in self._trial or self._failures[host] >= self.threshold:
+                self._opened_at[host] = self.clock()
+            self._trial.discard(host)
+
+    def is_open(self, host):
+        with self._lock:
+            return host in self._opened_at
+
+
+class ResilientAdapter(BaseAdapter):
+    """
+    Transport adapter that retries, hedges and guards the requests sent through the adapter it wraps.
+
+    - Idempotent requests (GET, HEAD) that fail to connect, time out, or get a RETRY_STATUS response
+      are retried up to max_attempts times, after a full-jitter exponential backoff, or after the
+      Retry-After the server asked for. A Retry-After longer than backoff_max is not waited for:
+      the response is returned as it is.
+    - Each failed attempt counts against the host's circuit breaker; while it is open, new requests to
+      the host raise CircuitOpenError without being sent. A request whose own retries open the circuit
+      is not retried further: it ends with the response (e.g. a 500) or the error of its last attempt.
+    - With hedge_after set, a GET that has no response after hedge_after seconds is sent a second
+      time, and the first response to arrive is used. A streamed GET is raced up to its headers: the
+      body is read from the winner only, and the loser is closed unread.
+    - Requests sent without a timeout get `timeout`.
+
+    Parameters:
+    - adapter (BaseAdapter): the adapter that sends the requests.
+    - max_attempts, backoff_base, backoff_max, hedge_after, timeout: see the module docstring.
+    - breaker (CircuitBreaker, optional): shared breaker; defaults to a new one.
+    - sleep (callable): used to wait between attempts.
+    """
+
+    def __init__(self, adapter, max_attempts=MAX_ATTEMPTS, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX,
+                 hedge_after=HEDGE_AFTER, timeout=DEFAULT_TIMEOUT, breaker=None, sleep=time.sleep):
+        super().__init__()
+        self.adapter = adapter
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.sleep = sleep
+        self._hedge_pool = None
+        self._pool_lock = threading.Lock()
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def send(self, request, stream=False, timeout=None, **kwargs):
+        host = urlsplit(request.url).netloc
+        if timeout is None:
+            timeout = self.timeout
+        retryable = request.method in RETRY_METHODS
+
+        # the last failed attempt of this request: the response it got, or the error it raised
+        failed = None
+        for attempt in range(self.max_attempts):
+            if not self.breaker.allow(host):
+                if failed is None:
+                    raise CircuitOpenError(f"Circuit breaker open for {host} after repeated failures", request=request)
+                # the circuit opened while this request was being retried: its last outcome is the answer
+                return self.give_up(failed)
+            last = not retryable or attempt == self.max_attempts - 1
+
+            try:
+                response = self.attempt(request, stream, timeout, kwargs, host)
+            except CassetteMiss:
+                raise
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as error:
+                self.breaker.failure(host)
+                if last:
+                    raise
+                outcome, wait_for = error, self.backoff(attempt)
+            else:
+                if response.status_code not in RETRY_STATUS:
+                    close_failed(failed)
+                    self.breaker.success(host)
+                    return response
+                self.breaker.failure(host)
+                asked = retry_after(response)
+                if last or (asked is not None and asked > self.backoff_max):
+                    close_failed(failed)
+                    return response
+                outcome, wait_for = response, max(asked or 0.0, self.backoff(attempt))
+
+            close_failed(failed)
+            failed = outcome
+            if self.breaker.is_open(host):
+                return self.give_up(failed)
+            metrics.count(host, "retries")
+            self.sleep(wait_for)
+
+    @staticmethod
+    def give_up(failed):
+        """
+        Ends a request with the outcome of its last attempt: returns the response, or raises the error.
+        """
+        if isinstance(failed, Exception):
+            raise failed
+        return failed
+
+    def attempt(self, request, stream, timeout, kwargs, host):
+        if not self.hedge_after or request.method != "GET":
+            return self.adapter.send(request, stream=stream, timeout=timeout, **kwargs)
+
+        pool = self.hedge_pool()
+        first = pool.submit(self.adapter.send, request, stream=stream, timeout=timeout, **kwargs)
+        done, _ = wait([first], timeout=self.hedge_after)
+        if done:
+            return first.result()
+
+        metrics.count(host, "hedges")
+        second = pool.submit(self.adapter.send, request.copy(), stream=stream, timeout=timeout, **kwargs)
+        pending = {first, second}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            answered = [future for future in done if future.exception() is None]
+            if answered or not pending:
+                for loser in pending:
+                    loser.add_done_callback(close_response)
+                for extra in answered[1:]:
+                    extra.result().close()
+                return (answered[0] if answered else done.pop()).result()
+
+    def hedge_pool(self):
+        with self._pool_lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+            return self._hedge_pool
+
+    def close(self):
+        with self._pool_lock:
+            if self._hedge_pool is not None:
+                self._hedge_pool.shutdown(wait=False)
+                self._hedge_pool = None
+        self.adapter.close()
+
+
+def close_failed(failed):
+    if isinstance(failed, requests.Response):
+        failed.close()
+
+
+def close_response(future):
+    if future.exception() is None:
+        future.result().close()
+
+
+def make_resilient(session, **kwargs):
+    """
+    Wraps every adapter mounted on a session in a ResilientAdapter, with one circuit breaker for all
+    of them. Call it after mounting (and instrumenting) the other adapters.
+    """
+    breaker = kwargs.pop("breaker", None) or CircuitBreaker()
+    for prefix, adapter in list(session.adapters.items()):
+        if not isinstance(adapter, ResilientAdapter):
+            session.mount(prefix, ResilientAdapter(adapter, breaker=breaker, **kwargs))
+    return session
@@ -1,7 +1,7 @@
-import requests
 import string
 import json
 import random
+from templates import CRATE_TEMPLATE, ENTITY_TEMPLATE, TemplateError, load_template
 
 def recursively_filter_key(obj, entity_template):
 
@@ -27,23 +27,112 @@ def recursively_filter_key(obj, entity_template):
     The function modifies the 'obj' argument in place. After execution, 'obj' will only
     contain the keys allowed by the 'entity_template' for each dictionary's '@type'.
     Elements of lists and tuples within 'obj' are also recursively filtered.
+    It is a wrapper around filter_entities, which does not recurse and can also return a filtered copy.
     """
 
-    if isinstance(obj, dict):
-        if '@type' in obj.keys():
-            if obj['@type'] in entity_template.keys():
-                #these are the keys we want to filter on
-                type_keys = entity_template[obj['@type']]
-                [obj.pop(k) for k in list(obj.keys()) if k not in type_keys]
+    filter_entities(obj, entity_template)
 
-            pass
-        for key, value in obj.items():
-            recursively_filter_key(value, entity_template)
 
-    # If it's a list or a tuple, iterate over its elements
-    elif isinstance(obj, (list, tuple)):
-        for index, value in enumerate(obj):
-            recursively_filter_key(value, entity_template)
+def compile_entity_template(entity_template):
+
+    """
+    Compiles an entity template (lists of keys to retain for each '@type') into frozensets,
+    so that checking whether a key is retained is a hash lookup. Compiling a compiled template
+    returns it unchanged.
+
+    Parameters:
+    entity_template (dict): A dictionary mapping '@type' values to lists of keys to retain.
+
+    Returns:
+    dict: The template with each list of keys replaced by a frozenset.
+    """
+
+    if all(isinstance(keys, frozenset) for keys in entity_template.values()):
+        return entity_template
+    return {at_type: frozenset(keys) for at_type, keys in entity_template.items()}
+
+
+def retained_keys(obj, compiled_template):
+
+    """
+    Returns the frozenset of keys to retain in a dictionary, or None if it is not filtered
+    (it has no '@type', or its '@type' is not in the template).
+    """
+
+    try:
+        return compiled_template.get(obj['@type'])
+    except (KeyError, TypeError):
+        #no '@type', or an unhashable '@type' (e.g. a list of types)
+        return None
+
+
+def filter_entities(obj, entity_template, copy=False):
+
+    """
+    Filters keys in a nested data structure (dictionaries, lists, tuples) based on an entity template,
+    as recursively_filter_key does, but iteratively (no recursion limit) and optionally without
+    modifying the input.
+
+    Each container is visited once, even if it is referenced from several places.
+
+    Parameters:
+    obj (dict | list | tuple): The nested data structure to be filtered.
+    entity_template (dict): The keys to retain for each '@type', as a plain or compiled template
+                            (see compile_entity_template).
+    copy (bool): If False (the default), filter obj in place. If True, leave obj unchanged and return a
+                 filtered copy of its dictionaries, lists and tuples. Objects referenced from several
+                 places in obj are also shared in the copy.
+
+    Returns:
+    The filtered structure: obj itself, or the copy.
+    """
+
+    compiled_template = compile_entity_template(entity_template)
+
+    if not copy:
+        seen = set()
+        stack = [obj]
+        while stack:
+            node = stack.pop()
+            if not isinstance(node, (dict, list, tuple)) or id(node) in seen:
+                continue
+            seen.add(id(node))
+
+            if isinstance(node, dict):
+                type_keys = retained_keys(node, compiled_template)
+                if type_keys is not None:
+                    [node.pop(k) for k in list(node.keys()) if k not in type_keys]
+                stack.extend(node.values())
+            else:
+                stack.extend(node)
+
+        return obj
+
+    #copy: build the filtered containers bottom-up; copies[id(node)] is the copy of node
+    copies = {}
+    stack = [(obj, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if not isinstance(node, (dict, list, tuple)) or id(node) in copies:
+            continue
+
+        if isinstance(node, dict):
+            type_keys = retained_keys(node, compiled_template)
+            children = [v for k, v in node.items() if type_keys is None or k in type_keys]
+        else:
+            children = node
+
+        if not children_done:
+            stack.append((node, True))
+            stack.extend((child, False) for child in children)
+            continue
+
+        if isinstance(node, dict):
+            copies[id(node)] = {k: copies.get(id(v), v) for k, v in node.items() if type_keys is None or k in type_keys}
+        else:
+            copies[id(node)] = type(node)(copies.get(id(v), v) for v in node)
+
+    return copies.get(id(obj), obj)
 
 
 
@@ -82,6 +171,54 @@ def top_level_id(crate):
 def is_array(var):
     return isinstance(var, (list, tuple))
 
+
+class CrateGraph:
+
+    """
+    An indexed, in-memory view of an RO-Crate's '@graph' array.
+
+    The entities stay in crate['@graph'] (and are changed in place); CrateGraph indexes them by '@id'
+    (the first entity with each '@id'), so lookups do not rescan the array.
+
+    Entities added with append() are indexed; entities added to crate['@graph'] directly are not
+    (call reindex() after such changes).
+
+    Args:
+        crate (dict): The RO-Crate object, represented as a python dictionary.
+    """
+
+    def __init__(self, crate):
+        self.crate = crate
+        self.reindex()
+
+    @property
+    def graph(self):
+        return self.crate['@graph']
+
+    def reindex(self):
+        self.by_id = {}
+        for entity in self.graph:
+            self.by_id.setdefault(entity['@id'], entity)
+
+    def __contains__(self, at_id):
+        return at_id in self.by_id
+
+    def __len__(self):
+        return len(self.graph)
+
+    def get(self, at_id, default=None):
+        """
+        Returns the entity with the given '@id', or default.
+        """
+        return self.by_id.get(at_id, default)
+
+    def append(self, entity):
+        """
+        Adds an entity to the end of the '@graph' array and indexes it.
+        """
+        self.graph.append(entity)
+        self.by_id.setdefault(entity['@id'], entity)
+
 def replace_blank_null_id(entity):
 
     """
@@ -105,20 +242,19 @@ def replace_blank_null_id(entity):
     Note:
         The function modifies the 'entity' dictionary in-place and also returns it.
     """
-    replace_string = get_random_string()
+    #only draw a random string when the entity has no @id to fill
+    if '@id' in entity.keys():
+        return
 
-    if 'uri' in entity.keys():
-        replace_string =entity['uri']
     if 'url' in entity.keys():
-        replace_string =entity['url']
-
-    #print(entity)
+        replace_string = entity['url']
+    elif 'uri' in entity.keys():
+        replace_string = entity['uri']
+    else:
+        replace_string = get_random_string()
 
-    #if not @id is no present or or is None, make new_id.
-    if '@id' not in entity.keys():
-        entity.update({'@id': replace_string })
-    if '@id' in entity.keys() is True and entity['@id'] is None:
-        entity.update({'@id': replace_string })
+    #if not @id is no present, make new_id.
+    entity.update({'@id': replace_string })
 
     #return entity
 
@@ -177,50 +313,62 @@ def search_replace_sub_dict(crate, graph_index):
     """
 
 
-    #grab the entity out of the crate as a dictionary
-    json_dict = crate['@graph'][graph_index]
+    flatten_entity(CrateGraph(crate), graph_index)
 
-    for key in json_dict.keys():
+
+def strip_to_id(entity):
+    """
+    Removes every key except '@id' from an entity dictionary, in place.
+    """
+    [entity.pop(k) for k in list(entity.keys()) if k != '@id']
 
 
-        current_ids = top_level_id(crate)
-        if isinstance(json_dict[key], dict):
-            try:
-                at_id = json_dict[key]['@id']
-            except:
-                replace_blank_null_id(json_dict[key])
-                at_id = json_dict[key]['@id']
-            if len(json_dict[key].keys()) > 1:
-                if at_id not in current_ids:
-                    #dict() is necessary to make a copy not a reference
-                    crate['@graph'].append(dict(json_dict[key]))
+def flatten_entity(crate_graph, graph_index):
 
+    """
+    Moves the entities nested in one node of the '@graph' array to the top level, replacing each
+    with a reference to its '@id'. Blank '@id's are filled first (see replace_blank_null_id).
+
+    Dictionaries that are values of the node, or elements of a list (or tuple) value, are handled.
+    Deeper nesting is handled when the relocated entities are themselves flattened.
+
+    Args:
+        crate_graph (CrateGraph): The indexed RO-Crate. Relocated entities are appended to it.
+        graph_index (int): The index of the entity in the '@graph' array to flatten.
+
+    Returns:
+        None: The function modifies the crate in-place.
+    """
+
+    json_dict = crate_graph.graph[graph_index]
+
+    for key in json_dict.keys():
+        value = json_dict[key]
+
+        if isinstance(value, dict):
+            replace_blank_null_id(value)
+            at_id = value['@id']
+            if len(value.keys()) > 1:
+                if at_id not in crate_graph:
+                    #dict() is necessary to make a copy not a reference
+                    crate_graph.append(dict(value))
                 #replace local dict with @id
-                [json_dict[key].pop(k) for k in list(json_dict[key].keys()) if k != '@id']
-
-        #recurse through any lists or tuples and check if they contain sub dictionaries.
-        #a true recursive approach is not used here due to difficulties with how the function needs
-        #to modfy both the ro-crate and the entity
-
-
-        elif is_array(json_dict[key]):
-            for j in range(len(json_dict[key])):
-                #print(key, j)
-                if isinstance(json_dict[key][j], dict):
-                    try:
-                        at_id = json_dict[key][j]['@id']
-                    except:
-                        replace_blank_null_id(json_dict[key][j])
-                        at_id = json_dict[key][j]['@id']
-                    if len(json_dict[key][j].keys()) > 1:
-                        if at_id not in current_ids:
-                            #the dict() is necessary to make a copy not a reference
-                            crate['@graph'].append(dict(json_dict[key][j]))
+                strip_to_id(value)
+
+        elif is_array(value):
+            #entities relocated from this list are not checked against each other,
+            #so the same entity listed twice is relocated twice (as the original flattening did)
+            relocated = set()
+            for item in value:
+                if isinstance(item, dict):
+                    replace_blank_null_id(item)
+                    at_id = item['@id']
+                    if len(item.keys()) > 1 and (at_id in relocated or at_id not in crate_graph):
+                        #the dict() is necessary to make a copy not a reference
+                        crate_graph.append(dict(item))
+                        relocated.add(at_id)
                     #replace local dict with @id
-                    [json_dict[key][j].pop(k) for k in list(json_dict[key][j].keys()) if k != '@id']
-
-        else:
-            pass
+                    strip_to_id(item)
 
 
 
@@ -322,9 +470,27 @@ def apply_entity_mapping(metadata, mapping, issue_dict, graph_index):
         print(f"Warning: graph_index {graph_index} is out of range for the metadata's '@graph' array.")
         return
 
+    apply_mapping_to_entity(metadata['@graph'][graph_index], mapping, issue_dict)
+
+
+def apply_mapping_to_entity(entity, mapping, issue_dict):
+    """
+    Updates an entity dictionary using values from an issue dictionary, based on a provided mapping
+    (see apply_entity_mapping). The mapping's '@id' identifies the entity and is never overwritten.
+
+    Parameters:
+    - entity (dict): The target entity, changed in place.
+    - mapping (dict): A dictionary where each key represents an attribute in the target entity and each value
+                      corresponds to an attribute or a list of attributes in the issue_dict.
+    - issue_dict (dict): A dictionary containing data that should be mapped to the target entity.
+
+    Returns:
+    None: The function updates the entity in place and does not return a value.
+    """
+
     # Iterate over the mapping and apply updates where possible
     for target_key, issue_keys in mapping.items():
-        if issue_keys is None:
+        if issue_keys is None or target_key == '@id':
             # Skip mapping if issue_keys is None
             continue
 
@@ -332,11 +498,11 @@ def apply_entity_mapping(metadata, mapping, issue_dict, graph_index):
             # Handle list of keys - collect corresponding values from issue_dict
             values = [issue_dict[key] for key in issue_keys if key in issue_dict]
             if values:
-                metadata['@graph'][graph_index][target_key] = values
+                entity[target_key] = values
         else:
             # Single key handling as before
             if issue_keys in issue_dict:
-                metadata['@graph'][graph_index][target_key] = issue_dict[issue_keys]
+                entity[target_key] = issue_dict[issue_keys]
 
 
 def dict_to_ro_crate_mapping(crate, issue_dict,  mapping_list):
@@ -358,9 +524,9 @@ def dict_to_ro_crate_mapping(crate, issue_dict,  mapping_list):
     None: Changes to crate occur in-place
 
     Note:
-    the relationship between the entity and the index (graph_index) is only valid before the graph has been flattened
-    A better way to do this is to use the (unique) @id property of the dictionary inside the mapping lists
-    and the entites in the crate
+    Each mapping is applied to the entity whose @id matches the mapping's "@id", so the order of the
+    entities in the template does not matter. If no entity has that @id, the mapping falls back to the
+    entity at the mapping's position in the list (graph_index=i+1) with a warning.
 
 
     """
@@ -370,74 +536,70 @@ def dict_to_ro_crate_mapping(crate, issue_dict,  mapping_list):
     ##Apply mapping
     ####################
 
-
+    crate_graph = CrateGraph(crate)
 
     for i, mapping in enumerate(mapping_list):
 
-        apply_entity_mapping(crate,
-                             mapping, issue_dict, graph_index=i+1)
+        entity = crate_graph.get(mapping.get("@id"))
+
+        if entity is None:
+            print(f"Warning: no entity with @id `{mapping.get('@id')}` in the crate; applying mapping to graph_index {i+1}.")
+            apply_entity_mapping(crate,
+                                 mapping, issue_dict, graph_index=i+1)
+        else:
+            apply_mapping_to_entity(entity, mapping, issue_dict)
 
 
 
 
 
-def load_crate_template(metadata_template_url="https://raw.githubusercontent.com/ModelAtlasofTheEarth/metadata_schema/main/mate_ro_crate/ro-crate-metadata.json"):
+def load_crate_template(ref=None):
 
     """
-    Downloads the M@TE RO-Crate metadata template from a specified URL and returns it as a dictionary.
+    Loads the M@TE RO-Crate metadata template (ro-crate-metadata.json) from the metadata_schema repository.
+    The template is cached on disk and in memory (see templates.py); each call returns a fresh copy.
 
     Parameters:
-    - metadata_template_url (str): URL to the JSON-LD metadata template.
+    - ref (str, optional): commit sha, tag or branch to load. Defaults to the pinned ref.
 
     Returns:
-    - dict: The loaded metadata template as a dictionary, or None if an error occurs.
+    - dict: The loaded metadata template as a dictionary.
+
+    Raises:
+    - TemplateError: if the template is not cached and cannot be downloaded (or TEMPLATE_OFFLINE is set).
     """
 
-    try:
-        response = requests.get(metadata_template_url)
-        response.raise_for_status()  # Raises an HTTPError if the HTTP request returned an unsuccessful status code
-        crate = json.loads(response.text)
-        print("JSON-LD data loaded successfully.")
-        return crate
-    except requests.exceptions.RequestException as e:
-        print(f"Failed to download the file. Error: {e}")
-        return None
+    return load_template(CRATE_TEMPLATE, ref)
 
 
 
-def load_entity_template(entity_template_url="https://raw.githubusercontent.com/ModelAtlasofTheEarth/metadata_schema/main/mate_ro_crate/type_templates.json"):
+def load_entity_template(ref=None):
     """
-    Downloads a JSON-LD entity template from the specified URL and returns it as a dictionary.
+    Loads the M@TE entity template (type_templates.json) from the metadata_schema repository.
+    The template is cached on disk and in memory (see templates.py); each call returns a fresh copy.
 
     Parameters:
-    - entity_template_url (str): URL to the JSON-LD entity template.
+    - ref (str, optional): commit sha, tag or branch to load. Defaults to the pinned ref.
 
     Returns:
-    - dict: The loaded entity template as a dictionary, or None if an error occurs.
+    - dict: The loaded entity template as a dictionary.
+
+    Raises:
+    - TemplateError: if the template is not cached and cannot be downloaded (or TEMPLATE_OFFLINE is set).
     """
 
-    try:
-        response = requests.get(entity_template_url)
-        response.raise_for_status()  # Raises an HTTPError for bad HTTP responses
-        entity_template = json.loads(response.text)
-        print("JSON-LD data loaded successfully.")
-        return entity_template
-    except requests.exceptions.RequestException as e:
-        print(f"Failed to download the file. Error: {e}")
-        return None
+    return load_template(ENTITY_TEMPLATE, ref)
 
 
 def flatten_crate(crate):
     """
-    Flattens a given RO-Crate by processing its '@graph' attribute. It iteratively applies two functions to each
-    entity within the '@graph':
-
-    1. `search_replace_blank_node_ids()`: Assigns IDs to entities that lack them.
-    2. `search_replace_sub_dict()`: Moves nested dictionaries to the top level of the '@graph' and replaces
-       the original nested dictionaries with references to their new top-level '@id'.
+    Flattens a given RO-Crate by processing its '@graph' attribute in a single pass over a worklist.
+    Each entity in the '@graph' is flattened with `flatten_entity()`, which assigns IDs to nested entities that
+    lack them, moves them to the end of the '@graph' and replaces them with references to their '@id'.
+    Relocated entities are flattened in turn when the pass reaches them, so any nesting depth is handled.
 
-    The process repeats until the length of the '@graph' array stabilizes, indicating that all nested entities
-    have been processed, resulting in a flattened and compacted crate structure.
+    Membership of the top level is checked against the '@id' index of a CrateGraph, so the cost is linear
+    in the number of entities rather than rescanning the '@graph' for every key.
 
     Parameters:
     - crate (dict): The RO-Crate object to be flattened, expected to have an '@graph' key containing a list of entities.
@@ -447,26 +609,18 @@ def flatten_crate(crate):
     - dict: The flattened RO-Crate with nested entities processed and moved to the top level of the '@graph'.
 
     Note:
-    This function assumes the presence of 'search_replace_blank_node_ids' and 'search_replace_sub_dict' functions
-    which are applied to each entity. It does not perform any validation on the input crate structure.
+    It does not perform any validation on the input crate structure.
     """
 
     try:
-        current_length = len(crate['@graph'])
-        previous_length = current_length - 1
-
-        # Loop until the number of nodes in '@graph' stabilizes, indicating no more nested entities are found
-        while current_length > previous_length:
-            previous_length = current_length  # Update the length for comparison in the next iteration
-
-            for i in range(current_length):
-                # Apply the two functions to each entity in the '@graph'
-                search_replace_blank_node_ids(crate, i)
-                search_replace_sub_dict(crate, i)
-
-            # Update the current length after modifications
-            current_length = len(crate['@graph'])
-
+        # Index of the top-level @ids, kept up to date as nested entities are relocated
+        crate_graph = CrateGraph(crate)
+
+        # Worklist: relocated entities are appended to '@graph' and flattened in turn when reached
+        i = 0
+        while i < len(crate_graph):
+            flatten_entity(crate_graph, i)
+            i += 1
 
     except KeyError as e:
         # Handle cases where the expected keys are missing in the input crate
@@ -0,0 +1,445 @@
+"""
+Offline index of the ROR registry, built from the public ROR data dump, so funders given as a website
+or a name are resolved locally instead of by a search on api.ror.org.
+
+The index maps website domains, names, aliases, acronyms and name tokens to ROR ids, and keeps the
+display name of every organisation, so a match needs no further request. It is stored in one binary
+file that is memory-mapped, not loaded: a lookup is a few binary searches over sorted tables.
+
+- Domains are stored reversed (`au.gov.ga` for ga.gov.au), so a host is matched to its longest
+  indexed suffix by probing its label boundaries from the longest down (`rses.anu.edu.au`, then
+  `anu.edu.au`, ...), a suffix trie laid out as a sorted table.
+- Names are normalised (case, accents, punctuation) and matched exactly; failing that, the orgs
+  whose names contain every token of the query are intersected, and a single survivor is a match.
+
+Configuration:
+- ROR_INDEX_PATH: the index file used by default_index(). No index is used if unset or missing.
+  The workflows build it from the latest dump into .cache/ror/index.bin, cached until ROR publishes
+  the next one.
+
+Usage:
+    python .github/scripts/ror_index.py build DUMP(.zip|.json) [--output FILE]
+    python .github/scripts/ror_index.py lookup QUERY [--index FILE]
+"""
+import argparse
+import bisect
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import unicodedata
+import zipfile
+from urllib.parse import urlsplit
+
+ROR_INDEX_PATH = os.getenv("ROR_INDEX_PATH")
+
+MAGIC = b"RORIDX01"
+
+# magic, then the number of orgs, domains, names, tokens and postings, then the offset of each
+# section (orgs, domains, names, tokens, postings, strings)
+HEADER = struct.Struct("<8s5I6I")
+
+# ROR id (9 characters), offset and length of the display name in the strings section
+ORG = struct.Struct("<9sIH")
+
+# offset and length of the key in the strings section, and the org it maps to
+KEY = struct.Struct("<IHI")
+
+# offset and length of the token in the strings section, offset and count of its postings
+TOKEN = struct.Struct("<IHII")
+
+POSTING = struct.Struct("<I")
+
+ROR_URL = "https://ror.org/"
+ROR_ID = re.compile(r"(?:^|ror\.org/)(0[a-z0-9]{6}[0-9]{2})/?$", re.IGNORECASE)
+
+# Queries whose rarest token names more organisations than this are too vague to resolve by tokens
+MAX_CANDIDATES = 1000
+
+# Words that say nothing about which organisation is meant
+STOPWORDS = {"the", "of", "and", "for", "in", "at", "de", "la", "le", "du", "des", "der", "und", "fur", "y", "e"}
+
+
+def ror_id(value):
+    """
+    Returns the bare ROR id in a ROR URL or id, or None.
+    """
+    match = ROR_ID.search(value.strip())
+    return match.group(1).lower() if match else None
+
+
+def domain_key(url_or_domain):
+    """
+    Returns the host of a URL or domain, without `www.`, as reversed labels (`au.gov.ga`), or None.
+    """
+    value = url_or_domain.strip().lower()
+    if "://" not in value:
+        value = "http://" + value
+    try:
+        host = urlsplit(value).hostname
+    except ValueError:
+        return None
+    if not host or "." not in host:
+        return None
+    if host.startswith("www."):
+        host = host[4:]
+    return ".".join(reversed(host.split(".")))
+
+
+def name_key(name):
+    """
+    Returns a name folded for matching: lower case, accents and punctuation removed, spaces collapsed.
+    """
+    folded = unicodedata.normalize("NFKD", name.casefold())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^\w]+", " ", folded).split())
+
+
+def name_tokens(name):
+    return {token for token in name_key(name).split() if token not in STOPWORDS}
+
+
+def organisation_fields(record):
+    """
+    Returns (ror id, display name, names, domains) of a ROR record, in the v1 or v2 schema of the dump,
+    or None for records that are not active.
+    """
+    if record.get("status", "active") != "active":
+        return None
+    org_id = ror_id(record["id"])
+
+    if "names" in record:  # v2 schema
+        names = [entry["value"] for entry in record["names"]]
+        display = next((entry["value"] for entry in record["names"] if "ror_display" in entry.get("types", [])), names[0])
+        links = [link["value"] for link in record.get("links", []) if link.get("type") == "website"]
+    else:  # v1 schema
+        display = record["name"]
+        names = [display] + record.get("aliases", []) + record.get("acronyms", [])
+        names += [label["label"] for label in record.get("labels", [])]
+        links = record.get("links", [])
+
+    domains = {key for key in map(domain_key, links + record.get("domains", [])) if key}
+    return org_id, display, names, domains
+
+
+def read_dump(path):
+    """
+    Yields the records of a ROR data dump: the zip published on Zenodo, or the JSON file in it.
+    """
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            members = [name for name in archive.namelist() if name.endswith(".json")]
+            # dumps from 2024 hold the same records in both schemas; either can be read
+            member = next((name for name in members if name.endswith("schema_v2.json")), members[0])
+            with archive.open(member) as f:
+                yield from iter_records(f)
+    else:
+        with open(path, "rb") as f:
+            yield from iter_records(f)
+
+
+def iter_records(f):
+    try:
+        import ijson
+    except ImportError:
+        yield from json.load(f)
+        return
+    yield from ijson.items(f, "item")
+
+
+class Strings:
+    """
+    The strings section being built: each distinct string is stored once.
+    """
+
+    def __init__(self):
+        self.blob = bytearray()
+        self._offsets = {}
+
+    def add(self, value):
+        data = value.encode("utf-8")
+        if data not in self._offsets:
+            self._offsets[data] = len(self.blob)
+            self.blob += data
+        return self._offsets[data], len(data)
+
+
+def build_index(records, path):
+    """
+    Writes the index of an iterable of ROR records (see read_dump) to path.
+
+    Returns:
+    - int: the number of organisations indexed.
+    """
+    orgs = []
+    for record in records:
+        fields = organisation_fields(record)
+        if fields is not None and fields[0]:
+            orgs.append(fields)
+    orgs.sort(key=lambda org: org[0])
+
+    strings = Strings()
+    domains, names, postings = [], [], {}
+    org_table = bytearray()
+    for i, (org_id, display, org_names, org_domains) in enumerate(orgs):
+        offset, length = strings.add(display[:0xFFFF])
+        org_table += ORG.pack(org_id.encode("ascii"), offset, length)
+        domains += [(key, i) for key in org_domains]
+        names += [(key, i) for key in {name_key(name) for name in org_names} if key]
+        for token in set().union(*(name_tokens(name) for name in org_names)):
+            postings.setdefault(token, []).append(i)
+
+    def key_table(entries):
+        table = bytearray()
+        for key, i in sorted(set(entries)):
+            table += KEY.pack(*strings.add(key), i)
+        return table
+
+    domain_table = key_table(domains)
+    name_table = key_table(names)
+    token_table, posting_table = bytearray(), bytearray()
+    for token in sorted(postings):
+        table_offset = len(posting_table) // POSTING.size
+        for i in postings[token]:
+            posting_table += POSTING.pack(i)
+        token_table += TOKEN.pack(*strings.add(token), table_offset, len(postings[token]))
+
+    sections = [org_table, domain_table, name_table, token_table, posting_table, strings.blob]
+    offsets, position = [], HEADER.size
+    for section in sections:
+        offsets.append(position)
+        position += len(section)
+
+    counts = [len(orgs), len(domain_table) // KEY.size, len(name_table) // KEY.size,
+              len(token_table) // TOKEN.size, len(posting_table) // POSTING.size]
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, *counts, *offsets))
+        for section in sections:
+            f.write(section)
+    os.replace(tmp_path, path)
+    return len(orgs)
+
+
+class SortedTable:
+    """
+    A section of fixed-size entries sorted by their key string, searched in place in the mapped file.
+    """
+
+    def __init__(self, index, layout, offset, count):
+        self.index = index
+        self.layout = layout
+        self.offset = offset
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        # the key of entry i, so bisect can search the table
+        entry = self.layout.unpack_from(self.index.mm, self.offset + i * self.layout.size)
+        return self.index.string(entry[0], entry[1])
+
+    def entries(self, key):
+        """
+        Returns the entries with the given key.
+        """
+        data = key.encode("utf-8")
+        i = bisect.bisect_left(self, data)
+        found = []
+        while i < self.count and self[i] == data:
+            found.append(self.layout.unpack_from(self.index.mm, self.offset + i * self.layout.size))
+            i += 1
+        return found
+
+
+class RorIndex:
+    """
+    A ROR index file (see build_index), memory-mapped for lookups.
+
+    Parameters:
+    - path (str): the index file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n_orgs, n_domains, n_names, n_tokens, _, orgs, domains, names, tokens, postings, strings = HEADER.unpack_from(self.mm)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a ROR index")
+        self.n_orgs = n_orgs
+        self._orgs = orgs
+        self._postings = postings
+        self._strings = strings
+        self.domains = SortedTable(self, KEY, domains, n_domains)
+        self.names = SortedTable(self, KEY, names, n_names)
+        self.tokens = SortedTable(self, TOKEN, tokens, n_tokens)
+
+    def string(self, offset, length):
+        start = self._strings + offset
+        return self.mm[start:start + length]
+
+    def org(self, i):
+        """
+        Returns the organisation at position i, as the id and name fields of its ROR record.
+        """
+        org_id, offset, length = ORG.unpack_from(self.mm, self._orgs + i * ORG.size)
+        return {"id": ROR_URL + org_id.decode("ascii"), "name": self.string(offset, length).decode("utf-8")}
+
+    def organization(self, ror):
+        """
+        Returns the id and name of the organisation with a ROR id (or URL), or None if it is not indexed.
+        """
+        bare = ror_id(ror)
+        if bare is None:
+            return None
+        target = bare.encode("ascii")
+        lo, hi = 0, self.n_orgs
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.mm[self._orgs + mid * ORG.size:self._orgs + mid * ORG.size + 9] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n_orgs and self.mm[self._orgs + lo * ORG.size:self._orgs + lo * ORG.size + 9] == target:
+            return self.org(lo)
+        return None
+
+    def lookup_url(self, url):
+        """
+        Returns the organisation whose website is the longest indexed suffix of the URL's host, or
+        None if there is none or it is shared by several organisations.
+        """
+        key = domain_key(url)
+        if key is None:
+            return None
+        labels = key.split(".")
+        # a bare public suffix (e.g. `au` or `edu.au`) is never an organisation's domain
+        for n in range(len(labels), 1, -1):
+            found = {entry[2] for entry in self.domains.entries(".".join(labels[:n]))}
+            if found:
+                return self.org(found.pop()) if len(found) == 1 else None
+        return None
+
+    def lookup_name(self, name):
+        """
+        Returns the organisation with a name, alias, acronym or label matching name, or None if there
+        is none or the name is ambiguous.
+        """
+        key = name_key(name)
+        if not key:
+            return None
+        found = {entry[2] for entry in self.names.entries(key)}
+        if found:
+            return self.org(found.pop()) if len(found) == 1 else None
+
+        tokens = name_tokens(name)
+        if len(tokens) < 2:
+            return None
+        spans = []
+        for token in tokens:
+            entries = self.tokens.entries(token)
+            if not entries:
+                return None
+            spans.append(entries[0][2:])
+        # postings are sorted: the rarest token's are read, and only searched for in the others
+        spans.sort(key=lambda posting_span: posting_span[1])
+        offset, count = spans[0]
+        if count > MAX_CANDIDATES:
+            return None
+        candidates = set(struct.unpack_from(f"<{count}I", self.mm, self._postings + offset * POSTING.size))
+        for offset, count in spans[1:]:
+            candidates = {i for i in candidates if self.in_postings(offset, count, i)}
+            if not candidates:
+                return None
+        return self.org(candidates.pop()) if len(candidates) == 1 else None
+
+    def in_postings(self, offset, count, i):
+        start = self._postings + offset * POSTING.size
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if POSTING.unpack_from(self.mm, start + mid * POSTING.size)[0] < i:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo < count and POSTING.unpack_from(self.mm, start + lo * POSTING.size)[0] == i
+
+    def lookup(self, query):
+        """
+        Returns the organisation for a ROR id, a website URL or a name, or None.
+        """
+        if ror_id(query):
+            return self.organization(query)
+        if "://" in query or re.fullmatch(r"[\w.-]+\.[a-z]{2,}(/\S*)?", query.strip().lower()):
+            return self.lookup_url(query)
+        return self.lookup_name(query)
+
+    def close(self):
+        self.mm.close()
+
+
+_index = None
+_index_loaded = False
+_index_lock = threading.Lock()
+
+
+def default_index():
+    """
+    The index at ROR_INDEX_PATH, opened on first use, or None if there is no index.
+    """
+    global _index, _index_loaded
+    with _index_lock:
+        if not _index_loaded:
+            _index_loaded = True
+            if ROR_INDEX_PATH and os.path.exists(ROR_INDEX_PATH):
+                _index = RorIndex(ROR_INDEX_PATH)
+        return _index
+
+
+def set_default_index(index):
+    """
+    Replaces the index used by default_index (None for no index).
+    """
+    global _index, _index_loaded
+    with _index_lock:
+        _index, _index_loaded = index, True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="build the index from a ROR data dump")
+    build_parser.add_argument("dump", help="ROR data dump (.zip from Zenodo, or the .json in it)")
+    build_parser.add_argument("--output", default=ROR_INDEX_PATH or "ror_index.bin", help="index file to write")
+
+    lookup_parser = commands.add_parser("lookup", help="look up a ROR id, website or name")
+    lookup_parser.add_argument("query")
+    lookup_parser.add_argument("--index", default=ROR_INDEX_PATH or "ror_index.bin", help="index file to read")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        start = time.perf_counter()
+        n = build_index(read_dump(args.dump), args.output)
+        print(f"Indexed {n} organisations in {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB, "
+              f"{time.perf_counter() - start:.1f} s)")
+        return
+
+    index = RorIndex(args.index)
+    start = time.perf_counter()
+    org = index.lookup(args.query)
+    elapsed = (time.perf_counter() - start) * 1e6
+    if org is None:
+        print(f"No match ({elapsed:.0f} µs)")
+        sys.exit(1)
+    print(f"{org['id']}  {org['name']}  ({elapsed:.0f} µs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Coalesces calls that share a key, so that only one of them does the work.
+
+    The first caller for a key runs the function; concurrent callers with the same key wait for
+    and share its result. Results are kept for the lifetime of the object so repeated calls are
+    also served without repeating the work, unless the result is rejected by `keep`.
+
+    Parameters:
+    - keep (callable, optional): called with each result; results for which it returns False are
+      shared with callers already waiting but not kept for later calls (e.g. failed lookups).
+    """
+
+    def __init__(self, keep=None):
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {"calls": 0, "shared": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Returns fn(*args, **kwargs), sharing one call between every caller with the same key.
+        Exceptions raised by fn are re-raised in every caller waiting on it.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.stats["calls"] += 1
+            else:
+                self.stats["shared"] += 1
+
+        if leader:
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as err:
+                self.forget(key)
+                future.set_exception(err)
+                raise
+            if self.keep is not None and not self.keep(result):
+                self.forget(key)
+            future.set_result(result)
+
+        return future.result()
+
+    def forget(self, key):
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._calls.clear()
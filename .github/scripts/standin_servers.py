@@ -0,0 +1,624 @@
+"""
+Local stand-in servers for the external APIs used by the pipeline: Crossref, Zenodo, DataCite,
+doi.org (registration agencies and content negotiation), ROR, ORCID, the GitHub REST API (issues,
+comments, git data, contents, repo listing), raw.githubusercontent.com (templates) and a file host
+for URI checks.
+
+Records are served from the fixtures in fixtures/standin. Each server can add latency and jitter,
+answer a share of requests with 429 (with Retry-After) or 5xx errors, and revalidates with ETags,
+so the full pipeline can be run, load-tested and profiled without the real services.
+
+Usage:
+    python .github/scripts/standin_servers.py [--latency S] [--jitter S] [--error-rate P] [--rate-limit P]
+                                              [--config FILE] [--strict] [-- COMMAND ...]
+
+Without a command, the environment variables pointing the pipeline at the servers are printed and the
+servers run until interrupted. With a command (e.g. `-- python .github/scripts/write_report.py`), the
+command is run with those variables set and the servers stop when it exits.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(SCRIPT_DIR, "fixtures", "standin")
+
+# Placeholder for the record id in the _default.json fixtures
+ID_PLACEHOLDER = "__ID__"
+
+# Placeholder for the file server's URL in the issue fixtures
+FILES_PLACEHOLDER = "__FILES__"
+
+# Template ref used with the stand-ins, whose templates are not the ones pinned in templates.lock.json
+STANDIN_TEMPLATE_REF = "0" * 40
+
+# Repository whose issues are read by write_report.py and write_metadata.py
+ISSUE_REPO = "hvidy/PIPE-4002-EarthByte-ModelAtlas"
+
+
+class Faults:
+    """
+    Latency and failures injected into the responses of a server.
+
+    Parameters:
+    - latency (float): seconds added to every response.
+    - jitter (float): up to this many seconds are added at random on top of latency.
+    - error_rate (float): share of requests answered with a 500, 502 or 503 error.
+    - rate_limit (float): share of requests answered with 429 Too Many Requests.
+    - retry_after (int): Retry-After (seconds) sent with 429 responses.
+    - seed (int, optional): random seed, so a run can be repeated.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit=0.0, retry_after=1, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        with self._lock:
+            jitter = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+        if self.latency or jitter:
+            time.sleep(self.latency + jitter)
+
+    def failure(self):
+        """
+        Returns an injected failure as (status, headers, body), or None.
+        """
+        with self._lock:
+            draw = self._random.random()
+            status = self._random.choice([500, 502, 503])
+        if draw < self.rate_limit:
+            return 429, {"Retry-After": str(self.retry_after)}, {"message": "Too Many Requests (stand-in)"}
+        if draw < self.rate_limit + self.error_rate:
+            return status, {}, {"message": "Server error (stand-in)"}
+        return None
+
+
+class Service:
+    """
+    Base class for a stand-in API. Subclasses implement route(method, path, query, body), which
+    returns (status, headers, body); a body that is not bytes is sent as JSON.
+
+    Parameters:
+    - faults (Faults): latency and failures injected into the responses.
+    - strict (bool): answer 404 for ids without a fixture, instead of filling in _default.json.
+    """
+
+    name = None
+
+    def __init__(self, faults=None, strict=False):
+        self.faults = faults or Faults()
+        self.strict = strict
+        self.url = None
+        self.stats = {"requests": 0, "injected": 0, "not_modified": 0}
+        self._stats_lock = threading.Lock()
+
+    def count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def fixture(self, record_id):
+        """
+        Returns the fixture for a record id (with '/' replaced by '_', lower-cased), or the default
+        fixture with the id filled in. Returns None if there is neither (or strict is set).
+        """
+        directory = os.path.join(FIXTURE_DIR, self.name)
+        path = os.path.join(directory, record_id.replace("/", "_").lower() + ".json")
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+        default = os.path.join(directory, "_default.json")
+        if self.strict or not os.path.exists(default):
+            return None
+        with open(default) as f:
+            return json.loads(f.read().replace(ID_PLACEHOLDER, record_id))
+
+    def record(self, record_id):
+        record = self.fixture(record_id)
+        if record is None:
+            return 404, {}, {"status": "error", "message": f"{record_id} not found"}
+        return 200, {}, record
+
+    def route(self, method, path, query, body):
+        return 404, {}, {"message": "Not Found"}
+
+
+class CrossrefService(Service):
+    name = "crossref"
+
+    def route(self, method, path, query, body):
+        if path.startswith("/works/"):
+            return self.record(unquote(path[len("/works/"):]).lower())
+        return super().route(method, path, query, body)
+
+
+class ZenodoService(Service):
+    name = "zenodo"
+
+    def route(self, method, path, query, body):
+        if path.startswith("/api/records/"):
+            return self.record(path[len("/api/records/"):].strip("/"))
+        return super().route(method, path, query, body)
+
+
+class DataCiteService(Service):
+    name = "datacite"
+
+    def route(self, method, path, query, body):
+        if path.startswith("/dois/"):
+            return self.record(unquote(path[len("/dois/"):]).lower())
+        return super().route(method, path, query, body)
+
+
+class DoiService(Service):
+    """
+    doi.org: the registration agency of a prefix (/ra/<prefix>, from fixtures/standin/doi/_ra.json), and
+    CSL JSON for any DOI by content negotiation.
+    """
+
+    name = "doi"
+
+    def route(self, method, path, query, body):
+        if path.startswith("/ra/"):
+            prefix = unquote(path[len("/ra/"):]).strip("/")
+            with open(os.path.join(FIXTURE_DIR, self.name, "_ra.json")) as f:
+                agencies = json.load(f)
+            if prefix in agencies:
+                return 200, {}, [{"DOI": prefix, "RA": agencies[prefix]}]
+            return 200, {}, [{"DOI": prefix, "status": "DOI does not exist"}]
+        if path.startswith("/10."):
+            return self.record(unquote(path[1:]).lower())
+        return super().route(method, path, query, body)
+
+
+class RorService(Service):
+    name = "ror"
+
+    def route(self, method, path, query, body):
+        if path.rstrip("/") == "/organizations" and "query.advanced" in query:
+            with open(os.path.join(FIXTURE_DIR, self.name, "_search.json")) as f:
+                return 200, {}, json.load(f)
+        if path.startswith("/organizations/"):
+            return self.record(path[len("/organizations/"):].strip("/"))
+        return super().route(method, path, query, body)
+
+
+class OrcidService(Service):
+    name = "orcid"
+
+    # Sections of a record that can be requested on their own, and where they sit in the full record
+    SECTIONS = {"person": ("person",), "employments": ("activities-summary", "employments")}
+
+    def route(self, method, path, query, body):
+        match = re.fullmatch(r"/v3\.0/(?P<orcid>[0-9X-]{19})(?:/(?P<section>[a-z-]+))?/?", path)
+        if not match:
+            return super().route(method, path, query, body)
+
+        status, headers, record = self.record(match["orcid"])
+        if status != 200 or match["section"] is None:
+            return status, headers, record
+        if match["section"] not in self.SECTIONS:
+            return 404, {}, {"message": f"Unknown section {match['section']}"}
+        for key in self.SECTIONS[match["section"]]:
+            record = record[key]
+        return status, headers, record
+
+
+class FilesService(Service):
+    """
+    Serves a small file at every path, for URI checks and image downloads.
+    """
+
+    name = "files"
+
+    PNG = base64.b64decode("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg==")
+
+    def route(self, method, path, query, body):
+        if path.endswith(".png"):
+            return 200, {"Content-Type": "image/png"}, self.PNG
+        return 200, {"Content-Type": "text/plain"}, f"Stand-in content of {path}\n".encode()
+
+
+class RawService(Service):
+    """
+    Serves repository files from fixtures/standin/raw, whatever the repository and ref.
+    """
+
+    name = "raw"
+
+    def route(self, method, path, query, body):
+        parts = path.strip("/").split("/", 3)
+        if len(parts) == 4:
+            file_path = os.path.join(FIXTURE_DIR, self.name, *parts[3].split("/"))
+            if os.path.isfile(file_path):
+                with open(file_path, "rb") as f:
+                    return 200, {"Content-Type": "text/plain; charset=utf-8"}, f.read()
+        return 404, {}, b"404: Not Found"
+
+
+class GitHubService(Service):
+    """
+    An in-memory GitHub REST API: repositories (created on first access, with one initial commit),
+    issues seeded from fixtures/standin/github/issue_<n>.md, comments, the git data API (blobs, trees,
+    commits, refs), the contents API and the owner's repository listing.
+
+    Parameters:
+    - files_url (str): URL of the file server, substituted into the issue fixtures.
+    - repos (list): names ("owner/name") of extra repositories that already exist, e.g. for slug allocation.
+    """
+
+    name = "github"
+
+    def __init__(self, faults=None, strict=False, files_url="", repos=()):
+        super().__init__(faults, strict)
+        self.files_url = files_url
+        self.repos = {}
+        self.comments = []
+        self._lock = threading.Lock()
+        for full_name in [ISSUE_REPO, *repos]:
+            self.repo(full_name)
+
+    # git objects
+
+    def store(self, repo, kind, content):
+        sha = hashlib.sha1(json.dumps([kind, content], sort_keys=True).encode()).hexdigest()
+        repo["objects"][sha] = (kind, content)
+        return sha
+
+    def repo(self, full_name):
+        with self._lock:
+            if full_name not in self.repos:
+                repo = {"full_name": full_name, "id": len(self.repos) + 1, "objects": {}, "refs": {}, "issues": {}}
+                blob = self.store(repo, "blob", base64.b64encode(b"# Stand-in repository\n").decode())
+                tree = self.store(repo, "tree", {"README.md": blob})
+                repo["refs"]["heads/main"] = self.store(repo, "commit", {"message": "Initial commit", "tree": tree, "parents": []})
+                self.repos[full_name] = repo
+            return self.repos[full_name]
+
+    def repo_json(self, repo):
+        owner, name = repo["full_name"].split("/")
+        return {"id": repo["id"], "name": name, "full_name": repo["full_name"], "owner": {"login": owner, "type": "User"},
+                "private": False, "default_branch": "main", "url": f"{self.url}/repos/{repo['full_name']}",
+                "html_url": f"{self.url}/{repo['full_name']}"}
+
+    def commit_json(self, repo, sha):
+        _, commit = repo["objects"][sha]
+        base = f"{self.url}/repos/{repo['full_name']}/git"
+        return {"sha": sha, "url": f"{base}/commits/{sha}", "message": commit["message"],
+                "tree": {"sha": commit["tree"], "url": f"{base}/trees/{commit['tree']}"},
+                "parents": [{"sha": parent, "url": f"{base}/commits/{parent}"} for parent in commit["parents"]]}
+
+    def ref_json(self, repo, ref):
+        base = f"{self.url}/repos/{repo['full_name']}/git"
+        sha = repo["refs"][ref]
+        return {"ref": f"refs/{ref}", "url": f"{base}/refs/{ref}", "object": {"sha": sha, "type": "commit", "url": f"{base}/commits/{sha}"}}
+
+    def tree_entries(self, repo, ref="heads/main"):
+        _, commit = repo["objects"][repo["refs"][ref]]
+        return dict(repo["objects"][commit["tree"]][1])
+
+    def commit_tree(self, repo, entries, message, ref="heads/main"):
+        tree = self.store(repo, "tree", entries)
+        sha = self.store(repo, "commit", {"message": message, "tree": tree, "parents": [repo["refs"][ref]]})
+        repo["refs"][ref] = sha
+        return sha
+
+    # issues
+
+    def issue(self, repo, number):
+        if number not in repo["issues"]:
+            path = os.path.join(FIXTURE_DIR, self.name, f"issue_{number}.md")
+            if repo["full_name"] != ISSUE_REPO or not os.path.exists(path):
+                return None
+            with open(path, newline="") as f:
+                body = f.read().replace(FILES_PLACEHOLDER, self.files_url)
+            repo["issues"][number] = {"number": number, "title": f"Stand-in submission {number}", "body": body, "labels": []}
+        issue = repo["issues"][number]
+        url = f"{self.url}/repos/{repo['full_name']}/issues/{number}"
+        return dict(issue, id=number, url=url, html_url=url, comments_url=f"{url}/comments", state="open", user={"login": "standin"})
+
+    def route(self, method, path, query, body):
+        data = json.loads(body) if body else {}
+
+        match = re.fullmatch(r"/users/(?P<owner>[^/]+)/repos", path)
+        if match:
+            return self.list_repos(match["owner"], query)
+
+        match = re.fullmatch(r"/repos/(?P<owner>[^/]+)/(?P<name>[^/]+)(?P<rest>/.*)?", path)
+        if not match:
+            return super().route(method, path, query, body)
+
+        repo = self.repo(f"{match['owner']}/{match['name']}")
+        rest = match["rest"] or ""
+
+        with self._lock:
+            if rest == "":
+                return 200, {}, self.repo_json(repo)
+
+            issue_match = re.fullmatch(r"/issues/(?P<number>\d+)(?P<comments>/comments)?", rest)
+            if issue_match:
+                issue = self.issue(repo, int(issue_match["number"]))
+                if issue is None:
+                    return 404, {}, {"message": "Not Found"}
+                if issue_match["comments"] and method == "POST":
+                    comment_id = len(self.comments) + 1
+                    comment = {"id": comment_id, "body": data.get("body", ""), "user": {"login": "standin"},
+                               "url": f"{issue['url']}/comments/{comment_id}", "html_url": f"{issue['url']}#comment-{comment_id}"}
+                    self.comments.append(dict(comment, issue=issue["number"], repo=repo["full_name"]))
+                    return 201, {}, comment
+                if issue_match["comments"]:
+                    return 200, {}, [c for c in self.comments if c["repo"] == repo["full_name"] and c["issue"] == issue["number"]]
+                if method == "PATCH":
+                    repo["issues"][issue["number"]].update({k: v for k, v in data.items() if k in ("title", "body", "labels")})
+                    issue = self.issue(repo, issue["number"])
+                return 200, {}, issue
+
+            ref_match = re.fullmatch(r"/git/refs?/(?P<ref>.+)", rest)
+            if ref_match:
+                ref = ref_match["ref"]
+                if ref not in repo["refs"]:
+                    return 404, {}, {"message": "Not Found"}
+                if method == "PATCH":
+                    if data.get("sha") not in repo["objects"]:
+                        return 422, {}, {"message": "Object does not exist"}
+                    repo["refs"][ref] = data["sha"]
+                return 200, {}, self.ref_json(repo, ref)
+
+            # the commit a branch or sha points to, as resolved by `templates.py --lock`
+            head_match = re.fullmatch(r"/commits/(?P<ref>[^/]+)", rest)
+            if head_match and method == "GET":
+                sha = repo["refs"].get(f"heads/{head_match['ref']}", head_match["ref"])
+                if repo["objects"].get(sha, ("",))[0] != "commit":
+                    return 404, {}, {"message": "No commit found for SHA: " + head_match["ref"]}
+                return 200, {}, {"sha": sha, "commit": {"message": repo["objects"][sha][1]["message"]}}
+
+            commit_match = re.fullmatch(r"/git/commits/(?P<sha>[0-9a-f]{40})", rest)
+            if commit_match:
+                if repo["objects"].get(commit_match["sha"], ("",))[0] != "commit":
+                    return 404, {}, {"message": "Not Found"}
+                return 200, {}, self.commit_json(repo, commit_match["sha"])
+
+            if rest == "/git/blobs" and method == "POST":
+                content = data["content"] if data.get("encoding") == "base64" else base64.b64encode(data["content"].encode()).decode()
+                sha = self.store(repo, "blob", content)
+                return 201, {}, {"sha": sha, "url": f"{self.url}/repos/{repo['full_name']}/git/blobs/{sha}"}
+
+            if rest == "/git/trees" and method == "POST":
+                entries = dict(repo["objects"][data["base_tree"]][1]) if data.get("base_tree") else {}
+                entries.update({element["path"]: element["sha"] for element in data["tree"]})
+                sha = self.store(repo, "tree", entries)
+                return 201, {}, {"sha": sha, "url": f"{self.url}/repos/{repo['full_name']}/git/trees/{sha}",
+                                 "tree": [{"path": p, "mode": "100644", "type": "blob", "sha": s} for p, s in sorted(entries.items())]}
+
+            if rest == "/git/commits" and method == "POST":
+                sha = self.store(repo, "commit", {"message": data["message"], "tree": data["tree"], "parents": data.get("parents", [])})
+                return 201, {}, self.commit_json(repo, sha)
+
+            contents_match = re.fullmatch(r"/contents/(?P<path>.+)", rest)
+            if contents_match:
+                return self.contents(repo, method, unquote(contents_match["path"]), data)
+
+        return super().route(method, path, query, body)
+
+    def contents(self, repo, method, file_path, data):
+        entries = self.tree_entries(repo)
+        url = f"{self.url}/repos/{repo['full_name']}/contents/{file_path}"
+
+        if method == "PUT":
+            blob = self.store(repo, "blob", data["content"])
+            entries[file_path] = blob
+            commit = self.commit_tree(repo, entries, data.get("message", f"Update {file_path}"))
+            return 201, {}, {"content": {"name": os.path.basename(file_path), "path": file_path, "sha": blob, "url": url, "type": "file"},
+                             "commit": self.commit_json(repo, commit)}
+
+        if file_path not in entries:
+            return 404, {}, {"message": "Not Found"}
+        blob = entries[file_path]
+        return 200, {}, {"type": "file", "encoding": "base64", "content": repo["objects"][blob][1], "sha": blob,
+                         "name": os.path.basename(file_path), "path": file_path, "url": url}
+
+    def list_repos(self, owner, query):
+        per_page = int(query.get("per_page", ["30"])[0])
+        page = int(query.get("page", ["1"])[0])
+        with self._lock:
+            repos = [self.repo_json(repo) for name, repo in sorted(self.repos.items()) if name.split("/")[0] == owner]
+        headers = {}
+        if page * per_page < len(repos):
+            headers["Link"] = f'<{self.url}/users/{owner}/repos?type=owner&per_page={per_page}&page={page + 1}>; rel="next"'
+        return 200, headers, repos[(page - 1) * per_page:page * per_page]
+
+
+def make_handler(service):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def handle_request(self, method):
+            service.count("requests")
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+
+            service.faults.delay()
+            failure = service.faults.failure()
+            if failure is not None:
+                service.count("injected")
+                status, headers, payload = failure
+            else:
+                url = urlsplit(self.path)
+                status, headers, payload = service.route(method if method != "HEAD" else "GET", url.path, parse_qs(url.query), body)
+
+            if not isinstance(payload, bytes):
+                payload = json.dumps(payload).encode()
+                headers.setdefault("Content-Type", "application/json")
+
+            etag = f'"{hashlib.sha1(payload).hexdigest()}"'
+            if status == 200 and self.headers.get("If-None-Match") == etag:
+                service.count("not_modified")
+                status, payload = 304, b""
+
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            if status in (200, 304):
+                self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            if method != "HEAD":
+                self.wfile.write(payload)
+
+        def do_GET(self):
+            self.handle_request("GET")
+
+        def do_HEAD(self):
+            self.handle_request("HEAD")
+
+        def do_POST(self):
+            self.handle_request("POST")
+
+        def do_PATCH(self):
+            self.handle_request("PATCH")
+
+        def do_PUT(self):
+            self.handle_request("PUT")
+
+    return Handler
+
+
+class Standins:
+    """
+    Starts one stand-in server per service on free local ports.
+
+    Parameters:
+    - faults (Faults): faults injected by every server, unless overridden for a service.
+    - overrides (dict, optional): Faults keyed by service name (crossref, zenodo, datacite, doi, ror, orcid, github, raw, files).
+    - strict (bool): answer 404 for records without a fixture.
+    - host (str): interface to listen on.
+    """
+
+    def __init__(self, faults=None, overrides=None, strict=False, host="127.0.0.1"):
+        overrides = overrides or {}
+        faults = faults or Faults()
+        self.host = host
+        self.services = {}
+        self.servers = []
+
+        for cls in [FilesService, CrossrefService, ZenodoService, DataCiteService, DoiService, RorService, OrcidService, RawService]:
+            self.add(cls(overrides.get(cls.name, faults), strict))
+        self.add(GitHubService(overrides.get("github", faults), strict, files_url=self.services["files"].url))
+
+    def add(self, service):
+        server = ThreadingHTTPServer((self.host, 0), make_handler(service))
+        server.daemon_threads = True
+        service.url = f"http://{self.host}:{server.server_address[1]}"
+        self.services[service.name] = service
+        self.servers.append(server)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def env(self):
+        """
+        Environment variables pointing the pipeline at the servers.
+        """
+        return {
+            "BASE_URL_PUBLICATION": self.services["crossref"].url + "/works/",
+            "BASE_URL_SOFTWARE": self.services["zenodo"].url + "/api/records/",
+            "BASE_URL_DATACITE": self.services["datacite"].url + "/dois/",
+            "BASE_URL_DOI_RA": self.services["doi"].url + "/ra/",
+            "BASE_URL_DOI": self.services["doi"].url + "/",
+            "BASE_URL_ORGANIZATION": self.services["ror"].url + "/organizations/",
+            "BASE_URL_AUTHOR": self.services["orcid"].url + "/v3.0/",
+            "GITHUB_API_URL": self.services["github"].url,
+            "TEMPLATE_BASE_URL": self.services["raw"].url,
+            # the stand-in serves the fixture templates at any ref; the lock file pins the real ones
+            "TEMPLATE_REF": STANDIN_TEMPLATE_REF,
+        }
+
+    def summary(self):
+        return "\n".join(f"{name:<9} {service.stats['requests']:6d} requests, {service.stats['injected']} failures injected, "
+                         f"{service.stats['not_modified']} not modified"
+                         for name, service in self.services.items())
+
+    def stop(self):
+        # shutdown() waits for the server's next poll, so stop them all at once
+        threads = [threading.Thread(target=server.shutdown) for server in self.servers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for server in self.servers:
+            server.server_close()
+
+
+def main():
+    argv = sys.argv[1:]
+    command = []
+    if "--" in argv:
+        command = argv[argv.index("--") + 1:]
+        argv = argv[:argv.index("--")]
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many seconds added at random")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 5xx error")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After (seconds) sent with 429 responses")
+    parser.add_argument("--seed", type=int, help="random seed for jitter and failures")
+    parser.add_argument("--config", help="JSON file of per-service fault settings, e.g. {\"crossref\": {\"latency\": 2.0}}")
+    parser.add_argument("--strict", action="store_true", help="answer 404 for records without a fixture")
+    args = parser.parse_args(argv)
+
+    settings = {"latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate,
+                "rate_limit": args.rate_limit, "retry_after": args.retry_after, "seed": args.seed}
+    overrides = {}
+    if args.config:
+        with open(args.config) as f:
+            overrides = {name: Faults(**dict(settings, **values)) for name, values in json.load(f).items()}
+
+    standins = Standins(Faults(**settings), overrides, strict=args.strict)
+    env = standins.env()
+
+    if not command:
+        for name, value in env.items():
+            print(f"export {name}={value}")
+        print("# stand-in servers running; press Ctrl-C to stop", flush=True)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            print(standins.summary())
+            standins.stop()
+        return
+
+    run_env = dict(os.environ, **env)
+    run_env.setdefault("GITHUB_TOKEN", "standin")
+    run_env.setdefault("ISSUE_NUMBER", "1")
+    run_env.setdefault("OWNER", "hvidy")
+    run_env.setdefault("REPO", "standin_model")
+    try:
+        returncode = subprocess.run(command, env=run_env).returncode
+    finally:
+        print(standins.summary(), file=sys.stderr)
+        standins.stop()
+    sys.exit(returncode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Taps on the body of a streamed response, for the adapters that observe responses without reading them.
+
+tap() wraps the urllib3 response behind a requests.Response, so each chunk the caller reads is also
+handed to a callback, and the end of the body is reported once: when it has been read to the end, or
+when the response is closed (or its connection released) before that. Nothing is read that the caller
+does not read, so a caller that stops early (a ranged probe, a download over its size cap) still stops
+the transfer.
+"""
+
+
+class StreamTap:
+    """
+    A urllib3 response that reports what is read from it.
+
+    Parameters:
+    - raw: the urllib3 response (requests.Response.raw).
+    - on_chunk (callable, optional): called with each chunk of (decoded) body read.
+    - on_end (callable, optional): called once with True if the body was read to the end, else False.
+    """
+
+    def __init__(self, raw, on_chunk=None, on_end=None):
+        self._raw = raw
+        self._on_chunk = on_chunk
+        self._on_end = on_end
+        self._ended = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def chunk(self, data):
+        if data and self._on_chunk is not None:
+            self._on_chunk(data)
+
+    def end(self, complete):
+        if self._ended:
+            return
+        self._ended = True
+        if self._on_end is not None:
+            self._on_end(complete)
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        for data in self._raw.stream(amt, decode_content=decode_content):
+            self.chunk(data)
+            yield data
+        self.end(True)
+
+    def read(self, amt=None, decode_content=None, cache_content=False):
+        data = self._raw.read(amt, decode_content=decode_content, cache_content=cache_content)
+        self.chunk(data)
+        if amt is None or not data:
+            self.end(True)
+        return data
+
+    def close(self):
+        self.end(False)
+        self._raw.close()
+
+    def release_conn(self):
+        self.end(False)
+        self._raw.release_conn()
+
+
+def tap(response, on_chunk=None, on_end=None):
+    """
+    Wraps the body of a streamed response in a StreamTap (see the module docstring).
+
+    Returns:
+    The StreamTap.
+    """
+    response.raw = StreamTap(response.raw, on_chunk, on_end)
+    return response.raw
@@ -0,0 +1,291 @@
+"""
+Loader for the M@TE RO-Crate templates published in the metadata_schema repository.
+
+Templates are downloaded from the commit pinned in templates.lock.json, checked against the sha256
+pinned for each, and kept in an on-disk cache, so a run only goes to the network the first time a
+template is needed at that commit. Until the lock file is committed, templates are read unpinned from
+LOCK_DEFAULT_REF (with a warning), as they were before pinning.
+
+Usage:
+    python .github/scripts/templates.py [--ref REF]          pre-warm the cache, e.g. before going offline
+    python .github/scripts/templates.py --lock [--ref REF]   pin the commit REF (default main) points to
+"""
+import argparse
+import copy
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from tracing import traced
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TEMPLATE_REPO = "ModelAtlasofTheEarth/metadata_schema"
+# Host serving raw repository files (TEMPLATE_BASE_URL can point at a stand-in server)
+TEMPLATE_BASE_URL = os.getenv("TEMPLATE_BASE_URL", "https://raw.githubusercontent.com")
+TEMPLATE_URL = "{base_url}/{repo}/{ref}/{path}"
+
+CRATE_TEMPLATE = "mate_ro_crate/ro-crate-metadata.json"
+ENTITY_TEMPLATE = "mate_ro_crate/type_templates.json"
+TEMPLATES = [CRATE_TEMPLATE, ENTITY_TEMPLATE]
+
+# Pinned commit and sha256 of each template, written by `templates.py --lock`
+LOCK_FILE = os.path.join(SCRIPT_DIR, "templates.lock.json")
+
+# Branch whose head `templates.py --lock` pins when no --ref is given, and that is read when nothing is pinned
+LOCK_DEFAULT_REF = "main"
+
+# API used to resolve a branch or tag to the commit it points to when pinning
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+
+# Directory for downloaded templates: the repository's .cache, which is not committed
+CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", os.path.normpath(os.path.join(SCRIPT_DIR, "..", "..", ".cache", "templates")))
+
+# Templates cached from a branch (rather than a commit sha) are refreshed after this many seconds
+BRANCH_TTL = float(os.getenv("TEMPLATE_CACHE_TTL", 24 * 3600))
+
+TIMEOUT = 30
+
+COMMIT_SHA = re.compile(r"^[0-9a-f]{40}$")
+
+
+class TemplateError(Exception):
+    """
+    Raised when a template cannot be loaded: it is not cached in offline mode, the download failed
+    with nothing cached, or its content does not match the pinned hash.
+    """
+
+
+def offline_mode():
+    """
+    True if TEMPLATE_OFFLINE is set, in which case templates are only read from the cache.
+    """
+    return os.getenv("TEMPLATE_OFFLINE", "").lower() in ("1", "true", "yes")
+
+
+def read_lock(path=LOCK_FILE):
+    if path is None or not os.path.exists(path):
+        return {"ref": None, "sha256": {}}
+    with open(path) as f:
+        lock = json.load(f)
+    return {"ref": lock.get("ref"), "sha256": lock.get("sha256", {})}
+
+
+def sha256(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+class TemplateLoader:
+    """
+    Loads templates from a pinned ref of the metadata_schema repository.
+
+    Each template is looked up in memory, then in the on-disk cache, then downloaded. Cached copies
+    are stored with their sha256, which is checked on every read. At the ref of the lock file, every
+    template must match the hash pinned for it, and a template with no pinned hash is refused. Other
+    refs can only be chosen explicitly (ref or TEMPLATE_REF); a template cached from a branch is
+    refreshed after BRANCH_TTL, falling back to the cached copy if the download fails.
+
+    Parameters:
+    - ref (str, optional): commit sha, tag or branch. Defaults to TEMPLATE_REF, then the lock file,
+      then LOCK_DEFAULT_REF (unpinned).
+    - cache_dir (str): directory for downloaded templates.
+    - offline (bool, optional): never use the network. Defaults to TEMPLATE_OFFLINE.
+    - lock_path (str): the lock file with the pinned ref and hashes.
+    - session (optional): a requests.Session used to download templates. Defaults to the shared transport's.
+    """
+
+    def __init__(self, ref=None, cache_dir=CACHE_DIR, offline=None, lock_path=LOCK_FILE, session=None):
+        lock = read_lock(lock_path)
+        self.ref = ref or os.getenv("TEMPLATE_REF") or lock["ref"]
+        if not self.ref:
+            print(f"No template ref is pinned ({lock_path} is missing): reading unpinned templates from "
+                  f"{LOCK_DEFAULT_REF}. Pin them with `python .github/scripts/templates.py --lock`")
+            self.ref = LOCK_DEFAULT_REF
+        # hashes in the lock file only apply to the ref they were taken from
+        self.locked = self.ref == lock["ref"]
+        self.pinned = lock["sha256"] if self.locked else {}
+        self.cache_dir = cache_dir
+        self.offline = offline_mode() if offline is None else offline
+        if session is None:
+            from transport import get_session
+            session = get_session()
+        self.session = session
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def url(self, path):
+        return TEMPLATE_URL.format(base_url=TEMPLATE_BASE_URL, repo=TEMPLATE_REPO, ref=self.ref, path=path)
+
+    def cache_path(self, path):
+        return os.path.join(self.cache_dir, self.ref, path)
+
+    def load(self, path):
+        """
+        Returns a template as a dict. Each call returns a fresh copy, so callers can modify it.
+        """
+        with self._lock:
+            if path not in self._memo:
+                self._memo[path] = json.loads(self.content(path))
+            return copy.deepcopy(self._memo[path])
+
+    def content(self, path):
+        """
+        Returns the raw content (bytes) of a template from the cache or the network.
+        """
+        cached, fetched_at = self.read_cache(path)
+        expired = not COMMIT_SHA.match(self.ref) and time.time() - fetched_at > BRANCH_TTL
+
+        if cached is not None and (not expired or self.offline):
+            return cached
+        if self.offline:
+            raise TemplateError(f"Template {path}@{self.ref} is not cached and TEMPLATE_OFFLINE is set")
+
+        try:
+            content = self.download(path)
+        except (requests.exceptions.RequestException, TemplateError) as e:
+            if cached is not None:
+                print(f"Failed to refresh template {path}@{self.ref}, using the cached copy. Error: {e}")
+                return cached
+            raise TemplateError(f"Failed to download template {path}@{self.ref}. Error: {e}") from e
+
+        self.write_cache(path, content)
+        return content
+
+    @traced("download template", "http")
+    def download(self, path):
+        response = self.session.get(self.url(path), timeout=TIMEOUT)
+        response.raise_for_status()
+        content = response.content
+        self.verify(path, content)
+        try:
+            json.loads(content)
+        except ValueError as e:
+            raise TemplateError(f"Template {path}@{self.ref} is not valid JSON: {e}") from e
+        return content
+
+    def verify(self, path, content):
+        expected = self.pinned.get(path)
+        if expected is None and self.locked:
+            raise TemplateError(f"Template {path} has no sha256 pinned for {self.ref} in the lock file")
+        if expected is not None and sha256(content) != expected:
+            raise TemplateError(f"Template {path}@{self.ref} does not match its pinned sha256 {expected}")
+
+    def read_cache(self, path):
+        """
+        Returns (content, fetched_at) for a cached template, or (None, 0) if it is missing or corrupt.
+        """
+        cache_path = self.cache_path(path)
+        try:
+            with open(cache_path, "rb") as f:
+                content = f.read()
+            with open(cache_path + ".meta.json") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None, 0
+
+        if sha256(content) != meta.get("sha256"):
+            return None, 0
+        try:
+            self.verify(path, content)
+        except TemplateError:
+            return None, 0
+        return content, meta.get("fetched_at", 0)
+
+    def write_cache(self, path, content):
+        cache_path = self.cache_path(path)
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            for target, data in ((cache_path, content),
+                                 (cache_path + ".meta.json", json.dumps({"sha256": sha256(content), "fetched_at": time.time()}).encode())):
+                with tempfile.NamedTemporaryFile(dir=os.path.dirname(cache_path), delete=False) as tmp:
+                    tmp.write(data)
+                os.replace(tmp.name, target)
+        except OSError as e:
+            print(f"Unable to cache template {path}: {e}")
+
+    def warm(self, paths=TEMPLATES):
+        """
+        Makes sure each template is cached, and returns the sha256 of each.
+        """
+        return {path: sha256(self.content(path)) for path in paths}
+
+
+_loaders = {}
+_loaders_lock = threading.Lock()
+
+
+def default_loader(ref=None):
+    """
+    The template loader shared by a run for a ref (by default the pinned ref), configured from the environment.
+    Downloads use the shared transport.
+    """
+    with _loaders_lock:
+        if ref not in _loaders:
+            _loaders[ref] = TemplateLoader(ref=ref)
+        return _loaders[ref]
+
+
+def set_default_loader(loader):
+    """
+    Replaces the shared loader for the pinned ref, e.g. with one using another cache directory or session.
+    """
+    with _loaders_lock:
+        _loaders[None] = loader
+
+
+def load_template(path, ref=None):
+    return default_loader(ref).load(path)
+
+
+def resolve_commit(ref, session=None):
+    """
+    Returns the sha of the commit a branch, tag or sha of the metadata_schema repository points to.
+    """
+    if COMMIT_SHA.match(ref):
+        return ref
+    if session is None:
+        from transport import get_session
+        session = get_session()
+    response = session.get(f"{GITHUB_API_URL}/repos/{TEMPLATE_REPO}/commits/{ref}", timeout=TIMEOUT)
+    response.raise_for_status()
+    return response.json()["sha"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ref", help="commit sha, tag or branch to load (defaults to TEMPLATE_REF, then the lock file)")
+    parser.add_argument("--lock", action="store_true",
+                        help=f"pin the commit --ref (default {LOCK_DEFAULT_REF}) points to, and the template hashes, in the lock file")
+    args = parser.parse_args()
+
+    try:
+        if args.lock:
+            ref = resolve_commit(args.ref or LOCK_DEFAULT_REF)
+            # the hashes are taken from the download, so nothing from the lock being replaced applies
+            loader = TemplateLoader(ref=ref, lock_path=None)
+        else:
+            loader = TemplateLoader(ref=args.ref)
+        hashes = loader.warm()
+    except (TemplateError, requests.exceptions.RequestException) as e:
+        print(e)
+        sys.exit(1)
+
+    for path, digest in hashes.items():
+        print(f"{path}@{loader.ref}  sha256:{digest}")
+
+    if args.lock:
+        with open(LOCK_FILE, "w") as f:
+            json.dump({"repo": TEMPLATE_REPO, "ref": loader.ref, "sha256": hashes}, f, indent=2)
+            f.write("\n")
+        print(f"Pinned {TEMPLATE_REPO}@{loader.ref} in {LOCK_FILE}")
+
+
+if __name__ == "__main__":
+    main()
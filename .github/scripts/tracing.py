@@ -0,0 +1,220 @@
+"""
+Lightweight span instrumentation for the metadata pipeline.
+
+A span records the wall time of a named piece of work (a section of parse_issue, a lookup, a
+GitHub write) and the thread it ran on. Spans are kept in memory by a process-wide Tracer and,
+at the end of a run, can be written as a Chrome trace-event file (open it in chrome://tracing or
+https://ui.perfetto.dev) and summarised in a collapsible markdown table.
+
+Configuration:
+- TRACE_FILE: path of the trace-event JSON file written by publish(). Not written if unset.
+- TRACE_TABLE: `comment` to append the timing table to the report comment, `summary` to append
+  it to the step summary ($GITHUB_STEP_SUMMARY). No table if unset.
+- TRACING=0 switches recording off.
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+TRACE_FILE = os.getenv("TRACE_FILE")
+TRACE_TABLE = os.getenv("TRACE_TABLE", "")
+ENABLED = os.getenv("TRACING", "1") != "0"
+
+# Rows shown in the timing table, slowest first
+TABLE_ROWS = 25
+
+
+class Span:
+    """
+    A named interval of work. Use it as a context manager, or call end() for a span that does
+    not map onto one block of code.
+
+    Parameters:
+    - tracer (Tracer): the tracer the span is recorded in when it ends.
+    - name (str): what the span measures, e.g. `get_record publication`. Spans with the same name
+      are aggregated in the timing table.
+    - cat (str): category, e.g. `http` or `github`, used to filter spans in the trace viewer.
+    - args (dict): extra details shown in the trace viewer (e.g. the identifier looked up).
+    """
+
+    __slots__ = ("tracer", "name", "cat", "args", "start", "duration", "tid")
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.tid = threading.get_ident()
+        self.duration = None
+        self.start = time.perf_counter_ns()
+
+    def end(self, **args):
+        if self.duration is None:
+            self.duration = time.perf_counter_ns() - self.start
+            self.args.update(args)
+            self.tracer.record(self)
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.end()
+        return False
+
+
+class NullSpan:
+    """
+    Span handed out while recording is off.
+    """
+
+    args = {}
+
+    def end(self, **args):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class Tracer:
+    """
+    Collects finished spans from every thread of the process.
+    """
+
+    def __init__(self, enabled=ENABLED):
+        self.enabled = enabled
+        self.spans = []
+        self.origin = time.perf_counter_ns()
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    def span(self, name, cat="", **args):
+        if not self.enabled:
+            return NullSpan()
+        return Span(self, name, cat, args)
+
+    def record(self, span):
+        with self._lock:
+            if span.tid not in self._threads:
+                self._threads[span.tid] = (len(self._threads) + 1, threading.current_thread().name)
+            self.spans.append(span)
+
+    def reset(self):
+        with self._lock:
+            self.spans = []
+            self._threads = {}
+            self.origin = time.perf_counter_ns()
+
+    def events(self):
+        """
+        Returns the spans as Chrome trace events: complete ("X") events with timestamps and durations
+        in microseconds, plus a thread_name metadata ("M") event per thread.
+        """
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.spans)
+            threads = dict(self._threads)
+
+        events = [{"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": thread_name}}
+                  for tid, thread_name in threads.values()]
+        for span in sorted(spans, key=lambda span: span.start):
+            events.append({"ph": "X", "name": span.name, "cat": span.cat, "pid": pid, "tid": threads[span.tid][0],
+                           "ts": (span.start - self.origin) / 1000, "dur": span.duration / 1000,
+                           "args": {key: str(value) for key, value in span.args.items()}})
+        return events
+
+    def write_chrome_trace(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms"}, f)
+
+    def totals(self):
+        """
+        Returns the number of calls, total and longest duration (ns) of each span name, slowest first.
+        """
+        totals = defaultdict(lambda: [0, 0, 0])
+        with self._lock:
+            for span in self.spans:
+                entry = totals[span.name]
+                entry[0] += 1
+                entry[1] += span.duration
+                entry[2] = max(entry[2], span.duration)
+        return sorted(totals.items(), key=lambda item: item[1][1], reverse=True)
+
+    def timing_table(self, rows=TABLE_ROWS):
+        """
+        Returns the span totals as a markdown table folded in a <details> block, or "" if nothing was recorded.
+        Spans that run on worker threads overlap, so their totals can add up to more than the wall time.
+        """
+        totals = self.totals()
+        if not totals:
+            return ""
+
+        with self._lock:
+            wall = max(span.start + span.duration for span in self.spans) - min(span.start for span in self.spans)
+
+        table = f"<details>\n<summary>Timings ({wall / 1e9:.2f} s)</summary>\n\n"
+        table += "| Span | Calls | Total (ms) | Max (ms) |\n| --- | ---: | ---: | ---: |\n"
+        for name, (calls, total, longest) in totals[:rows]:
+            table += f"| {name} | {calls} | {total / 1e6:.1f} | {longest / 1e6:.1f} |\n"
+        if len(totals) > rows:
+            table += f"\n{len(totals) - rows} more spans in the trace file.\n"
+        table += "\n</details>\n"
+        return table
+
+
+tracer = Tracer()
+
+
+def span(name, cat="", **args):
+    """
+    Starts a span on the process-wide tracer (see Span).
+    """
+    return tracer.span(name, cat, **args)
+
+
+def traced(name=None, cat=""):
+    """
+    Decorator recording each call of a function as a span, named after the function by default.
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(span_name, cat):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def comment_table():
+    """
+    Returns the timing table to append to the report comment, or "" unless TRACE_TABLE=comment.
+    """
+    return "\n" + tracer.timing_table() if TRACE_TABLE == "comment" else ""
+
+
+def publish():
+    """
+    Writes the trace to TRACE_FILE and, if TRACE_TABLE=summary, appends the timing table to the
+    step summary. Called by the entry points once their work is done.
+    """
+    if TRACE_FILE:
+        tracer.write_chrome_trace(TRACE_FILE)
+        print(f"Trace of {len(tracer.spans)} spans written to {TRACE_FILE}")
+
+    summary_file = os.getenv("GITHUB_STEP_SUMMARY")
+    if TRACE_TABLE == "summary" and summary_file:
+        with open(summary_file, "a") as f:
+            f.write(tracer.timing_table())
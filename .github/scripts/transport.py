@@ -0,0 +1,95 @@
+"""
+The HTTP transport shared by every module that talks to an API or downloads a file.
+
+One requests.Session is created per process, on first use. Its connection pools are sized for the
+thread pools of the pipeline, so concurrent lookups reuse kept-alive connections (and their TLS
+sessions) instead of opening one per request. Requests ask for compressed responses (brotli too, when
+it can be decoded) and identify the pipeline with a User-Agent carrying a contact address, which
+Crossref uses to route clients to its polite pool.
+
+The adapters mounted on the session, from the outside in:
+- ResilientAdapter: retries, circuit breaker, hedging and default timeout (see resilience.py).
+- MetricsAdapter: per-host HTTP metrics (see metrics.py).
+- CassetteAdapter, if HTTP_CASSETTE is set, or a plain HTTPAdapter: sends the request (see cassette.py).
+
+Configuration:
+- HTTP_USER_AGENT: the User-Agent product (default `mate-bot/1.0`).
+- HTTP_MAILTO: contact address added to the User-Agent.
+- HTTP_POOL_SIZE: connections kept per host (default 32).
+- HTTP_POOL_HOSTS: hosts whose pools are kept (default 16).
+"""
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_ACCEPT_ENCODING
+
+from cassette import mount, mount_from_env
+from metrics import instrument
+from resilience import make_resilient
+
+PROJECT_URL = "https://github.com/ModelAtlasofTheEarth"
+USER_AGENT = os.getenv("HTTP_USER_AGENT", "mate-bot/1.0")
+MAILTO = os.getenv("HTTP_MAILTO")
+
+# Connections kept per host: enough for parse_issue's lookups and hedged duplicates at once
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 32))
+POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", 16))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def user_agent():
+    contact = f"; mailto:{MAILTO}" if MAILTO else ""
+    return f"{USER_AGENT} (+{PROJECT_URL}{contact}) python-requests/{requests.__version__}"
+
+
+def build_session(cassette=None, mode=None):
+    """
+    Builds a session with the shared transport's headers, pools and adapters.
+
+    Parameters:
+    - cassette (Cassette, optional): record into or replay from this cassette. Defaults to the one
+      configured by HTTP_CASSETTE, if any.
+    - mode (str, optional): 'record' or 'replay', with cassette.
+
+    Returns:
+    - requests.Session
+    """
+    session = requests.Session()
+    # urllib3 lists br (and zstd) only when a package able to decode them is installed
+    session.headers.update({"User-Agent": user_agent(), "Accept-Encoding": DEFAULT_ACCEPT_ENCODING})
+
+    pool = {"pool_connections": POOL_HOSTS, "pool_maxsize": POOL_SIZE}
+    if cassette is not None:
+        mount(session, cassette, mode, **pool)
+    elif mount_from_env(session, **pool) is None:
+        adapter = HTTPAdapter(**pool)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+    instrument(session)
+    make_resilient(session)
+    return session
+
+
+def get_session():
+    """
+    Returns the session shared by the process, building it on first use.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = build_session()
+        return _session
+
+
+def set_session(new_session):
+    """
+    Replaces the shared session, e.g. with a stand-in for benchmarks or one replaying a cassette.
+    """
+    global _session
+    with _session_lock:
+        _session = new_session
@@ -0,0 +1,143 @@
+import threading
+from collections import namedtuple
+from urllib.parse import urljoin, urlsplit
+
+import requests
+
+# Maximum number of redirects followed before giving up
+MAX_REDIRECTS = 10
+
+# Default timeout
+TIMEOUT = 10
+
+# Status codes after which a HEAD request is retried as a ranged GET.
+# Many servers (and most data portals) reject or mishandle HEAD.
+HEAD_FALLBACK_STATUS = {400, 403, 404, 405, 406, 429, 500, 501, 502, 503}
+
+REDIRECT_STATUS = {301, 302, 303, 307, 308}
+
+ProbeResult = namedtuple("ProbeResult", ["ok", "status", "final_url", "content_length", "content_type", "method", "error"])
+ProbeResult.__doc__ = """
+Outcome of probing a URI.
+
+- ok (bool): the URI resolved to a successful response.
+- status (int): HTTP status of the final response, or None if no response was received.
+- final_url (str): URL after following redirects.
+- content_length (int): size of the resource in bytes, if the server reported it.
+- content_type (str): Content-Type of the resource, if the server reported it.
+- method (str): the method that produced the final response ('HEAD' or 'GET').
+- error (str): error message if ok is False, else "".
+"""
+
+# Method that last worked for each host, so hosts that reject HEAD are not asked twice
+_host_methods = {}
+_host_methods_lock = threading.Lock()
+
+
+def preferred_method(url):
+    with _host_methods_lock:
+        return _host_methods.get(urlsplit(url).netloc, "HEAD")
+
+
+def remember_method(url, method):
+    with _host_methods_lock:
+        _host_methods[urlsplit(url).netloc] = method
+
+
+def content_length(response):
+    """
+    Size of the full resource: the total from Content-Range for a ranged response, else Content-Length.
+    """
+    content_range = response.headers.get("Content-Range", "")
+    if "/" in content_range and not content_range.endswith("/*"):
+        return int(content_range.rsplit("/", 1)[1])
+    if response.status_code != 206 and response.headers.get("Content-Length", "").isdigit():
+        return int(response.headers["Content-Length"])
+    return None
+
+
+def file_properties(result):
+    """
+    Returns the schema.org contentSize and encodingFormat of the file a successful probe reached, as far
+    as the server reported them. Web pages (text/html) describe a landing page, not a file, so give none.
+    """
+    properties = {}
+    if not result.ok:
+        return properties
+    media_type = (result.content_type or "").split(";")[0].strip().lower()
+    if media_type == "text/html":
+        return properties
+    if result.content_length is not None:
+        properties["contentSize"] = str(result.content_length)
+    if media_type:
+        properties["encodingFormat"] = media_type
+    return properties
+
+
+def send(session, method, url, timeout):
+    """
+    Issues a single request without following redirects and without downloading a body.
+    """
+    if method == "HEAD":
+        return session.request("HEAD", url, allow_redirects=False, timeout=timeout)
+
+    response = session.request("GET", url, headers={"Range": "bytes=0-0"}, allow_redirects=False, stream=True, timeout=timeout)
+    response.close()
+    return response
+
+
+def probe_uri(uri, session=None, max_redirects=MAX_REDIRECTS, timeout=TIMEOUT):
+    """
+    Checks that a URI is reachable without downloading its body.
+
+    Tries a HEAD request first and falls back to a streamed GET with `Range: bytes=0-0`, which is
+    closed as soon as the headers arrive. Redirects are followed manually up to max_redirects hops.
+    The method that works is remembered per host for later probes.
+
+    Parameters:
+    - uri (str): The URI to check.
+    - session (optional): a requests.Session used to send the requests. Defaults to the shared transport's.
+    - max_redirects (int): maximum number of redirects to follow.
+    - timeout (float): timeout in seconds for each request.
+
+    Returns:
+    A ProbeResult.
+    """
+
+    if session is None:
+        from transport import get_session
+        session = get_session()
+
+    url = uri
+    method = None
+    response = None
+
+    try:
+        for hop in range(max_redirects + 1):
+            method = preferred_method(url)
+            response = send(session, method, url, timeout)
+
+            if method == "HEAD" and response.status_code in HEAD_FALLBACK_STATUS:
+                method = "GET"
+                response = send(session, method, url, timeout)
+                if response.status_code < 400:
+                    remember_method(url, method)
+
+            if response.status_code in REDIRECT_STATUS and "Location" in response.headers:
+                url = urljoin(url, response.headers["Location"])
+                continue
+            break
+        else:
+            raise requests.exceptions.TooManyRedirects(f"Exceeded {max_redirects} redirects for url: {uri}")
+
+        # 416: the resource exists but is empty, so a one byte range cannot be satisfied
+        if response.status_code != 416:
+            response.raise_for_status()
+
+    except Exception as err:
+        status = response.status_code if response is not None else None
+        error = str(err.args[0]) if err.args else str(err)
+        return ProbeResult(False, status, url, None, None, method, error)
+
+    return ProbeResult(True, response.status_code, url, content_length(response),
+                       response.headers.get("Content-Type"), method, "")
@@ -0,0 +1,144 @@
+import bisect
+import csv
+import difflib
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+FOR_CODES_CSV = os.path.join(SCRIPT_DIR, "for_codes.csv")
+LICENSES_CSV = os.path.join(SCRIPT_DIR, "licenses.csv")
+
+# Directory for prebuilt snapshots of the vocabularies: the repository's .cache, which is not committed
+CACHE_DIR = os.getenv("VOCAB_CACHE_DIR", os.path.normpath(os.path.join(SCRIPT_DIR, "..", "..", ".cache", "vocab")))
+
+# Bump when the layout of the snapshot changes
+SNAPSHOT_VERSION = 3
+
+
+class ForCodeIndex:
+    """
+    Index of ANZSRC Field of Research codes.
+
+    Codes are hierarchical: a 2 digit division contains 4 digit groups, which contain 6 digit fields.
+    Lookups by code are a dict access; prefix queries bisect a sorted list of codes.
+
+    Parameters:
+    - names (dict): FoR names keyed by code.
+    """
+
+    def __init__(self, names):
+        self.names = names
+        self.codes = sorted(names)
+
+    def __contains__(self, code):
+        return code in self.names
+
+    def lookup(self, code):
+        """
+        Returns the name of a code, or None if the code does not exist.
+        """
+        return self.names.get(code)
+
+    def descendants(self, prefix):
+        """
+        Returns all codes below a division or group (not including the prefix itself), in order.
+        """
+        start = bisect.bisect_right(self.codes, prefix)
+        end = bisect.bisect_left(self.codes, prefix + "\uffff")
+        return self.codes[start:end]
+
+    def children(self, code):
+        """
+        Returns the codes one level below a code: the groups of a division, or the fields of a group.
+        """
+        return [c for c in self.descendants(code) if len(c) == len(code) + 2]
+
+    def ancestors(self, code):
+        """
+        Returns the division and group containing a code, from the top down.
+        """
+        return [code[:n] for n in range(2, len(code), 2) if code[:n] in self.names]
+
+    def suggest(self, code, n=3):
+        """
+        Returns up to n existing codes that are close to a code that was not found.
+        """
+        return difflib.get_close_matches(code, self.codes, n=n, cutoff=0.6)
+
+
+def read_csv(content):
+    """
+    Returns the rows of a CSV file, given its content (bytes), as dicts keyed by the header.
+    """
+    return list(csv.DictReader(io.StringIO(content.decode("utf-8"), newline="")))
+
+
+def load_snapshot(path, build):
+    """
+    Loads a vocabulary from its JSON snapshot, rebuilding the snapshot when the CSV has changed.
+
+    The snapshot records the sha256 of the CSV it was built from, so it stays valid across checkouts
+    (which give the CSV a new modification time) and is rebuilt on any edit. The CSV is read once
+    per process either way; it is only parsed when the snapshot is out of date.
+
+    Parameters:
+    - path (str): the CSV file.
+    - build (callable): builds the vocabulary, a dict that can be written as JSON, from the rows of the CSV.
+
+    Returns:
+    The vocabulary returned by build.
+    """
+    with open(path, "rb") as f:
+        content = f.read()
+    source = {"version": SNAPSHOT_VERSION, "sha256": hashlib.sha256(content).hexdigest()}
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    snapshot = os.path.join(CACHE_DIR, f"{name}.json")
+
+    try:
+        with open(snapshot, encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("source") == source:
+            return cached["vocabulary"]
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    vocabulary = build(read_csv(content))
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=CACHE_DIR, delete=False) as tmp:
+            json.dump({"source": source, "vocabulary": vocabulary}, tmp)
+        os.replace(tmp.name, snapshot)
+    except OSError:
+        pass
+
+    return vocabulary
+
+
+_for_codes = None
+_licenses = None
+
+
+def for_codes():
+    """
+    The FoR code index, built from for_codes.csv.
+    """
+    global _for_codes
+    if _for_codes is None:
+        _for_codes = ForCodeIndex(load_snapshot(FOR_CODES_CSV, lambda rows: {row["code"]: row["name"] for row in rows}))
+    return _for_codes
+
+
+def licenses():
+    """
+    The supported licenses, as a dict of {"name", "url"} keyed by license id, built from licenses.csv.
+    """
+    global _licenses
+    if _licenses is None:
+        _licenses = load_snapshot(LICENSES_CSV, lambda rows: {row["license"]: {"name": row["name"], "url": row["url"]} for row in rows})
+    return _licenses
@@ -1,39 +1,73 @@
 import os
-from github import Github, Auth
+import logging
+import improved_request_utils
+import metrics
+import tracing
+from tracing import span
+from generate_identifier import GITHUB_API_URL
 from parse_issue import parse_issue
 from crosswalks import dict_to_metadata
-from copy_files import copy_files
+from copy_files import collect_files
+from bulk_commit import GitHubBackend, commit_files
+from templates import TemplateError
 
-# Environment variables
-token = os.environ.get("GITHUB_TOKEN")
-issue_number = int(os.environ.get("ISSUE_NUMBER"))
-model_owner = os.environ.get("OWNER")
-model_repo_name = os.environ.get("REPO")
 
+def main():
+    # PyGithub is only needed once the issue is fetched, so it is not imported with this module
+    from github import Github, Auth
 
-# Get issue
-auth = Auth.Token(token)
-g = Github(auth=auth)
-repo = g.get_repo("hvidy/PIPE-4002-EarthByte-ModelAtlas")
-issue = repo.get_issue(number = issue_number)
+    logging.basicConfig(level=logging.INFO)
 
-# Get model repo
-model_repo = g.get_repo(f"{model_owner}/{model_repo_name}")
+    # Environment variables
+    token = os.environ.get("GITHUB_TOKEN")
+    issue_number = int(os.environ.get("ISSUE_NUMBER"))
+    model_owner = os.environ.get("OWNER")
+    model_repo_name = os.environ.get("REPO")
 
-# Parse issue
-data, error_log = parse_issue(issue)
 
-# Convert dictionary to metadata json
-metadata = dict_to_metadata(data)
+    # Get issue
+    auth = Auth.Token(token)
+    g = Github(auth=auth, base_url=GITHUB_API_URL)
+    with span("github get issue", "github", issue=issue_number):
+        repo = g.get_repo("hvidy/PIPE-4002-EarthByte-ModelAtlas")
+        issue = repo.get_issue(number = issue_number)
 
-#FOR TESTING - print out dictionary as a comment
-issue.create_comment("# M@TE crate \n"+str(metadata))
+    # Get model repo
+    with span("github get repo", "github", repo=model_repo_name):
+        model_repo = g.get_repo(f"{model_owner}/{model_repo_name}")
 
-# Move files to repo
-model_repo.create_file(".metadata/mate.json","add mate.json",metadata)
+    # Parse issue
+    data, error_log = parse_issue(issue)
 
-# Copy web material to repo
-copy_files(model_repo, "website_files/", data)
+    # Convert dictionary to metadata json
+    try:
+        metadata = dict_to_metadata(data)
+    except TemplateError as e:
+        issue.create_comment(f"Unable to build the M@TE crate: {e}")
+        tracing.publish()
+        metrics.publish()
+        raise SystemExit(1)
 
-# Report creation of repository
-issue.create_comment(f"Model repository created at https://github.com/{model_owner}/{model_repo_name}")
\ No newline at end of file
+    #FOR TESTING - print out dictionary as a comment
+    with span("github create comment", "github"):
+        issue.create_comment("# M@TE crate \n"+str(metadata))
+
+    # Move metadata and web material to repo in a single commit
+    files = {".metadata/mate.json": metadata}
+    files.update(collect_files("website_files/", data))
+    commit_files(GitHubBackend(model_repo), files, "add mate.json and website files")
+
+    # Report creation of repository
+    with span("github create comment", "github"):
+        issue.create_comment(f"Model repository created at https://github.com/{model_owner}/{model_repo_name}")
+
+    # Report how many lookups were served from the response cache
+    print(f"Record cache: {improved_request_utils.cache.summary()}")
+
+    # Write the trace file, the step summary table and the HTTP metrics
+    tracing.publish()
+    metrics.publish()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,64 @@
 import os
-from github import Github, Auth
+import logging
+import improved_request_utils
+import metrics
+import tracing
+from tracing import span
+from generate_identifier import GITHUB_API_URL
 from parse_issue import parse_issue
 from crosswalks import dict_to_report
 
-# Environment variables
-token = os.environ.get("GITHUB_TOKEN")
-issue_number = int(os.environ.get("ISSUE_NUMBER"))
 
-# Get issue
-auth = Auth.Token(token)
-g = Github(auth=auth)
-repo = g.get_repo("hvidy/PIPE-4002-EarthByte-ModelAtlas")
-issue = repo.get_issue(number = issue_number)
+def build_report(data, error_log):
+    """
+    Builds the report posted on the issue from the parsed data and the log of errors and warnings.
+    """
+    report = "Thank you for submitting. Please check the output below, and fix any errors, etc.\n\n"
 
-# Parse issue
-data, error_log = parse_issue(issue)
+    report += "# Errors and Warnings \n"
+    report += error_log + "\n\n"
 
-# Write report
-report = "Thank you for submitting. Please check the output below, and fix any errors, etc.\n\n"
+    report += "# Parsed data \n"
+    report += dict_to_report(data)
 
-report += "# Errors and Warnings \n"
-report += error_log + "\n\n"
+    return report
 
-report += "# Parsed data \n"
-report += dict_to_report(data)
 
-# Post report to issue as a comment
-issue.create_comment(report)
\ No newline at end of file
+def main():
+    # PyGithub is only needed once the issue is fetched, so it is not imported with this module
+    from github import Github, Auth
+
+    logging.basicConfig(level=logging.INFO)
+
+    # Environment variables
+    token = os.environ.get("GITHUB_TOKEN")
+    issue_number = int(os.environ.get("ISSUE_NUMBER"))
+
+    # Get issue
+    auth = Auth.Token(token)
+    g = Github(auth=auth, base_url=GITHUB_API_URL)
+    with span("github get issue", "github", issue=issue_number):
+        repo = g.get_repo("hvidy/PIPE-4002-EarthByte-ModelAtlas")
+        issue = repo.get_issue(number = issue_number)
+
+    # Parse issue
+    data, error_log = parse_issue(issue)
+
+    # Write report, with the timings so far if TRACE_TABLE=comment
+    report = build_report(data, error_log)
+    report += tracing.comment_table()
+
+    # Post report to issue as a comment
+    with span("github create comment", "github"):
+        issue.create_comment(report)
+
+    # Report how many lookups were served from the response cache
+    print(f"Record cache: {improved_request_utils.cache.summary()}")
+
+    # Write the trace file, the step summary table and the HTTP metrics
+    tracing.publish()
+    metrics.publish()
+
+
+if __name__ == "__main__":
+    main()